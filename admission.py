@@ -0,0 +1,226 @@
+"""
+Admission control for the API: per-client token buckets and load shedding.
+
+AdmissionMiddleware (added in server.py) runs before routing, so it keys and
+prices requests from the raw scope:
+
+- The client is the JWT subject of the bearer token, i.e. the user
+  get_current_user will resolve (read from the verified-principal cache when
+  the token was seen before, otherwise from the verified JWT). Requests
+  without a valid token, such as logins, are keyed by client address.
+- A request costs the weight of the longest ROUTE_COSTS prefix of its path
+  (default 1), so polling the Germany range endpoint drains the bucket ten
+  times faster than polling battery status. Buckets hold RATE_LIMIT_BURST tokens and refill at
+  RATE_LIMIT_RATE tokens per second.
+- When MAX_IN_FLIGHT requests are already being handled, new API requests are
+  shed whatever their bucket holds.
+- LONG_LIVED_PATHS (the price stream) pay their cost once, when opened, and
+  are never counted in flight, so open streams cannot starve other requests.
+
+Rejections are 429 responses with Retry-After, counted in
+admission_rejected_total at /api/metrics.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import math
+import os
+import time
+
+from jose import JWTError, jwt
+
+from Python_Assignment.auth.dependencies import SECRET_KEY, ALGORITHM
+from Python_Assignment.database import get_principal_cache
+from Python_Assignment.logging_setup import log_sampled
+from Python_Assignment.metrics import get_metrics_registry
+from Python_Assignment.utils.responses import FastJSONResponse
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() not in ("0", "false", "no")
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "20"))  # tokens per second per client
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "100"))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "64"))
+MAX_TRACKED_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "100000"))
+
+# Request cost by path prefix (longest match wins); RATE_LIMIT_ROUTE_COSTS (JSON object) overrides entries
+ROUTE_COSTS: Dict[str, float] = {
+    "/api/auth/login": 5,
+    "/api/auth/token": 5,
+    "/api/auth/register": 5,
+    "/api/market-data/": 4,
+    "/api/market-data/germany": 10,
+    "/api/market-data/today": 1,
+    "/api/market-data/current": 1,
+    "/api/market-data/realtime": 2,
+    "/api/market-data/stream": 5,
+    "/api/performance/": 2,
+    "/api/performance/trade-pnl": 4,
+    "/api/trades/": 2,
+    "/api/battery/history": 2,
+    "/api/forecast/accuracy": 2,
+}
+ROUTE_COSTS.update(json.loads(os.getenv("RATE_LIMIT_ROUTE_COSTS", "{}")))
+
+# Scraping metrics must keep working while the API sheds load
+EXEMPT_PATHS = ("/api/metrics",)
+# Streams stay open for as long as the client listens: rate-limited when opened, not counted as in flight
+LONG_LIVED_PATHS = ("/api/market-data/stream",)
+
+ADMISSION_REJECTED = get_metrics_registry().counter(
+    "admission_rejected_total", "Requests refused with 429 by admission control, by reason and cost rule.",
+    ("reason", "rule"),
+)
+
+
+class TokenBuckets:
+    """
+    Token bucket per client key. Idle buckets are forgotten least recently used
+    first beyond max_clients; a forgotten bucket comes back full, which is what it
+    would have refilled to anyway. Only used from the event loop thread.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_RATE, burst: float = RATE_LIMIT_BURST,
+                 max_clients: int = MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, last refill monotonic time]
+
+    def take(self, key: str, cost: float) -> float:
+        """Spend cost tokens; 0 when admitted, otherwise the seconds until cost tokens are available."""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        # A request costing more than the burst is admitted from a full bucket
+        cost = min(cost, self.burst)
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / self.rate
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {"clients": len(self._buckets), "rate_per_second": self.rate, "burst": self.burst}
+
+
+def route_cost(path: str) -> Tuple[str, float]:
+    """The ROUTE_COSTS rule matching path (longest prefix) and its cost; ("default", 1) otherwise."""
+    best = None
+    for prefix in ROUTE_COSTS:
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return (best, ROUTE_COSTS[best]) if best is not None else ("default", 1.0)
+
+
+def _bearer_token(scope) -> Optional[str]:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token if scheme.lower() == "bearer" and token else None
+    return None
+
+
+def client_key(scope) -> str:
+    """user:<JWT subject> for a valid bearer token, else ip:<client address>."""
+    token = _bearer_token(scope)
+    if token:
+        principal = get_principal_cache().get(token)
+        if principal is not None:
+            return f"user:{principal['User_ID']}"
+        try:
+            subject = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject is not None:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class AdmissionController:
+    """Token buckets plus the in-flight count, shared by every AdmissionMiddleware instance."""
+
+    def __init__(self, buckets: Optional[TokenBuckets] = None, max_in_flight: int = MAX_IN_FLIGHT,
+                 enabled: bool = RATE_LIMIT_ENABLED):
+        self.buckets = buckets or TokenBuckets()
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.in_flight = 0
+        self._route_costs = {}  # path -> (rule, cost)
+
+    def cost(self, path: str) -> Tuple[str, float]:
+        cached = self._route_costs.get(path)
+        if cached is None:
+            if len(self._route_costs) >= 4096:  # paths with IDs in them would grow this without bound
+                self._route_costs.clear()
+            cached = self._route_costs[path] = route_cost(path)
+        return cached
+
+    def stats(self) -> Dict[str, float]:
+        return {"enabled": self.enabled, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                **self.buckets.stats()}
+
+
+_controller = AdmissionController()
+
+
+def get_admission_controller() -> AdmissionController:
+    return _controller
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware applying the controller's buckets and in-flight limit to /api/ requests."""
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or _controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        path = scope.get("path", "")
+        if not controller.enabled or scope["type"] != "http" or not path.startswith("/api/") or path in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        rule, cost = controller.cost(path)
+        if controller.in_flight >= controller.max_in_flight:
+            await self._reject(scope, receive, send, "overloaded", rule, 1.0,
+                               "Server is busy, please retry shortly")
+            return
+        retry_after = controller.buckets.take(client_key(scope), cost)
+        if retry_after:
+            await self._reject(scope, receive, send, "rate_limited", rule, retry_after,
+                               "Rate limit exceeded, please slow down")
+            return
+        if path in LONG_LIVED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
+
+    async def _reject(self, scope, receive, send, reason: str, rule: str, retry_after: float, detail: str):
+        ADMISSION_REJECTED.inc((reason, rule))
+        log_sampled(logger, f"admission.{reason}", "Rejected %s %s: %s", scope["method"], scope["path"], reason,
+                    level=logging.WARNING)
+        response = FastJSONResponse(
+            {"detail": detail},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
@@ -6,9 +6,9 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 import logging
-from passlib.context import CryptContext
 
-from Python_Assignment.database import get_session, get_user_by_email, get_user_by_id
+from Python_Assignment.database import get_session, get_user_by_email, get_user_by_email_async, get_user_by_id_async, get_principal_cache
+from Python_Assignment.auth.passwords import pwd_context, verify_password, get_password_hash, verify_password_async
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,18 +18,9 @@ SECRET_KEY = "CHANGE_THIS_IN_PRODUCTION_ENVIRONMENT"  # Change this in productio
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 1 hour token validity
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme for token handling
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -65,7 +56,36 @@ def authenticate_user(email: str, password: str):
         logger.error(f"Error in authenticate_user: {e}")
         return None
 
+async def authenticate_user_async(email: str, password: str):
+    """
+    authenticate_user for the route handlers: the user lookup goes through the async
+    engine and bcrypt runs on the password pool. PasswordQueueFull propagates so the
+    caller can shed load.
+    """
+    user = await get_user_by_email_async(email)
+    if not user:
+        logger.warning(f"User with email {email} not found")
+        return None
+
+    if not await verify_password_async(password, user.get("hashed_password", "")):
+        logger.warning(f"Password verification failed for user {email}")
+        return None
+
+    return {
+        "User_ID": user.get("User_ID"),
+        "email": user.get("email"),
+        "name": user.get("name"),
+        "is_active": user.get("is_active", True)
+    }
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Tokens verified earlier skip the signature check and the users query until
+    # they expire or the user is changed (see database.PrincipalCache)
+    principal_cache = get_principal_cache()
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return dict(principal)
+
     try:
         # Verify token and extract payload
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -79,7 +99,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
             )
         
         # Get user data
-        user = get_user_by_id(int(user_id))
+        generation = principal_cache.generation(int(user_id))
+        user = await get_user_by_id_async(int(user_id))
         if user is None:
             logger.warning(f"User with ID {user_id} not found")
             raise HTTPException(
@@ -88,13 +109,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Return user data
-        return {
+        principal = {
             "User_ID": user.get("User_ID"),
             "email": user.get("email"),
             "name": user.get("name"),
             "is_active": user.get("is_active", True)
         }
+        principal_cache.put(token, principal, payload.get("exp"), generation)
+        return dict(principal)
     
     except JWTError as e:
         logger.error(f"JWT Error: {e}")
@@ -0,0 +1,152 @@
+"""
+bcrypt hashing and verification off the event loop.
+
+Each bcrypt call is ~100-300 ms of CPU at the default cost, so the async
+helpers run it in a dedicated worker pool. A semaphore caps the operations in
+flight at the pool size; callers beyond that wait in line, and once
+PASSWORD_HASH_MAX_QUEUE are waiting further calls fail fast with
+PasswordQueueFull rather than piling up behind a login storm.
+
+Environment:
+    BCRYPT_ROUNDS              cost factor for new hashes (default 12); existing
+                               hashes keep verifying at the cost they were made with
+    PASSWORD_HASH_WORKERS      pool size, i.e. concurrent bcrypt operations (default: CPU count)
+    PASSWORD_HASH_EXECUTOR     "thread" (default; bcrypt releases the GIL) or "process"
+    PASSWORD_HASH_MAX_QUEUE    callers allowed to wait for a worker (default 256)
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+
+from passlib.context import CryptContext
+
+from Python_Assignment.metrics import get_metrics_registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower()
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "256"))
+
+# Password hashing context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_registry = get_metrics_registry()
+PASSWORD_QUEUE_DEPTH = _registry.gauge(
+    "password_hash_queue_depth", "Password operations waiting for a bcrypt worker."
+)
+PASSWORD_IN_FLIGHT = _registry.gauge(
+    "password_hash_in_flight", "Password operations running on a bcrypt worker."
+)
+PASSWORD_WAIT = _registry.histogram(
+    "password_hash_wait_seconds", "Time a password operation waited for a bcrypt worker.", ("operation",)
+)
+PASSWORD_DURATION = _registry.histogram(
+    "password_hash_duration_seconds", "bcrypt time of a password operation, excluding the wait.", ("operation",)
+)
+PASSWORD_REJECTED = _registry.counter(
+    "password_hash_rejected_total", "Password operations refused because the wait queue was full.", ("operation",)
+)
+
+
+class PasswordQueueFull(Exception):
+    """Raised when PASSWORD_HASH_MAX_QUEUE callers are already waiting for a worker."""
+
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """Runs verify_password/get_password_hash on a bounded pool, off the event loop."""
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, executor: str = PASSWORD_HASH_EXECUTOR,
+                 max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.executor_kind = executor
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._waiting = 0
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            logger.info(f"Started {self.workers} bcrypt {self.executor_kind} workers (cost {BCRYPT_ROUNDS})")
+        return self._executor
+
+    def _limit(self) -> asyncio.Semaphore:
+        # Semaphores bind to the loop they are first used on; a new loop (tests, benchmarks) gets a fresh one
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._loop = loop
+        return self._semaphore
+
+    async def run(self, operation: str, func, *args):
+        semaphore = self._limit()
+        if semaphore.locked() and self._waiting >= self.max_queue:
+            PASSWORD_REJECTED.inc((operation,))
+            raise PasswordQueueFull(f"{self._waiting} password operations already waiting")
+
+        queued_at = time.perf_counter()
+        self._waiting += 1
+        PASSWORD_QUEUE_DEPTH.inc()
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+            PASSWORD_QUEUE_DEPTH.dec()
+        started_at = time.perf_counter()
+        PASSWORD_WAIT.observe(started_at - queued_at, (operation,))
+        PASSWORD_IN_FLIGHT.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), func, *args)
+        finally:
+            PASSWORD_IN_FLIGHT.dec()
+            PASSWORD_DURATION.observe(time.perf_counter() - started_at, (operation,))
+            semaphore.release()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "executor": self.executor_kind,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "waiting": self._waiting,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_hasher = PasswordHasher()
+
+
+def get_password_hasher() -> PasswordHasher:
+    return _hasher
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """verify_password on the bcrypt pool. Raises PasswordQueueFull when the pool is saturated."""
+    return await _hasher.run("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password) -> str:
+    """get_password_hash on the bcrypt pool. Raises PasswordQueueFull when the pool is saturated."""
+    return await _hasher.run("hash", get_password_hash, password)
@@ -0,0 +1,87 @@
+"""
+Event-loop blocking benchmark.
+
+Measures latency of a cheap endpoint (/api/battery/status) from many concurrent
+clients, first on an idle server and then while one client keeps issuing a
+heavy market-data range query. With the async database engine the p99 of the
+cheap endpoint should stay roughly flat instead of queueing behind the heavy query.
+
+Usage:
+    python benchmarks/async_latency.py [--days 2000] [--clients 20] [--requests 50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from common import use_scratch_database, seed_user, seed_market_data, summarize
+
+
+async def light_client(client, headers, requests: int, samples: list):
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/api/battery/status", headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def heavy_client(client, headers, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/api/market-data/", params={"start_date": "2000-01-01"}, headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+
+async def run_phase(client, headers, clients: int, requests: int, with_heavy: bool):
+    light_samples, heavy_samples = [], []
+    stop = asyncio.Event()
+    heavy_task = asyncio.create_task(heavy_client(client, headers, stop, heavy_samples)) if with_heavy else None
+    if heavy_task:
+        # Give the heavy query a head start so the light clients overlap with it
+        await asyncio.sleep(0.05)
+    await asyncio.gather(*(light_client(client, headers, requests, light_samples) for _ in range(clients)))
+    stop.set()
+    if heavy_task:
+        await heavy_task
+    return summarize(light_samples), summarize(heavy_samples)
+
+
+async def main(args):
+    import httpx
+    from Python_Assignment.server import app
+    from Python_Assignment.database import get_async_db
+
+    seed_user()
+    seed_market_data(args.days)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench123"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+        idle, _ = await run_phase(client, headers, args.clients, args.requests, with_heavy=False)
+        loaded, heavy = await run_phase(client, headers, args.clients, args.requests, with_heavy=True)
+
+    await get_async_db().dispose()
+
+    print(json.dumps({
+        "market_data_rows": args.days * 24,
+        "battery_status_idle": idle,
+        "battery_status_with_heavy_query": loaded,
+        "heavy_market_data_query": heavy,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=2000, help="Days of hourly market data to seed")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent light clients")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per light client")
+    parser.add_argument("--database", default=None, help="Scratch database path (default: temp file)")
+    args = parser.parse_args()
+
+    use_scratch_database(args.database)
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main(args))
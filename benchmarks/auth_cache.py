@@ -0,0 +1,81 @@
+"""
+Authentication cache benchmark.
+
+Times get_current_user for one token with the verified-principal cache
+disabled (JWT decode plus the users query on every call) and enabled, then
+GET /api/whoami throughput both ways, and checks that deactivating the user
+locks the cached token out on the next request.
+
+Usage:
+    python benchmarks/auth_cache.py [--calls 2000] [--requests 500]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from common import use_scratch_database, seed_user, summarize
+
+
+async def time_dependency(token: str, calls: int, cached: bool):
+    from Python_Assignment.auth.dependencies import get_current_user
+    from Python_Assignment.database import get_principal_cache
+
+    cache = get_principal_cache()
+    samples = []
+    for _ in range(calls):
+        if not cached:
+            cache.clear()
+        start = time.perf_counter()
+        await get_current_user(token)
+        samples.append(time.perf_counter() - start)
+    # A cache hit is well below the millisecond resolution of summarize
+    return {**summarize(samples), "mean_us": round(sum(samples) / len(samples) * 1e6, 1)}
+
+
+def time_requests(client, headers, requests: int, cached: bool):
+    from Python_Assignment.database import get_principal_cache
+
+    cache = get_principal_cache()
+    start = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            cache.clear()
+        assert client.get("/api/whoami", headers=headers).status_code == 200
+    return round(requests / (time.perf_counter() - start), 1)
+
+
+def main(args):
+    from fastapi.testclient import TestClient
+    from Python_Assignment.server import app
+    from Python_Assignment.database import get_principal_cache, set_user_active
+
+    user_id = seed_user()
+    results = {}
+    with TestClient(app) as client:
+        token = client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench123"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        results["get_current_user_uncached"] = client.portal.call(time_dependency, token, args.calls, False)
+        results["get_current_user_cached"] = client.portal.call(time_dependency, token, args.calls, True)
+        results["whoami_rps_uncached"] = time_requests(client, headers, args.requests, False)
+        results["whoami_rps_cached"] = time_requests(client, headers, args.requests, True)
+
+        set_user_active(user_id, False)
+        results["status_after_deactivation"] = client.get("/api/whoami", headers=headers).status_code
+        set_user_active(user_id, True)
+        results["status_after_reactivation"] = client.get("/api/whoami", headers=headers).status_code
+        results["cache"] = get_principal_cache().stats()
+
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000, help="get_current_user calls per mode")
+    parser.add_argument("--requests", type=int, default=500, help="GET /api/whoami requests per mode")
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.WARNING)
+    main(args)
@@ -0,0 +1,92 @@
+"""
+Bulk ingestion benchmark.
+
+Loads --days of hourly MarketData into a fresh table three ways and reports
+rows/sec: insert_row per row (a session and commit each, as seed_database used
+to), SQLAlchemyDatabase.bulk_insert (executemany per chunk, one transaction),
+and ingest_market_file over a Parquet file, first into the empty table and
+then again over the same rows (every row an upsert conflict). The per-row path
+is capped at --row-limit rows and extrapolated.
+
+Usage:
+    python benchmarks/bulk_ingest.py [--days 365] [--row-limit 2000]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from common import use_scratch_database
+
+
+def market_rows(days: int):
+    from datetime import datetime, timedelta
+    start = datetime(2021, 1, 1)
+    return [
+        {
+            "delivery_day": (start + timedelta(days=day)).strftime("%Y-%m-%d"),
+            "delivery_period": f"{hour:02d}:00-{(hour + 1):02d}:00",
+            "cleared": True, "market": "Germany",
+            "high": 55.0 + hour, "low": 45.0, "close": 50.0 + day % 7, "open": 49.0,
+            "transaction_volume": 250.0,
+        }
+        for day in range(days) for hour in range(24)
+    ]
+
+
+def throughput(rows: int, seconds: float):
+    return {"rows": rows, "seconds": round(seconds, 3), "rows_per_sec": round(rows / max(seconds, 1e-9))}
+
+
+def main(args):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from sqlalchemy import delete
+    from Python_Assignment.database import get_db, MarketData
+    from Python_Assignment.market_ingest import ingest_market_file
+
+    db = get_db()
+    rows = market_rows(args.days)
+
+    def clear():
+        with db.engine.begin() as connection:
+            connection.execute(delete(MarketData))
+
+    results = {}
+    sample = rows[:args.row_limit]
+    start = time.perf_counter()
+    for row in sample:
+        db.insert_row(MarketData, row)
+    results["insert_row"] = throughput(len(sample), time.perf_counter() - start)
+    clear()
+
+    start = time.perf_counter()
+    db.bulk_insert(MarketData, rows)
+    results["bulk_insert"] = throughput(len(rows), time.perf_counter() - start)
+    clear()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="energy_bench_"), "market_data.parquet")
+    pq.write_table(pa.Table.from_pylist(rows), path)
+    for name in ("file_ingest_new_rows", "file_ingest_upsert_existing"):
+        stats = ingest_market_file(path)
+        results[name] = throughput(stats["rows"], stats["seconds"])
+
+    with db.engine.connect() as connection:
+        stored = connection.exec_driver_sql("SELECT COUNT(*) FROM market_data").scalar()
+    assert stored == len(rows), (stored, len(rows))
+    results["speedup_bulk_insert_vs_insert_row"] = round(
+        results["bulk_insert"]["rows_per_sec"] / max(results["insert_row"]["rows_per_sec"], 1), 1
+    )
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="days of hourly market data to load")
+    parser.add_argument("--row-limit", type=int, default=2000, help="rows timed for the per-row insert path")
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.WARNING)
+    main(args)
@@ -0,0 +1,73 @@
+"""
+Columnar export benchmark.
+
+Downloads --days of hourly market data from /api/market-data/ as JSON,
+format=arrow and format=parquet, and reports body size and latency. Arrow and
+Parquet are timed both cold (Parquet partition cache emptied before every
+request) and warm (served from the cached partitions). Checks every format
+returns the same number of rows.
+
+Usage:
+    python benchmarks/columnar_export.py [--days 1460] [--repeat 5]
+"""
+import argparse
+import io
+import json
+import logging
+import time
+
+from common import use_scratch_database, seed_user, seed_market_data, summarize
+
+
+def main(args):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from fastapi.testclient import TestClient
+    from Python_Assignment.server import app
+    from Python_Assignment.auth.dependencies import create_access_token
+    from Python_Assignment.market_export import get_parquet_cache
+
+    user_id = seed_user()
+    seed_market_data(args.days)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    params = {"start_date": "2000-01-01"}
+    readers = {
+        "json": lambda body: len(json.loads(body)),
+        "arrow": lambda body: pa.ipc.open_stream(body).read_all().num_rows,
+        "parquet": lambda body: pq.read_table(io.BytesIO(body)).num_rows,
+    }
+
+    def run(client, format, cold):
+        samples = []
+        for _ in range(args.repeat):
+            if cold:
+                get_parquet_cache().invalidate("Germany")
+            start = time.perf_counter()
+            response = client.get("/api/market-data/", params={**params, "format": format}, headers=headers)
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+        return response.content, summarize(samples)
+
+    results = []
+    with TestClient(app) as client:
+        for format, cold in (("json", False), ("arrow", True), ("parquet", True), ("arrow", False), ("parquet", False)):
+            body, latency = run(client, format, cold)
+            results.append({
+                "format": format,
+                "cache": "n/a" if format == "json" else ("cold" if cold else "warm"),
+                "rows": readers[format](body),
+                "bytes": len(body),
+                **latency,
+            })
+    assert len({result["rows"] for result in results}) == 1, results
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1460, help="days of hourly market data to seed")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.CRITICAL)
+    main(args)
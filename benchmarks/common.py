@@ -0,0 +1,87 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Every benchmark runs the FastAPI app in-process against a scratch SQLite
+database, so importing this module must happen before anything from the
+Python_Assignment package is imported (the database URL is read at import time).
+"""
+import os
+import sys
+import tempfile
+import statistics
+from typing import Dict, List
+
+# Benchmarks drive a handful of users far past any per-user request budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# ... and must not have the trade settlement scheduler writing in the background
+os.environ.setdefault("SETTLEMENT_ENABLED", "false")
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The routes import the application as the Python_Assignment package
+if os.path.dirname(PACKAGE_DIR) not in sys.path:
+    sys.path.insert(0, os.path.dirname(PACKAGE_DIR))
+
+
+def use_scratch_database(path: str = None) -> str:
+    """Point the app at a throwaway database file and return its path."""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="energy_bench_", suffix=".db")
+        os.close(fd)
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+def seed_user(email: str = "bench@example.com", password: str = "bench123") -> int:
+    """Create a user with a portfolio and battery and return its User_ID."""
+    from Python_Assignment.auth.dependencies import get_password_hash
+    from Python_Assignment.database import get_db, get_user_by_email, create_portfolio, create_battery_if_not_exists, User
+
+    user = get_user_by_email(email)
+    if not user:
+        get_db().insert_row(User, {"email": email, "hashed_password": get_password_hash(password), "name": "Benchmark User", "is_active": True})
+        user = get_user_by_email(email)
+    create_portfolio(user["User_ID"])
+    create_battery_if_not_exists(user["User_ID"])
+    return user["User_ID"]
+
+
+def seed_market_data(days: int, market: str = "Germany"):
+    """Insert `days` worth of hourly MarketData rows in a single transaction."""
+    from datetime import datetime, timedelta
+    from Python_Assignment.database import get_db, MarketData
+
+    db = get_db()
+    start = datetime(2020, 1, 1)
+    with db.Session() as session, session.begin():
+        session.add_all([
+            MarketData(
+                delivery_day=(start + timedelta(days=day)).strftime("%Y-%m-%d"),
+                delivery_period=f"{hour:02d}:00-{(hour + 1):02d}:00",
+                cleared=True,
+                market=market,
+                high=55.0, low=45.0, close=50.0, open=49.0,
+                transaction_volume=250.0,
+            )
+            for day in range(days) for hour in range(24)
+        ])
@@ -0,0 +1,94 @@
+"""
+Streaming export benchmark.
+
+Requests /api/market-data/ over growing date ranges as a JSON list and as
+format=ndjson, calling the ASGI app directly so the time to the first body
+chunk can be observed. Reports time to first byte, total time, bytes and the
+Python heap peak (tracemalloc) per request. With streaming, time to first byte
+and peak memory should stay flat as the range grows.
+
+Usage:
+    python benchmarks/export_streaming.py [--days 730] [--ranges 30,180,730]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from common import use_scratch_database, seed_user, seed_market_data
+
+
+async def asgi_get(app, path: str, params: dict, token: str) -> dict:
+    """Issue one GET against the ASGI app and time the response body chunks."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(),
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    stats = {"status": None, "first_byte_ms": None, "bytes": 0}
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.sleep(3600)  # no disconnect while the response is streaming
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            stats["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if stats["first_byte_ms"] is None:
+                stats["first_byte_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            stats["bytes"] += len(message["body"])
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    stats["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    stats["peak_heap_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    return stats
+
+
+async def main(args):
+    from Python_Assignment.server import app
+    from Python_Assignment.auth.dependencies import create_access_token
+    from Python_Assignment.database import get_async_db
+
+    user_id = seed_user()
+    seed_market_data(args.days)
+    token = create_access_token({"sub": str(user_id)})
+    start_day = datetime(2020, 1, 1)
+
+    tracemalloc.start()
+    results = []
+    for days in (int(value) for value in args.ranges.split(",")):
+        params = {
+            "start_date": start_day.strftime("%Y-%m-%d"),
+            "end_date": (start_day + timedelta(days=days - 1)).strftime("%Y-%m-%d"),
+        }
+        for format in ("json", "ndjson"):
+            stats = await asgi_get(app, "/api/market-data/", {**params, "format": format}, token)
+            assert stats["status"] == 200, stats
+            results.append({"range_days": days, "rows": days * 24, "format": format, **stats})
+    tracemalloc.stop()
+
+    await get_async_db().dispose()
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=730, help="days of hourly market data to seed")
+    parser.add_argument("--ranges", default="30,180,730", help="comma-separated range lengths in days")
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(main(args))
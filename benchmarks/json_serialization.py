@@ -0,0 +1,83 @@
+"""
+Response serialization benchmark.
+
+Times the two ways a list endpoint can turn --rows rows into a response body:
+the generic FastAPI path (response_model validation of List[Dict[str, Any]],
+jsonable_encoder, then JSONResponse's json.dumps) and FastJSONResponse
+(orjson, no encoder pass). Uses real row shapes: market data and trades from
+the projection converters and synthetic forecasts. Checks both bodies decode
+to the same data.
+
+Usage:
+    python benchmarks/json_serialization.py [--rows 10000] [--repeat 20]
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from common import use_scratch_database, seed_user, seed_market_data, summarize
+
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main(args):
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from Python_Assignment.database import get_market_data, get_user_trades, create_trade
+    from Python_Assignment.utils.responses import FastJSONResponse
+    from Python_Assignment.utils.synthetic import generate_synthetic_forecasts
+
+    user_id = seed_user()
+    seed_market_data(-(-args.rows // 24))
+    start = datetime(2024, 1, 1)
+    for i in range(args.rows):
+        create_trade({"User_ID": user_id, "type": "buy" if i % 2 else "sell", "quantity": 1.0, "price": 50.0,
+                      "status": "executed", "execution_time": start + timedelta(minutes=i), "market": "Germany"})
+
+    datasets = {
+        "market_data": get_market_data()[:args.rows],
+        "trades": get_user_trades(user_id, cache_bypass=True, alias_keys=False),
+        "forecasts": generate_synthetic_forecasts(start, start + timedelta(hours=args.rows), "Germany"),
+    }
+    response_model = TypeAdapter(List[Dict[str, Any]])
+
+    def generic(rows):
+        # What FastAPI does for response_model=List[Dict[str, Any]] with the default response class
+        return JSONResponse(jsonable_encoder(response_model.validate_python(rows))).body
+
+    def fast(rows):
+        return FastJSONResponse(rows).body
+
+    results = {}
+    for name, rows in datasets.items():
+        assert json.loads(generic(rows)) == json.loads(fast(rows)), name
+        before = timed(lambda: generic(rows), args.repeat)
+        after = timed(lambda: fast(rows), args.repeat)
+        results[name] = {
+            "rows": len(rows),
+            "jsonable_encoder_json": before,
+            "orjson": after,
+            "speedup": round(before["p50_ms"] / max(after["p50_ms"], 0.01), 1),
+        }
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.INFO)
+    main(args)
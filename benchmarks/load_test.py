@@ -0,0 +1,251 @@
+"""
+Load test over every router in server.py.
+
+Runs the ASGI app in-process (httpx ASGITransport, with the app's startup and
+shutdown hooks) against a scratch database seeded with --users users, their
+trade history and --days of hourly market data. Each user logs in, then the
+scenarios run one after another with all users concurrently:
+
+  dashboard     the polling a logged-in dashboard does: battery, prices,
+                forecasts, portfolio, P&L, recent trades, status
+  trading       buy/sell bursts plus battery charge/discharge
+                (POST /api/trades/ and GET/PATCH /api/trades/{trade_id} still
+                query a legacy schema and always fail, so they are left out)
+  range_reads   large market data and trade reads: JSON, NDJSON/CSV exports,
+                Arrow/Parquet, resampled Germany data
+
+Writes throughput and p50/p95/p99 latency per endpoint and per scenario to
+--output. With --baseline (an earlier --output, e.g. from the parent commit)
+it exits with status 1 when an endpoint's p50 or p95 grew, or a scenario's
+throughput fell, by more than --threshold (ignoring latency changes smaller
+than --min-delta-ms), or when more than --max-error-rate of requests failed.
+
+Usage:
+    python benchmarks/load_test.py [--users 10] [--iterations 20] [--output load_test.json]
+                                   [--baseline previous.json] [--threshold 0.25]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from common import use_scratch_database, seed_user, seed_market_data, summarize
+
+TODAY = datetime.now().strftime("%Y-%m-%d")
+
+# (label, method, path, query params, JSON body); the label names the endpoint in the report
+SCENARIOS = {
+    "dashboard": [
+        ("GET /api/battery/status", "GET", "/api/battery/status", None, None),
+        ("GET /api/market-data/current", "GET", "/api/market-data/current", None, None),
+        ("GET /api/market-data/today", "GET", "/api/market-data/today", None, None),
+        ("GET /api/market-data/realtime", "GET", "/api/market-data/realtime", None, None),
+        ("GET /api/forecast/price", "GET", "/api/forecast/price", {"hours": 24}, None),
+        ("GET /api/forecast/prices", "GET", "/api/forecast/prices", None, None),
+        ("GET /api/forecast/accuracy", "GET", "/api/forecast/accuracy", None, None),
+        ("GET /api/performance/portfolio", "GET", "/api/performance/portfolio", None, None),
+        ("GET /api/performance/trade-pnl", "GET", "/api/performance/trade-pnl", None, None),
+        ("GET /api/performance/battery-utilization", "GET", "/api/performance/battery-utilization", None, None),
+        ("GET /api/battery/history", "GET", "/api/battery/history", None, None),
+        ("GET /api/trades/?limit=20", "GET", "/api/trades/", {"limit": 20}, None),
+        ("GET /api/auth/me", "GET", "/api/auth/me", None, None),
+        ("GET /api/whoami", "GET", "/api/whoami", None, None),
+        ("GET /api/status", "GET", "/api/status", None, None),
+    ],
+    "trading": [
+        ("POST /api/trades/buy", "POST", "/api/trades/buy", None, {"quantity": 0.5}),
+        ("POST /api/trades/sell", "POST", "/api/trades/sell", None, {"quantity": 0.5}),
+        ("POST /api/trades/buy (priced)", "POST", "/api/trades/buy", None, {"quantity": 0.25, "price": 48.5}),
+        ("POST /api/trades/sell (priced)", "POST", "/api/trades/sell", None, {"quantity": 0.25, "price": 51.5}),
+        ("POST /api/battery/charge", "POST", "/api/battery/charge", None, {"current_level": 1}),
+        ("POST /api/battery/discharge", "POST", "/api/battery/discharge", None, {"current_level": 1}),
+        ("GET /api/trades/?limit=5", "GET", "/api/trades/", {"limit": 5}, None),
+    ],
+    "range_reads": [
+        ("GET /api/market-data/ (json)", "GET", "/api/market-data/", {"start_date": "2000-01-01"}, None),
+        ("GET /api/market-data/ (ndjson)", "GET", "/api/market-data/", {"start_date": "2000-01-01", "format": "ndjson"}, None),
+        ("GET /api/market-data/ (arrow)", "GET", "/api/market-data/", {"start_date": "2000-01-01", "format": "arrow"}, None),
+        ("GET /api/market-data/ (parquet)", "GET", "/api/market-data/", {"start_date": "2000-01-01", "format": "parquet"}, None),
+        ("GET /api/market-data/germany (daily)", "GET", "/api/market-data/germany",
+         {"start_date": "2000-01-01", "end_date": TODAY, "resolution": 1440}, None),
+        ("GET /api/market-data/germany (15min synthetic)", "GET", "/api/market-data/germany",
+         {"start_date": "2030-01-01", "end_date": "2030-01-31", "resolution": 15, "limit": 5000}, None),
+        ("GET /api/trades/ (csv)", "GET", "/api/trades/", {"format": "csv"}, None),
+        ("GET /api/performance/trade-pnl (year)", "GET", "/api/performance/trade-pnl",
+         {"start_date": (datetime.now() - timedelta(days=365)).strftime("%Y-%m-%d"), "end_date": TODAY}, None),
+    ],
+}
+
+
+def seed(args):
+    """Users with a trade history each, plus market data. Returns the users' credentials."""
+    from Python_Assignment.database import get_db, rebuild_trade_rollups, Trade
+
+    credentials = []
+    now = datetime.now()
+    for index in range(args.users):
+        email, password = f"load{index}@example.com", "load123"
+        user_id = seed_user(email, password)
+        get_db().bulk_insert(Trade, [
+            {"User_ID": user_id, "type": "buy" if i % 2 else "sell", "quantity": 1.0 + i % 5, "price": 40.0 + i % 20,
+             "status": "executed", "execution_time": now - timedelta(hours=i), "executed_at": now - timedelta(hours=i),
+             "resolution": 60, "market": "Germany"}
+            for i in range(args.trades_per_user)
+        ])
+        credentials.append((email, password))
+    rebuild_trade_rollups()
+    seed_market_data(args.days)
+    return credentials
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, label, method, path, params=None, body=None, headers=None):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, params=params, json=body, headers=headers)
+            status = response.status_code
+        except Exception:
+            response, status = None, "exception"
+        self.samples[label].append(time.perf_counter() - start)
+        self.statuses[label][status] += 1
+        if status == "exception" or status >= 400:
+            self.errors[label] += 1
+        return response
+
+
+async def login(client, recorder, email, password):
+    response = await recorder.request(client, "POST /api/auth/login", "POST", "/api/auth/login",
+                                      body={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def virtual_user(client, recorder, headers, steps, iterations: int):
+    for _ in range(iterations):
+        for label, method, path, params, body in steps:
+            await recorder.request(client, label, method, path, params, body, headers)
+
+
+async def run_scenarios(args, credentials):
+    import httpx
+    from Python_Assignment.server import app
+
+    results = {"scenarios": {}, "endpoints": {}}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            recorder = Recorder()
+            start = time.perf_counter()
+            sessions = await asyncio.gather(*(login(client, recorder, email, password) for email, password in credentials))
+            scenario_reports = [("auth", recorder, time.perf_counter() - start)]
+
+            for name, steps in SCENARIOS.items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                recorder = Recorder()
+                iterations = args.range_iterations if name == "range_reads" else args.iterations
+                start = time.perf_counter()
+                await asyncio.gather(*(virtual_user(client, recorder, headers, steps, iterations) for headers in sessions))
+                scenario_reports.append((name, recorder, time.perf_counter() - start))
+
+    for name, recorder, seconds in scenario_reports:
+        requests = sum(len(samples) for samples in recorder.samples.values())
+        results["scenarios"][name] = {
+            "requests": requests,
+            "errors": sum(recorder.errors.values()),
+            "seconds": round(seconds, 3),
+            "throughput_rps": round(requests / max(seconds, 1e-9), 1),
+        }
+        for label, samples in recorder.samples.items():
+            results["endpoints"][label] = {
+                "scenario": name,
+                "errors": recorder.errors[label],
+                "statuses": {str(status): count for status, count in recorder.statuses[label].items()},
+                "throughput_rps": round(len(samples) / max(seconds, 1e-9), 1),
+                **summarize(samples),
+            }
+    return results
+
+
+def compare(results, baseline, threshold: float, min_delta_ms: float):
+    """Regressions of results against a baseline report, as human-readable strings."""
+    regressions = []
+    for label, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(label)
+        if not before:
+            continue
+        for stat in ("p50_ms", "p95_ms"):
+            delta = current[stat] - before[stat]
+            if delta > min_delta_ms and current[stat] > before[stat] * (1 + threshold):
+                regressions.append(f"{label}: {stat} {before[stat]} -> {current[stat]}")
+    for name, current in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before and current["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput_rps {before['throughput_rps']} -> {current['throughput_rps']}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(args):
+    credentials = seed(args)
+    results = asyncio.run(run_scenarios(args, credentials))
+    results = {"commit": git_commit(), "timestamp": datetime.now().isoformat(timespec="seconds"),
+               "config": vars(args), **results}
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+    failures = []
+    requests = sum(scenario["requests"] for scenario in results["scenarios"].values())
+    errors = sum(scenario["errors"] for scenario in results["scenarios"].values())
+    if errors > args.max_error_rate * requests:
+        failures.append(f"{errors} of {requests} requests failed")
+    if args.baseline:
+        with open(args.baseline) as handle:
+            failures += compare(results, json.load(handle), args.threshold, args.min_delta_ms)
+
+    width = max(len(label) for label in results["endpoints"])
+    for label, stats in results["endpoints"].items():
+        print(f"{label:<{width}}  {stats['count']:>5}  p50 {stats['p50_ms']:>8.2f}  p95 {stats['p95_ms']:>8.2f}  "
+              f"p99 {stats['p99_ms']:>8.2f} ms  errors {stats['errors']}")
+    for name, stats in results["scenarios"].items():
+        print(f"{name}: {stats['requests']} requests in {stats['seconds']}s ({stats['throughput_rps']} req/s)")
+    print(f"Wrote {args.output}")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--trades-per-user", type=int, default=500, help="seeded trade history per user")
+    parser.add_argument("--days", type=int, default=365, help="days of hourly market data to seed")
+    parser.add_argument("--iterations", type=int, default=20, help="passes over the dashboard and trading steps per user")
+    parser.add_argument("--range-iterations", type=int, default=2, help="passes over the range reads per user")
+    parser.add_argument("--scenarios", nargs="*", choices=sorted(SCENARIOS), help="only these scenarios")
+    parser.add_argument("--output", default="load_test.json", help="JSON report to write")
+    parser.add_argument("--baseline", help="earlier JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency changes below this")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="allowed fraction of failed requests")
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.CRITICAL)
+    sys.exit(main(args))
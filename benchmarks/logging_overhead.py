@@ -0,0 +1,115 @@
+"""
+Logging overhead benchmark.
+
+Runs the dashboard and trading scenarios from load_test.py in-process with
+--users concurrent users under each logging setup and reports requests/sec:
+
+  off               logging disabled
+  queue_json_info   configure_logging() defaults: JSON, INFO, writer thread
+  queue_json_debug  the same with the application's loggers at DEBUG, i.e.
+                    every hot-path record that used to be logged at INFO
+  sync_text_debug   that volume through a FileHandler on the event-loop
+                    thread, as server.py used to log
+
+Log files go to a temporary directory.
+
+Usage:
+    python benchmarks/logging_overhead.py [--users 10] [--iterations 10] [--repeat 3]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import time
+
+from common import use_scratch_database
+
+LOG_DIR = tempfile.mkdtemp(prefix="energy_bench_logs_")
+# server.py configures logging on import
+os.environ["LOG_FILE"] = os.path.join(LOG_DIR, "import.log")
+os.environ["LOG_FORMAT"] = "json"
+
+MODES = ("off", "queue_json_info", "queue_json_debug", "sync_text_debug")
+
+
+def set_logging(mode: str):
+    from Python_Assignment.logging_setup import configure_logging, stop_logging, TEXT_FORMAT
+
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    logging.disable(logging.NOTSET)
+    # Only the application's own records count; the benchmark client logs every request
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("Python_Assignment").setLevel(logging.DEBUG if mode.endswith("debug") else logging.NOTSET)
+    log_file = os.path.join(LOG_DIR, f"{mode}.log")
+    if mode == "off":
+        logging.disable(logging.CRITICAL)
+    elif mode.startswith("queue_json"):
+        listener = configure_logging("INFO", "json", log_file)
+        # It logs to stderr too; keep the benchmark output readable
+        for handler in listener.handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setLevel(logging.CRITICAL)
+    else:
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+
+
+async def run(args, credentials):
+    import httpx
+    from Python_Assignment.server import app
+    from load_test import SCENARIOS, Recorder, login, virtual_user
+
+    steps = SCENARIOS["dashboard"] + SCENARIOS["trading"]
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+            recorder = Recorder()
+            sessions = await asyncio.gather(*(login(client, recorder, email, password) for email, password in credentials))
+            recorder = Recorder()
+            start = time.perf_counter()
+            await asyncio.gather(*(virtual_user(client, recorder, headers, steps, args.iterations) for headers in sessions))
+            seconds = time.perf_counter() - start
+    requests = sum(len(samples) for samples in recorder.samples.values())
+    return requests / seconds, sum(recorder.errors.values())
+
+
+def main(args):
+    from load_test import seed
+
+    set_logging("off")
+    credentials = seed(argparse.Namespace(users=args.users, trades_per_user=200, days=30))
+    results = {mode: [] for mode in MODES}
+    for _ in range(args.repeat):
+        for mode in MODES:
+            set_logging(mode)
+            throughput, errors = asyncio.run(run(args, credentials))
+            set_logging("off")
+            assert errors == 0, f"{errors} failed requests with logging {mode}"
+            results[mode].append(throughput)
+
+    best = {mode: round(max(samples), 1) for mode, samples in results.items()}
+    report = {
+        "config": vars(args),
+        "requests_per_sec": best,
+        "relative_to_off": {mode: round(value / best["off"], 3) for mode, value in best.items()},
+        "log_bytes": {mode: os.path.getsize(os.path.join(LOG_DIR, f"{mode}.log"))
+                      for mode in MODES if os.path.exists(os.path.join(LOG_DIR, f"{mode}.log"))},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=10, help="passes over the scenario steps per user")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode; the best is reported")
+    args = parser.parse_args()
+    use_scratch_database()
+    main(args)
@@ -0,0 +1,102 @@
+"""
+Login storm benchmark.
+
+Fires --logins concurrent POST /api/auth/login requests (bcrypt at --rounds)
+while one trader keeps alternating POST /api/trades/buy and /sell, and reports
+login throughput and the trade latency during the storm, twice:
+
+  inline   bcrypt called directly in the handler, on the event loop (as before)
+  pool     bcrypt on the password worker pool (auth/passwords.py)
+
+Usage:
+    python benchmarks/login_storm.py [--logins 40] [--rounds 12] [--workers N]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+from common import use_scratch_database, seed_user, summarize
+
+
+async def storm(app, args):
+    import httpx
+
+    trade_samples = []
+    login_seconds = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        response = await client.post("/api/auth/login", json={"email": "trader@example.com", "password": "trader123"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        done = asyncio.Event()
+
+        async def trader():
+            side = "buy"
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.post(f"/api/trades/{side}", json={"quantity": 0.1}, headers=headers)
+                assert response.status_code == 200, response.text
+                trade_samples.append(time.perf_counter() - start)
+                side = "sell" if side == "buy" else "buy"
+                await asyncio.sleep(0.01)
+
+        async def login(index):
+            start = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"email": f"storm{index}@example.com", "password": "storm123"})
+            assert response.status_code == 200, response.text
+            login_seconds.append(time.perf_counter() - start)
+
+        trader_task = asyncio.create_task(trader())
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        await asyncio.gather(*(login(index) for index in range(args.logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await trader_task
+
+    return {
+        "logins_per_sec": round(args.logins / elapsed, 2),
+        "login_latency": summarize(login_seconds),
+        "trade_latency_during_storm": summarize(trade_samples),
+    }
+
+
+def main(args):
+    from Python_Assignment.server import app
+    from Python_Assignment.auth import passwords
+
+    seed_user("trader@example.com", "trader123")
+    for index in range(args.logins):
+        seed_user(f"storm{index}@example.com", "storm123")
+
+    async def inline(self, operation, func, *args):
+        return func(*args)
+
+    results = {}
+    pooled_run = passwords.PasswordHasher.run
+    for mode in ("inline", "pool"):
+        passwords.PasswordHasher.run = inline if mode == "inline" else pooled_run
+
+        async def run():
+            async with app.router.lifespan_context(app):
+                return await storm(app, args)
+
+        results[mode] = asyncio.run(run())
+    passwords.PasswordHasher.run = pooled_run
+    results["pool"]["hasher"] = passwords.get_password_hasher().stats()
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40, help="concurrent logins in the storm")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost of the seeded users")
+    parser.add_argument("--workers", type=int, help="password pool size (default: PASSWORD_HASH_WORKERS)")
+    args = parser.parse_args()
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    if args.workers:
+        os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    use_scratch_database()
+    logging.disable(logging.WARNING)
+    main(args)
@@ -0,0 +1,91 @@
+"""
+Market series store benchmark.
+
+Seeds --days of hourly MarketData and times a --range-days window at hourly and
+daily resolution two ways: get_market_data (SQL, one dict per row) followed by a
+per-row Python OHLC rollup, and MarketSeriesStore.query (searchsorted slice plus
+reduceat resample on the in-memory arrays). Checks that both produce the same
+daily bars and reports the one-off load time of the store.
+
+Usage:
+    python benchmarks/market_store.py [--days 365] [--range-days 30] [--repeat 20]
+"""
+import argparse
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+from common import use_scratch_database, seed_market_data, summarize
+
+
+def python_daily_bars(rows):
+    """The per-row rollup an API handler would otherwise do over get_market_data output."""
+    bars = {}
+    for row in rows:
+        bar = bars.get(row["delivery_day"])
+        if bar is None:
+            bars[row["delivery_day"]] = {"open": row["open"], "high": row["high"], "low": row["low"],
+                                         "close": row["close"], "volume": row["transaction_volume"]}
+        else:
+            bar["high"] = max(bar["high"], row["high"])
+            bar["low"] = min(bar["low"], row["low"])
+            bar["close"] = row["close"]
+            bar["volume"] += row["transaction_volume"]
+    return bars
+
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main(args):
+    from Python_Assignment.database import get_market_data
+    from Python_Assignment.market_store import get_market_store
+
+    seed_market_data(args.days)
+    store = get_market_store()
+    start = datetime(2020, 1, 1) + timedelta(days=args.days // 2)
+    end = start + timedelta(days=args.range_days)
+    start_day, last_day = start.strftime("%Y-%m-%d"), (end - timedelta(days=1)).strftime("%Y-%m-%d")
+
+    load_start = time.perf_counter()
+    store.query("Germany", start, end, 60)
+    load_ms = round((time.perf_counter() - load_start) * 1000, 1)
+
+    sql_daily = python_daily_bars(get_market_data(start_day, last_day))
+    store_daily = store.query("Germany", start, end, "day")
+    assert list(sql_daily) == [stamp[:10] for stamp in store_daily.timestamps.astype(str)]
+    for (day, bar), high, low, close, volume in zip(sql_daily.items(), store_daily.high, store_daily.low,
+                                                    store_daily.close, store_daily.volume):
+        assert (bar["high"], bar["low"], bar["close"], bar["volume"]) == (high, low, close, volume), day
+
+    results = {
+        "store_load_ms": load_ms,
+        "hourly": {
+            "sql_rows": timed(lambda: get_market_data(start_day, last_day), args.repeat),
+            "store_arrays": timed(lambda: store.query("Germany", start, end, 60), args.repeat),
+            "store_records": timed(lambda: store.query("Germany", start, end, 60).to_records("Germany"), args.repeat),
+        },
+        "daily": {
+            "sql_rows_python_rollup": timed(lambda: python_daily_bars(get_market_data(start_day, last_day)), args.repeat),
+            "store_resample": timed(lambda: store.query("Germany", start, end, "day"), args.repeat),
+        },
+    }
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="days of hourly data to seed")
+    parser.add_argument("--range-days", type=int, default=30, help="length of the queried window")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.INFO)
+    main(args)
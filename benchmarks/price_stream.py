@@ -0,0 +1,156 @@
+"""
+Price stream benchmark.
+
+Compares what N dashboards cost per refresh when each polls
+/api/market-data/realtime (build and serialize the full day per client) with one
+tick of the price stream fanned out to N subscribers (one computation, one
+encoded frame shared by everyone). Also checks that a subscriber that stops
+reading is resynced instead of growing its queue, and streams from a real
+uvicorn server to confirm clients get a snapshot followed by ticks.
+
+Usage:
+    python benchmarks/price_stream.py [--subscribers 1000] [--ticks 20] [--clients 50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime
+
+from common import use_scratch_database, seed_user, summarize
+
+os.environ.setdefault("PRICE_STREAM_INTERVAL", "0.5")
+
+
+def time_polling(subscribers: int, ticks: int):
+    """Per refresh: every client gets the full day, as /realtime returns it."""
+    import orjson
+    from Python_Assignment.utils.synthetic import generate_sample_price_data
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    samples, payload = [], 0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        for _ in range(subscribers):
+            payload = len(orjson.dumps(generate_sample_price_data(today)))
+        samples.append(time.perf_counter() - start)
+    return {**summarize(samples), "bytes_per_client": payload}
+
+
+async def time_fan_out(subscribers: int, ticks: int):
+    """Per refresh: one tick computed, encoded once and queued for every subscriber."""
+    from Python_Assignment.price_stream import PriceStream
+
+    stream = PriceStream(interval=3600)
+    subs = [stream.subscribe("Germany") for _ in range(subscribers)]
+    for sub in subs:
+        sub.queue.get_nowait()  # the initial snapshot
+    samples, payload = [], 0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        stream.tick()
+        samples.append(time.perf_counter() - start)
+        for sub in subs:
+            payload = len(sub.queue.get_nowait())
+    for sub in subs:
+        stream.unsubscribe(sub)
+    await stream.stop()
+    return {**summarize(samples), "bytes_per_client": payload}
+
+
+async def check_backpressure(queue_size: int = 4):
+    """A subscriber that never reads holds at most queue_size frames and is resynced from a snapshot."""
+    from Python_Assignment.price_stream import PriceStream
+
+    stream = PriceStream(interval=3600, queue_size=queue_size)
+    stalled = stream.subscribe("Germany")
+    for _ in range(queue_size * 3):
+        stream.tick()
+    frames = [stalled.queue.get_nowait() for _ in range(stalled.queue.qsize())]
+    stream.unsubscribe(stalled)
+    await stream.stop()
+    return {
+        "queued_frames": len(frames),
+        "resyncs": stream.resyncs,
+        "first_frame_after_resync": frames[0].split(b"\n", 1)[0].decode(),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def stream_from_server(clients: int, seconds: float):
+    """Open `clients` streams against a live server and count the events each one receives."""
+    import httpx
+    import uvicorn
+    from Python_Assignment.server import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_config=None, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base, timeout=30) as client:
+        token = (await client.post("/api/auth/login", json={"email": "bench@example.com", "password": "bench123"})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def listen():
+            events = []
+            try:
+                async with client.stream("GET", "/api/market-data/stream", headers=headers) as response:
+                    async for line in response.aiter_lines():
+                        if line.startswith("event: "):
+                            events.append(line[7:])
+            except asyncio.CancelledError:
+                pass
+            return events
+
+        listeners = [asyncio.create_task(listen()) for _ in range(clients)]
+        await asyncio.sleep(seconds)
+        status = (await client.get("/api/status", headers=headers)).json()["price_stream"]
+        for listener in listeners:
+            listener.cancel()
+        received = await asyncio.gather(*listeners)
+
+    server.should_exit = True
+    await serving
+    return {
+        "clients": clients,
+        "all_started_with_snapshot": all(events and events[0] == "snapshot" for events in received),
+        "ticks_per_client": sorted({events.count("tick") for events in received}),
+        "server_ticks": status["ticks"],
+        "subscribers_seen_by_server": status["subscribers"],
+    }
+
+
+def main(args):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    seed_user()
+    results = {
+        "polling_full_day": time_polling(args.subscribers, args.ticks),
+        "stream_one_tick": asyncio.run(time_fan_out(args.subscribers, args.ticks)),
+        "backpressure": asyncio.run(check_backpressure()),
+        "live_server": asyncio.run(stream_from_server(args.clients, args.seconds)),
+    }
+    results["speedup_per_refresh"] = round(
+        results["polling_full_day"]["mean_ms"] / max(results["stream_one_tick"]["mean_ms"], 0.01), 1
+    )
+    print(json.dumps({"subscribers": args.subscribers, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    use_scratch_database()
+    main(parser.parse_args())
@@ -0,0 +1,48 @@
+"""
+Query plan check.
+
+Runs EXPLAIN QUERY PLAN for every hot query builder in database.py against a
+fresh database (tables and indexes created by get_db()) and prints the plans.
+Exits non-zero if any of them falls back to a full table scan, so it can be
+used as a regression gate after schema or query changes.
+
+Usage:
+    python benchmarks/query_plans.py [--database path/to/existing.db]
+"""
+import argparse
+import json
+import sys
+
+from common import use_scratch_database
+
+
+def main(args) -> int:
+    from Python_Assignment.database import get_db, query_plan_statements, find_full_scans
+
+    db = get_db()
+    plans = {name: db.explain_query_plan(statement) for name, statement in query_plan_statements().items()}
+    full_scans = find_full_scans()
+
+    if args.json:
+        print(json.dumps({"plans": plans, "full_scans": sorted(full_scans)}, indent=2))
+    else:
+        for name, plan in plans.items():
+            marker = "FULL SCAN" if name in full_scans else "ok"
+            print(f"[{marker}] {name}")
+            for detail in plan:
+                print(f"    {detail}")
+
+    if full_scans:
+        print(f"\n{len(full_scans)} quer{'y' if len(full_scans) == 1 else 'ies'} without a usable index: "
+              f"{', '.join(sorted(full_scans))}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="check an existing database file (indexes are migrated in place)")
+    parser.add_argument("--json", action="store_true", help="print plans as JSON")
+    args = parser.parse_args()
+    use_scratch_database(args.database)
+    sys.exit(main(args))
@@ -0,0 +1,128 @@
+"""
+Concurrent read/write benchmark for the SQLite connection profiles.
+
+Runs the same mixed workload against a fresh database file per profile
+(see SQLITE_PROFILES in database.py): reader threads repeatedly load a user's
+trade history and a week of market data while writer threads commit
+buy-style transactions (insert a trade, update battery and portfolio).
+Reports committed writes/s, reads/s, read latency and lock errors per profile.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--seconds 5] [--readers 8] [--writers 2]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from common import summarize
+
+
+def run_profile(name: str, args) -> dict:
+    from Python_Assignment.database import (
+        SQLAlchemyDatabase, SQLITE_PROFILES, Trade, Battery, Portfolio, MarketData, User,
+        _user_trades_select, _market_data_select,
+    )
+    from sqlalchemy import update
+
+    path = os.path.join(tempfile.mkdtemp(prefix="energy_bench_"), f"{name}.db")
+    db = SQLAlchemyDatabase(f"sqlite:///{path}", SQLITE_PROFILES[name])
+    db.create_tables()
+
+    with db.Session() as session, session.begin():
+        user = User(email="bench@example.com", hashed_password="x", name="Benchmark User", is_active=True)
+        session.add(user)
+        session.flush()
+        user_id = user.User_ID
+        session.add(Portfolio(User_ID=user_id, balance=10000.0))
+        session.add(Battery(User_ID=user_id, current_level=50.0, capacity=100.0))
+        session.add_all([
+            MarketData(delivery_day=f"2020-01-{day:02d}", delivery_period=f"{hour:02d}:00-{hour + 1:02d}:00",
+                       cleared=True, market="Germany", high=55.0, low=45.0, close=50.0, open=49.0,
+                       transaction_volume=250.0)
+            for day in range(1, 29) for hour in range(24)
+        ])
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    read_latencies = []
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            db.fetch_rows(_user_trades_select(user_id, None, None).limit(50), Trade)
+            market = db.fetch_rows(_market_data_select("2020-01-01", "2020-01-07", None, None, "Germany"), MarketData)
+            local.append(time.perf_counter() - start)
+            if not market:
+                with lock:
+                    counts["errors"] += 1
+        with lock:
+            counts["reads"] += len(local)
+            read_latencies.extend(local)
+
+    def writer():
+        writes = errors = 0
+        while not stop.is_set():
+            try:
+                with db.Session() as session, session.begin():
+                    session.add(Trade(User_ID=user_id, type="buy", quantity=1.0, price=50.0,
+                                      status="executed", execution_time=datetime.now(), market="Germany"))
+                    session.execute(update(Battery).where(Battery.User_ID == user_id)
+                                    .values(current_level=Battery.current_level + 0.001))
+                    session.execute(update(Portfolio).where(Portfolio.User_ID == user_id)
+                                    .values(balance=Portfolio.balance - 50.0))
+                writes += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["writes"] += writes
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {
+        "profile": name,
+        "pragmas": db.connection_profile()["pragmas"],
+        "writes_per_second": round(counts["writes"] / args.seconds, 1),
+        "reads_per_second": round(counts["reads"] / args.seconds, 1),
+        "errors": counts["errors"],
+        "read_latency": summarize(read_latencies),
+    }
+    db.engine.dispose()
+    return result
+
+
+def main(args):
+    results = [run_profile(name, args) for name in ("default", "tuned")]
+    baseline, tuned = results
+    print(json.dumps({
+        "config": vars(args),
+        "results": results,
+        "speedup": {
+            "writes": round(tuned["writes_per_second"] / max(baseline["writes_per_second"], 0.1), 2),
+            "reads": round(tuned["reads_per_second"] / max(baseline["reads_per_second"], 0.1), 2),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    main(args)
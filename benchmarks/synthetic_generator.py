@@ -0,0 +1,154 @@
+"""
+Synthetic market data generator benchmark.
+
+Times the original per-point generate_sample_germany_market_data loop (kept
+below for comparison) against the vectorized generator in utils/synthetic.py
+at 7, 90 and 365 day ranges, both fully materialized as row dicts and
+serialized to JSON through the lazy block stream. Also checks that a seed
+reproduces the same data.
+
+Usage:
+    python benchmarks/synthetic_generator.py [--resolution 15] [--repeat 3]
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from common import summarize
+
+
+def legacy_generate_sample_germany_market_data(start_date, end_date, resolution=None):
+    """The per-point loop that used to live in routes/market.py."""
+    market_data = []
+    
+    # Convert date strings to datetime
+    try:
+        start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
+        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
+    except ValueError:
+        # Default to recent dates if invalid
+        end_date_obj = datetime.now()
+        start_date_obj = end_date_obj - timedelta(days=7)
+    
+    # Use requested resolution or default to hourly (60 min)
+    resolution = resolution or 60
+    minutes_per_day = 24 * 60
+    points_per_day = minutes_per_day // resolution
+    
+    # Generate data for each day in the range
+    current_date = start_date_obj
+    id_counter = 1
+    
+    while current_date <= end_date_obj:
+        date_str = current_date.strftime('%Y-%m-%d')
+        
+        # Base price pattern with daily and weekly patterns
+        day_of_week = current_date.weekday()  # 0-6 (Mon-Sun)
+        weekend_factor = 1.0 - (0.2 if day_of_week >= 5 else 0)  # Lower prices on weekends
+        
+        for point_idx in range(points_per_day):
+            # Time of day influences prices (higher during peak hours)
+            hour_of_day = (point_idx * resolution) // 60
+            minute_of_hour = (point_idx * resolution) % 60
+            
+            # Higher prices during morning and evening peaks
+            time_factor = 1.0 + 0.3 * (
+                math.exp(-((hour_of_day - 8) ** 2) / 10) +  # Morning peak around 8am
+                math.exp(-((hour_of_day - 18) ** 2) / 10)    # Evening peak around 6pm
+            )
+            
+            # Generate timestamp and period string
+            timestamp = current_date.replace(
+                hour=hour_of_day, 
+                minute=minute_of_hour,
+                second=0
+            )
+            
+            period_end = timestamp + timedelta(minutes=resolution)
+            period_str = f"{timestamp.strftime('%H:%M')}-{period_end.strftime('%H:%M')}"
+            
+            # Base price with some randomness
+            base_price = 45 * weekend_factor * time_factor
+            price_noise = random.uniform(0.9, 1.1)
+            avg_price = base_price * price_noise
+            
+            # Create data point
+            data_point = {
+                "id": id_counter,
+                "date": date_str,
+                "resolution": f"{resolution}min",
+                "delivery_period": period_str,
+                "market": "Germany",
+                "high_price": avg_price * random.uniform(1.01, 1.05),
+                "low_price": avg_price * random.uniform(0.95, 0.99),
+                "average_price": avg_price,
+                "open_price": avg_price * random.uniform(0.98, 1.02),
+                "close_price": avg_price * random.uniform(0.98, 1.02),
+                "buy_volume": random.uniform(100, 300),
+                "sell_volume": random.uniform(100, 300),
+                "volume": random.uniform(200, 600),
+                "vwap1h": avg_price * random.uniform(0.99, 1.01),
+                "vwap3h": avg_price * random.uniform(0.98, 1.02),
+                "contract_open_time": (timestamp - timedelta(hours=2)).isoformat(),
+                "contract_close_time": (timestamp - timedelta(minutes=15)).isoformat(),
+                "created_at": datetime.now().isoformat()
+            }
+            
+            market_data.append(data_point)
+            id_counter += 1
+        
+        current_date += timedelta(days=1)
+    
+    return market_data
+
+
+def timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def main(args):
+    from Python_Assignment.utils.synthetic import generate_sample_germany_market_data, stream_sample_germany_market_data
+
+    first = generate_sample_germany_market_data("2024-01-01", "2024-01-07", args.resolution, seed=42)
+    again = generate_sample_germany_market_data("2024-01-01", "2024-01-07", args.resolution, seed=42)
+    strip = lambda rows: [{k: v for k, v in row.items() if k != "created_at"} for row in rows]
+    legacy = legacy_generate_sample_germany_market_data("2024-01-01", "2024-01-07", args.resolution)
+    assert strip(first) == strip(again), "same seed must reproduce the same data"
+    assert [(r["date"], r["delivery_period"], r["contract_open_time"]) for r in first] == \
+        [(r["date"], r["delivery_period"], r["contract_open_time"]) for r in legacy]
+    assert list(first[0]) == list(legacy[0]), "row keys must keep their order"
+
+    results = []
+    for days in (7, 90, 365):
+        start = "2024-01-01"
+        end = (datetime(2024, 1, 1) + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        loop = timed(lambda: legacy_generate_sample_germany_market_data(start, end, args.resolution), args.repeat)
+        vectorized = timed(lambda: generate_sample_germany_market_data(start, end, args.resolution, seed=1), args.repeat)
+        loop_json = timed(lambda: json.dumps(legacy_generate_sample_germany_market_data(start, end, args.resolution)), args.repeat)
+        streamed_json = timed(lambda: b"".join(stream_sample_germany_market_data(start, end, args.resolution, seed=1)), args.repeat)
+        results.append({
+            "days": days,
+            "rows": days * (24 * 60 // args.resolution),
+            "loop_rows": loop,
+            "vectorized_rows": vectorized,
+            "loop_json": loop_json,
+            "streamed_json": streamed_json,
+            "speedup_rows": round(loop["p50_ms"] / max(vectorized["p50_ms"], 0.01), 1),
+            "speedup_json": round(loop_json["p50_ms"] / max(streamed_json["p50_ms"], 0.01), 1),
+        })
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolution", type=int, default=15, help="minutes per period")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,110 @@
+"""
+Trade execution benchmark.
+
+Fires concurrent 1 kWh buys at a single battery that only has room for
+--room kWh, first through the old multi-step flow (read battery, check
+capacity in Python, update_battery_level, create_trade: one session each)
+and then through execute_battery_trade_async (one transaction with a
+conditional UPDATE). Reports throughput, commits per request and whether the
+battery was overfilled.
+
+Usage:
+    python benchmarks/trade_execution.py [--requests 200] [--concurrency 20] [--room 50]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+from common import use_scratch_database, seed_user
+
+
+async def legacy_buy(database, user_id: int, quantity: float, price: float) -> bool:
+    """The pre-transaction /buy flow, kept here for comparison."""
+    battery = await database.get_battery_status_async(user_id)
+    current_level = battery.get("current_level", 0)
+    capacity = battery.get("capacity", 100.0)
+    remaining_capacity = capacity - (current_level / 100.0) * capacity
+    if quantity > remaining_capacity:
+        return False
+    new_level = min(current_level + quantity / capacity * 100, 100.0)
+    if not await database.update_battery_level_async(user_id, new_level):
+        return False
+    return await database.create_trade_async({
+        "User_ID": user_id, "type": "buy", "quantity": quantity, "price": price,
+        "status": "executed", "execution_time": database.datetime.now(), "market": "Electricity",
+    })
+
+
+async def atomic_buy(database, user_id: int, quantity: float, price: float) -> bool:
+    result = await database.execute_battery_trade_async(user_id, "buy", quantity, price)
+    return "error" not in result
+
+
+async def run_flow(name: str, buy, args, user_id: int) -> dict:
+    from sqlalchemy import event, delete
+    import Python_Assignment.database as database
+
+    db = database.get_async_db()
+    # Start every flow from the same state: no trades, battery with exactly `room` kWh free
+    async with db.Session() as session, session.begin():
+        await session.execute(delete(database.Trade).where(database.Trade.User_ID == user_id))
+    capacity = (await database.get_battery_status_async(user_id))["capacity"]
+    await database.update_battery_level_async(user_id, (capacity - args.room) / capacity * 100)
+
+    commits = 0
+
+    def count_commit(connection):
+        nonlocal commits
+        commits += 1
+
+    event.listen(db.engine.sync_engine, "commit", count_commit)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one():
+        async with semaphore:
+            return await buy(database, user_id, 1.0, 50.0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    event.remove(db.engine.sync_engine, "commit", count_commit)
+
+    accepted = sum(results)
+    trades = await database.get_user_trades_async(user_id, cache_bypass=True)
+    battery = await database.get_battery_status_async(user_id)
+    stored = battery["current_energy"] - (capacity - args.room)
+    return {
+        "flow": name,
+        "trades_per_second": round(args.requests / elapsed, 1),
+        "accepted": accepted,
+        "trades_recorded": len(trades),
+        "energy_added_kwh": round(stored, 3),
+        "commits_per_request": round(commits / args.requests, 2),
+        # Correct iff every recorded trade is reflected in the battery and it never overfills
+        "consistent": len(trades) == round(stored) and len(trades) <= args.room,
+    }
+
+
+async def main(args):
+    import Python_Assignment.database as database
+
+    user_id = seed_user()
+    results = [
+        await run_flow("multi_step", legacy_buy, args, user_id),
+        await run_flow("single_transaction", atomic_buy, args, user_id),
+    ]
+    await database.get_async_db().dispose()
+    print(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--room", type=int, default=50, help="free battery capacity in kWh at the start")
+    args = parser.parse_args()
+    use_scratch_database()
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
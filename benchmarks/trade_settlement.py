@@ -0,0 +1,141 @@
+"""
+Scheduled trade settlement benchmark.
+
+Inserts --trades due pending trades (alternating small buys and sells over
+--users users, 15/30/60-minute resolutions, plus a few sells no battery can
+cover) and drains them with TradeSettlementScheduler.run_once at several batch
+sizes and worker counts. Batch size 1 with one worker is the one-transaction-
+per-trade baseline. Reports trades/sec per configuration, then checks:
+trades inside the seeded market data settle at its close, trades outside it
+at the synthetic price, uncoverable sells are cancelled, and the rollups
+still match the trades. Finally runs the scheduler loop itself and waits for
+it to settle a round of trades on its own.
+
+Usage:
+    python benchmarks/trade_settlement.py [--trades 2000] [--users 20]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")  # seeding users is not what is measured
+
+from common import use_scratch_database, seed_user, seed_market_data
+
+CONFIGURATIONS = [(1, 1), (50, 1), (200, 1), (200, 2), (200, 4)]  # (batch size, workers)
+
+
+def insert_pending_trades(user_ids, count: int, start: datetime) -> datetime:
+    """count due pending trades, 5 minutes apart from start; every 100th is an oversized sell. Returns the last time."""
+    from Python_Assignment.database import get_db, Trade, rebuild_trade_rollups
+
+    rows, when = [], start
+    for i in range(count):
+        when = start + timedelta(minutes=5 * i)
+        oversized = i % 100 == 99
+        rows.append({
+            "User_ID": user_ids[i % len(user_ids)],
+            "type": "sell" if oversized or (i // len(user_ids)) % 2 else "buy",
+            "quantity": 10000.0 if oversized else 0.5,
+            "status": "pending",
+            "execution_time": when,
+            "created_at": when - timedelta(hours=1),
+            "resolution": (15, 30, 60)[i % 3],
+            "market": "Germany",
+        })
+    get_db().bulk_insert(Trade, rows)
+    rebuild_trade_rollups()  # bulk_insert skips the rollup maintenance of create_trade
+    return when
+
+
+async def drain(scheduler):
+    started = time.perf_counter()
+    settled = transactions = 0
+    while True:
+        run = await scheduler.run_once()
+        if not run["pulled"]:
+            break
+        settled += run["settled"]
+        transactions += -(-run["pulled"] // scheduler.batch_size)
+    elapsed = time.perf_counter() - started
+    return {
+        "settled": settled,
+        "transactions": transactions,
+        "seconds": round(elapsed, 2),
+        "trades_per_second": round(settled / elapsed, 1),
+    }
+
+
+def check_outcomes(market_days: int):
+    """Settlement prices and statuses against what the seeded data says they should be."""
+    from sqlalchemy import select, func
+    from Python_Assignment.database import get_db, Trade, check_trade_rollups
+    from Python_Assignment.utils.synthetic import synthetic_current_price
+
+    seeded_until = datetime(2020, 1, 1) + timedelta(days=market_days)
+    with get_db().Session() as session:
+        by_status = dict(session.execute(select(Trade.status, func.count()).group_by(Trade.status)).all())
+        trades = session.execute(select(Trade.execution_time, Trade.price, Trade.quantity, Trade.status)).all()
+    wrong_price = 0
+    for execution_time, price, quantity, status in trades:
+        if status != "executed":
+            continue
+        expected = 50.0 if execution_time < seeded_until else synthetic_current_price("Germany", execution_time)
+        wrong_price += abs(price - expected) > 1e-9
+    return {
+        "by_status": by_status,
+        "oversized_sells_cancelled": all(status == "cancelled" for _, _, quantity, status in trades if quantity > 1000),
+        "executed_at_wrong_price": wrong_price,
+        "rollup_mismatches": len(check_trade_rollups()),
+    }
+
+
+async def run_live(user_ids, start: datetime):
+    """The scheduler loop on a short interval settles newly due trades by itself."""
+    from Python_Assignment.database import get_pending_trades
+    from Python_Assignment.settlement import TradeSettlementScheduler
+
+    insert_pending_trades(user_ids, 20, start)
+    scheduler = TradeSettlementScheduler(interval=0.1, batch_size=50, concurrency=2, enabled=True)
+    scheduler.start()
+    deadline = time.perf_counter() + 10
+    while get_pending_trades(limit=1) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    await scheduler.stop()
+    return {"pending_left": len(get_pending_trades()), **{k: scheduler.stats()[k] for k in ("executed", "cancelled")}}
+
+
+def main(args):
+    from Python_Assignment.settlement import TradeSettlementScheduler, SETTLEMENT_LAG
+
+    user_ids = [seed_user(f"settle{i}@example.com") for i in range(args.users)]
+    seed_market_data(args.market_days)
+
+    results = {}
+    start = datetime(2020, 1, 1)
+    for batch_size, workers in CONFIGURATIONS:
+        # Alternate between seeded days and days without market data (synthetic prices)
+        last = insert_pending_trades(user_ids, args.trades, start)
+        scheduler = TradeSettlementScheduler(batch_size=batch_size, concurrency=workers, enabled=False)
+        results[f"batch_{batch_size}_workers_{workers}"] = asyncio.run(drain(scheduler))
+        start = last + timedelta(minutes=5)
+
+    results["checks"] = check_outcomes(args.market_days)
+    results["live_scheduler"] = asyncio.run(run_live(user_ids, datetime.now() - timedelta(hours=2)))
+    lag = SETTLEMENT_LAG.snapshot().get((), {"count": 0})
+    results["lag_observations"] = lag["count"]
+    print(json.dumps({"trades_per_configuration": args.trades, **results}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--market-days", type=int, default=30)
+    use_scratch_database()
+    logging.getLogger("Python_Assignment").setLevel(logging.ERROR)
+    main(parser.parse_args())
@@ -1,21 +1,107 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, func, text
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, func, text, select, update, delete, insert, tuple_, union_all, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker, relationship, aliased, Session
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List, Optional
+from datetime import datetime, timedelta, timezone, time
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Iterator, AsyncIterator
 import logging
 import os
 import json
-import math
-import random
+import base64
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from itertools import islice
+from operator import itemgetter
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database file location
-DATABASE_URL = "sqlite:///./energy_trading.db"
+# Database file location (overridable so benchmarks can point at a scratch database)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./energy_trading.db")
+# Same database through the aiosqlite driver, used by the async engine
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+# SQLite connection profiles, applied as PRAGMAs on every new pooled connection.
+# "tuned" lets readers proceed while a writer commits (WAL) and only fsyncs at
+# checkpoints; "default" is SQLite's own behaviour (rollback journal, fsync per commit).
+SQLITE_PROFILES = {
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "cache_size": -64 * 1024,  # negative = KiB, i.e. 64 MiB page cache per connection
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms to wait on a locked database before raising
+    },
+    "default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+}
+
+def _sqlite_profile_from_env() -> Dict[str, Any]:
+    """Selected profile (SQLITE_PROFILE) with per-PRAGMA overrides, e.g. SQLITE_CACHE_SIZE=-131072."""
+    profile = dict(SQLITE_PROFILES.get(os.getenv("SQLITE_PROFILE", "tuned"), SQLITE_PROFILES["tuned"]))
+    for pragma, value in profile.items():
+        override = os.getenv(f"SQLITE_{pragma.upper()}")
+        if override is not None:
+            profile[pragma] = int(override) if isinstance(value, int) else override
+    return profile
+
+SQLITE_PRAGMAS = _sqlite_profile_from_env()
+
+# Connection pool shared by both engines (each engine gets its own pool of this size)
+POOL_CONFIG = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),  # seconds to wait for a free connection
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+}
+
+# Rows fetched per server-side cursor batch by stream_rows (ndjson/csv exports)
+STREAM_BATCH_SIZE = int(os.getenv("DB_STREAM_BATCH_SIZE", "1000"))
+# Rows per executemany call in bulk_insert / bulk_upsert
+BULK_CHUNK_SIZE = int(os.getenv("DB_BULK_CHUNK_SIZE", "5000"))
+# One-off migration switch: let create_indexes delete duplicate natural keys (keeping
+# the newest row) so their unique index can be added. Without it startup refuses.
+DROP_DUPLICATE_KEYS = os.getenv("DB_DROP_DUPLICATE_KEYS", "false").lower() in ("1", "true", "yes")
+
+def _install_sqlite_pragmas(engine, pragmas: Dict[str, Any]):
+    """Run the profile's PRAGMAs on every DBAPI connection the engine's pool opens."""
+    statements = [f"PRAGMA {pragma}={value}" for pragma, value in pragmas.items()]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", on_connect)
+
+def _read_sqlite_pragmas(connection, pragmas) -> Dict[str, Any]:
+    """Read back the effective PRAGMA values on a live connection."""
+    effective = {}
+    for pragma in pragmas:
+        value = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        effective[pragma] = value.upper() if isinstance(value, str) else value
+    return effective
+
+def _pool_status(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    status = {"class": type(pool).__name__, **POOL_CONFIG}
+    if hasattr(pool, "checkedout"):
+        status.update({"checked_out": pool.checkedout(), "checked_in": pool.checkedin(), "overflow": pool.overflow()})
+    return status
 
 # Create SQLAlchemy Base
 Base = declarative_base()
@@ -50,6 +136,10 @@ class Portfolio(Base):
     # Relationships
     user = relationship("User", back_populates="portfolio")
 
+    __table_args__ = (
+        Index("ix_portfolios_user_id", "User_ID"),
+    )
+
 
 class Battery(Base):
     __tablename__ = "batteries"
@@ -67,6 +157,10 @@ class Battery(Base):
     # Relationships
     user = relationship("User", back_populates="battery")
 
+    __table_args__ = (
+        Index("ix_batteries_user_id", "User_ID"),
+    )
+
 
 class Trade(Base):
     __tablename__ = "trades"
@@ -87,6 +181,14 @@ class Trade(Base):
     # Relationships
     user = relationship("User", back_populates="trades")
 
+    __table_args__ = (
+        # get_user_trades: WHERE User_ID = ? [AND execution_time range] ORDER BY execution_time.
+        # The trailing columns make it covering for the trade aggregates (index-only scan).
+        Index("ix_trades_user_execution_time_totals", "User_ID", "execution_time", "Trade_ID", "type", "status", "quantity", "price"),
+        # get_pending_trades: WHERE status = 'pending' AND execution_time <= ? ORDER BY execution_time
+        Index("ix_trades_status_execution_time", "status", "execution_time"),
+    )
+
 
 class MarketData(Base):
     __tablename__ = "market_data"
@@ -103,6 +205,12 @@ class MarketData(Base):
     transaction_volume = Column(Float)
     created_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # get_market_data / get_market_data_today (also behind /current), and the
+        # conflict target of bulk_upsert (one row per market, day and period)
+        Index("ux_market_data_market_day_period", "market", "delivery_day", "delivery_period", unique=True),
+    )
+
 
 class HistoricalMarketData(Base):
     __tablename__ = "historical_market_data"
@@ -126,6 +234,11 @@ class HistoricalMarketData(Base):
     contract_close_time = Column(String)
     created_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # Conflict target of bulk_upsert; also serves the market store's per-market load
+        Index("ux_historical_market_data_key", "market", "date", "resolution", "delivery_period", unique=True),
+    )
+
 
 class Forecast(Base):
     __tablename__ = "forecasts"
@@ -139,23 +252,578 @@ class Forecast(Base):
     confidence = Column(Float)
     created_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        Index("ix_forecasts_market_timestamp", "market", "timestamp"),
+    )
+
+class MarketDataVersion(Base):
+    """
+    Write counter per market data table, market and delivery month. Every write to
+    MarketData or HistoricalMarketData bumps it in the same transaction (see
+    _bump_market_versions), so a cache in any process can tell which months it
+    holds have changed since it read them.
+    """
+    __tablename__ = "market_data_versions"
+
+    table_name = Column(String, primary_key=True)
+    market = Column(String, primary_key=True)
+    month = Column(String, primary_key=True)  # YYYY-MM of the delivery day
+    version = Column(Integer, nullable=False, default=0)
+
+class TradeRollup(Base):
+    """
+    Per-user, per-day trade totals by type and status. Kept in step with the
+    trades table by every trade write (see _apply_trade_to_rollup) so long-range
+    P&L reads O(days) rows instead of O(trades).
+    """
+    __tablename__ = "trade_rollups"
+
+    User_ID = Column(Integer, ForeignKey("users.User_ID"), primary_key=True)
+    day = Column(String, primary_key=True)  # YYYY-MM-DD of execution_time
+    type = Column(String, primary_key=True)  # lower-cased trade type
+    status = Column(String, primary_key=True)
+    trade_count = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0.0)  # SUM(quantity)
+    value = Column(Float, nullable=False, default=0.0)  # SUM(quantity * price)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Precompiled row converters for the column-projection query path.
+# Each converter turns a plain result tuple (columns in table order) into the same
+# dict shape execute_query produces, without loading ORM objects or re-inspecting
+# the table for every row.
+def _row_key_positions(model_class, alias_keys: bool = True) -> Tuple[Tuple[str, ...], List[int]]:
+    """Dict keys of a converted row and the column position each one is read from."""
+    keys = [column.name for column in model_class.__table__.columns]
+    positions = list(range(len(keys)))
+
+    # Mirror execute_query's consistent naming: User_ID also as user_id and vice versa
+    if alias_keys:
+        for position, name in enumerate(list(keys)):
+            if name.endswith('_ID') and name[:-3].lower() + '_id' not in keys:
+                keys.append(name[:-3].lower() + '_id')
+                positions.append(position)
+            elif name.endswith('_id') and name[:-3].upper() + '_ID' not in keys:
+                keys.append(name[:-3].upper() + '_ID')
+                positions.append(position)
+    return tuple(keys), positions
+
+def row_keys(model_class, alias_keys: bool = True) -> Tuple[str, ...]:
+    """Keys of the row dicts fetch_rows/stream_rows return for a model, in order (e.g. CSV headers)."""
+    return _row_key_positions(model_class, alias_keys)[0]
+
+def _build_row_converter(model_class, alias_keys: bool = True):
+    columns = list(model_class.__table__.columns)
+    keys, positions = _row_key_positions(model_class, alias_keys)
+    getter = itemgetter(*positions)
+    datetime_keys = tuple(
+        key for key, position in zip(keys, positions)
+        if isinstance(columns[position].type, DateTime)
+    )
+
+    if not datetime_keys:
+        def convert(row):
+            return dict(zip(keys, getter(row)))
+        return convert
+
+    def convert(row):
+        row_dict = dict(zip(keys, getter(row)))
+        for key in datetime_keys:
+            value = row_dict[key]
+            if value is not None:
+                row_dict[key] = value.isoformat()
+        return row_dict
+    return convert
+
+# Built once at import: {model_class: {alias_keys: converter}}
+_ROW_CONVERTERS = {
+    model_class: {
+        True: _build_row_converter(model_class, alias_keys=True),
+        False: _build_row_converter(model_class, alias_keys=False),
+    }
+    for model_class in (User, Portfolio, Battery, Trade, MarketData, HistoricalMarketData, Forecast)
+}
+
+def select_columns(model_class):
+    """A Core select() of every column of a model, in the order the row converters expect."""
+    return select(*model_class.__table__.columns)
+
+def _trade_sort_key(execution_time) -> datetime:
+    """
+    Parsed execution_time used to order cached trades. Missing times sort oldest,
+    like SQLite NULLs, and are left out of date-range lookups.
+    """
+    if execution_time is None:
+        return datetime.min
+    if isinstance(execution_time, str):
+        return datetime.fromisoformat(execution_time)
+    return execution_time
+
+def _estimate_rows_bytes(rows: List[Dict[str, Any]]) -> int:
+    """Approximate memory held by a list of same-shaped row dicts, sampled from the first row."""
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[0]
+    row_bytes = sys.getsizeof(sample) + sum(sys.getsizeof(value) for value in sample.values())
+    # Each row also costs a list slot in the rows list and a parsed datetime in the timestamp list
+    return sys.getsizeof(rows) + len(rows) * (row_bytes + 8 + 8 + sys.getsizeof(datetime.min))
+
+class UserTradesCache:
+    """
+    Bounded LRU cache of each user's full trade history, newest first.
+
+    Entries are keyed by (user_id, alias_keys) and hold the rows as returned by
+    get_user_trades together with their parsed execution times in ascending
+    order, so a date-range lookup is two bisects and a slice. Writes go through
+    the cache: new trades are inserted in place, other changes invalidate the
+    user's entries. Entries expire after ttl seconds and the least recently
+    used ones are evicted when max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl: int = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (user_id, alias_keys) -> entry dict
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        user_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        alias_keys: bool = True
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return the user's trades (optionally within [start_date, end_date]), or None on a miss."""
+        key = (user_id, alias_keys)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (datetime.now() - entry["stored_at"]).total_seconds() >= self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            trades = entry["trades"]
+            if not start_date and not end_date:
+                return trades
+
+            # times is ascending while trades is newest first, so map the bisect
+            # positions onto the reversed list
+            times = entry["times"]
+            # Undated trades (datetime.min) fall outside every range, as in SQL
+            lo = bisect_left(times, start_date) if start_date else bisect_right(times, datetime.min)
+            hi = bisect_right(times, end_date) if end_date else len(times)
+            return trades[len(times) - hi:len(times) - lo]
+
+    def put(self, user_id: int, trades: List[Dict[str, Any]], alias_keys: bool = True):
+        """Store a user's full trade history (newest first, as get_user_trades returns it)."""
+        times = [_trade_sort_key(trade.get("execution_time")) for trade in reversed(trades)]
+        nbytes = _estimate_rows_bytes(trades)
+        if nbytes > self.max_bytes:
+            logger.debug(f"Not caching {len(trades)} trades for user {user_id}: larger than the cache budget")
+            return
+        key = (user_id, alias_keys)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {"trades": trades, "times": times, "bytes": nbytes, "stored_at": datetime.now()}
+            self._bytes += nbytes
+            self._evict()
+
+    def add_trade(self, user_id: int, row: tuple):
+        """
+        Write-through for a newly inserted trade: insert it into every cached view
+        of the user's history. row holds the trade's column values in table order.
+        """
+        with self._lock:
+            for alias_keys in (True, False):
+                entry = self._entries.get((user_id, alias_keys))
+                if entry is None:
+                    continue
+                trade = _ROW_CONVERTERS[Trade][alias_keys](row)
+                sort_key = _trade_sort_key(trade["execution_time"])
+                position = bisect_right(entry["times"], sort_key)
+                insort(entry["times"], sort_key)
+                entry["trades"].insert(len(entry["times"]) - 1 - position, trade)
+                grown = _estimate_rows_bytes(entry["trades"]) - entry["bytes"]
+                entry["bytes"] += grown
+                self._bytes += grown
+            self._evict()
+
+    def invalidate(self, user_id: int):
+        """Drop every cached view of a user's trades."""
+        with self._lock:
+            for alias_keys in (True, False):
+                if (user_id, alias_keys) in self._entries:
+                    self._remove((user_id, alias_keys))
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["bytes"]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of verified access tokens: token -> the principal dict
+    get_current_user returns. An entry expires at the earlier of its token's
+    exp claim and ttl seconds after it was stored, and every entry of a user is
+    dropped when that user's row is updated or deleted through this module.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (principal, expires_at epoch seconds)
+        self._tokens_by_user = {}  # User_ID -> set of tokens
+        self._generations = {}  # User_ID -> number of invalidations
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, user_id: int) -> int:
+        """Read before loading a user; pass it to put so a load that raced an invalidation is not cached."""
+        return self._generations.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """The cached principal for a token, or None on a miss or once it expired."""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or entry[1] <= datetime.now().timestamp():
+                if entry is not None:
+                    self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, principal: Dict[str, Any], token_expires_at: Optional[float] = None,
+            generation: Optional[int] = None):
+        """Store a principal verified from token; token_expires_at is its exp claim."""
+        expires_at = datetime.now().timestamp() + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        user_id = principal["User_ID"]
+        with self._lock:
+            if generation is not None and generation != self._generations.get(user_id, 0):
+                return
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (principal, expires_at)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of a user (deactivated, changed or deleted)."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "users": len(self._tokens_by_user),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, token: str):
+        principal, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(principal["User_ID"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[principal["User_ID"]]
+
 # Cache for user trades to avoid repeated DB calls
-_user_trades_cache = {}
-_user_trades_cache_ttl = 300  # 5 minutes TTL
-_user_trades_cache_last_updated = {}
+_user_trades_cache = UserTradesCache(
+    max_entries=int(os.getenv("TRADES_CACHE_MAX_ENTRIES", "256")),
+    max_bytes=int(os.getenv("TRADES_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=int(os.getenv("TRADES_CACHE_TTL", "300")),  # 5 minutes TTL
+)
+
+# Verified access tokens, so authenticated requests skip the JWT decode and the users query
+_principal_cache = PrincipalCache(
+    max_entries=int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000")),
+    ttl=int(os.getenv("AUTH_CACHE_TTL", "300")),
+)
 
-# Global database instance for singleton pattern
+# Global database instances for singleton pattern
 _db_instance = None
+_async_db_instance = None
+
+def _result_to_dicts(result) -> List[Dict[str, Any]]:
+    """
+    Convert the return value of a query function into a list of dictionaries.
+    Shared by the sync and async database classes so both return identical rows.
+    """
+    if hasattr(result, 'all'):
+        # This is a SQLAlchemy query result that can be iterated
+        rows = result.all()
+        result_list = []
+        for row in rows:
+            row_dict = {}
+            if hasattr(row, '_asdict'):  # For SQLAlchemy Row objects
+                row_dict = row._asdict()
+            elif hasattr(row, '__table__'):  # For SQLAlchemy ORM models
+                for column in row.__table__.columns:
+                    # Use column.key to get the Python attribute name
+                    value = getattr(row, column.key, None)
+                    # Use column.name for the dict key (DB column name)
+                    row_dict[column.name] = value
+            elif isinstance(row, dict):  # Already a dict
+                row_dict = row
+            else:  # Fallback for other types
+                try:
+                    row_dict = dict(row)
+                except (TypeError, ValueError):
+                    # Last resort: try to convert using __dict__
+                    if hasattr(row, '__dict__'):
+                        row_dict = row.__dict__
+                        # Remove SQLAlchemy internal attributes
+                        if '_sa_instance_state' in row_dict:
+                            del row_dict['_sa_instance_state']
+
+            # Convert datetime objects to ISO format strings
+            for key, value in row_dict.items():
+                if isinstance(value, datetime):
+                    row_dict[key] = value.isoformat()
+
+            # Make sure primary keys use consistent naming (both ID and _id forms)
+            for key in list(row_dict.keys()):
+                if key.endswith('_ID') and key[:-3].lower() + '_id' not in row_dict:
+                    row_dict[key[:-3].lower() + '_id'] = row_dict[key]
+                elif key.endswith('_id') and key[:-3].upper() + '_ID' not in row_dict:
+                    row_dict[key[:-3].upper() + '_ID'] = row_dict[key]
+
+            result_list.append(row_dict)
+
+        logger.debug("Query returned %s rows", len(result_list))
+        return result_list
+    elif result is None:
+        return []
+    elif hasattr(result, '__table__'):  # Single SQLAlchemy ORM model
+        # Convert the single ORM model to a dictionary
+        row_dict = {}
+        for column in result.__table__.columns:
+            value = getattr(result, column.key, None)
+            row_dict[column.name] = value
+
+            # Also add lowercase version of ID fields for consistency
+            if column.name.endswith('_ID'):
+                row_dict[column.name[:-3].lower() + '_id'] = value
+
+        # Convert datetime objects to ISO format strings
+        for key, value in row_dict.items():
+            if isinstance(value, datetime):
+                row_dict[key] = value.isoformat()
+
+        return [row_dict]
+    else:
+        # For non-query results (like count)
+        return [{"result": result}]
+
+# Indexes earlier versions created that a declared index has since replaced; only
+# these are dropped by create_indexes, any other index found in the file is left alone
+SUPERSEDED_INDEXES = {
+    "ix_trades_user_execution_time": "ix_trades_user_execution_time_totals",
+    "ix_market_data_market_day_period": "ux_market_data_market_day_period",
+}
+
+# Natural keys used by bulk_upsert, each backed by a unique index on the model
+UPSERT_KEYS = {
+    MarketData: ("market", "delivery_day", "delivery_period"),
+    HistoricalMarketData: ("market", "date", "resolution", "delivery_period"),
+}
+
+
+def _count_duplicate_keys(connection, index: Index) -> int:
+    """Rows that would have to go before the unique index can be created (all but one per key)."""
+    table = index.table.name
+    columns = ", ".join(f'"{column.name}"' for column in index.columns)
+    return connection.exec_driver_sql(
+        f'SELECT COALESCE(SUM(n - 1), 0) FROM (SELECT COUNT(*) AS n FROM "{table}" '
+        f'GROUP BY {columns} HAVING COUNT(*) > 1)'
+    ).scalar()
+
+
+def _drop_duplicate_keys(connection, index: Index, allowed: bool):
+    """
+    Before a unique index is added to an existing table, keep only the newest row per key.
+    Deleting rows is opt-in (DB_DROP_DUPLICATE_KEYS): otherwise raise so startup stops
+    with the counts instead of silently removing data.
+    """
+    table = index.table.name
+    duplicates = _count_duplicate_keys(connection, index)
+    if not duplicates:
+        return
+    if not allowed:
+        raise RuntimeError(
+            f"{table} has {duplicates} rows with a duplicate ({', '.join(c.name for c in index.columns)}) key, "
+            f"so unique index {index.name} cannot be created. Remove them, or restart once with "
+            f"DB_DROP_DUPLICATE_KEYS=true to keep only the newest row per key."
+        )
+    columns = ", ".join(f'"{column.name}"' for column in index.columns)
+    result = connection.exec_driver_sql(
+        f'DELETE FROM "{table}" WHERE rowid NOT IN (SELECT MAX(rowid) FROM "{table}" GROUP BY {columns})'
+    )
+    logger.warning(f"DB_DROP_DUPLICATE_KEYS: deleted {result.rowcount} duplicate rows from {table} "
+                   f"before creating {index.name}")
+
+
+# Delivery day column of each versioned market data table (see MarketDataVersion)
+VERSIONED_DAY_COLUMNS = {
+    MarketData.__tablename__: "delivery_day",
+    HistoricalMarketData.__tablename__: "date",
+}
+
+def _row_months(table, columns: List[str], parameters: List[Dict[str, Any]]) -> set:
+    """(market, YYYY-MM) pairs written by a bulk chunk; rows without "market" get its column default."""
+    day_column = VERSIONED_DAY_COLUMNS[table.name]
+    if "market" in columns:
+        return {(row["market"], str(row[day_column])[:7]) for row in parameters}
+    default = table.columns["market"].default.arg
+    return {(default, str(row[day_column])[:7]) for row in parameters}
+
+def _bump_market_versions(connection, table_name: str, months: Iterable[Tuple[str, str]]):
+    """Increment the MarketDataVersion of each (market, month) of table_name, in the caller's transaction."""
+    values = [
+        {"table_name": table_name, "market": market, "month": month, "version": 1}
+        for market, month in sorted(set(months)) if market is not None
+    ]
+    if not values:
+        return
+    statement = sqlite_insert(MarketDataVersion).values(values)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["table_name", "market", "month"], set_={"version": MarketDataVersion.version + 1}
+    ))
+
+def _market_versions_select(market: str, table_names: Iterable[str], first_month: Optional[str] = None,
+                            last_month: Optional[str] = None):
+    statement = select(MarketDataVersion.table_name, MarketDataVersion.month, MarketDataVersion.version).where(
+        MarketDataVersion.table_name.in_(list(table_names)), MarketDataVersion.market == market
+    )
+    if first_month:
+        statement = statement.where(MarketDataVersion.month >= first_month)
+    if last_month:
+        statement = statement.where(MarketDataVersion.month <= last_month)
+    return statement
+
+def get_market_versions(
+    market: str,
+    table_names: Iterable[str] = tuple(VERSIONED_DAY_COLUMNS),
+    first_month: Optional[str] = None,
+    last_month: Optional[str] = None
+) -> Dict[Tuple[str, str], int]:
+    """MarketDataVersion by (table_name, month) for one market; months never written are absent (version 0)."""
+    with get_db().engine.connect() as connection:
+        rows = connection.execute(_market_versions_select(market, table_names, first_month, last_month))
+        return {(table_name, month): version for table_name, month, version in rows}
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_market_versions(session, flush_context):
+    """Bump the months of MarketData / HistoricalMarketData rows an ORM flush wrote, moved or deleted."""
+    months = {}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table_name = getattr(obj, "__tablename__", None)
+        if table_name not in VERSIONED_DAY_COLUMNS:
+            continue
+        day_column = VERSIONED_DAY_COLUMNS[table_name]
+        state = inspect(obj)
+        # A row moved to another day or market also changes its old month
+        markets = {obj.market, *state.attrs.market.history.deleted}
+        days = {getattr(obj, day_column), *getattr(state.attrs, day_column).history.deleted}
+        months.setdefault(table_name, set()).update(
+            (market, str(day)[:7]) for market in markets for day in days if day is not None
+        )
+    for table_name, table_months in months.items():
+        _bump_market_versions(session.connection(), table_name, table_months)
+
+def _row_chunks(rows: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bulk_parameters(table, chunk: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    executemany needs the same keys in every parameter set: take the table columns
+    present in the first row and fill gaps with None. Columns missing from the first
+    row get their Python-side defaults (e.g. created_at).
+    """
+    columns = [name for name in chunk[0] if name in table.columns]
+    return columns, [{name: row.get(name) for name in columns} for row in chunk]
 
 class SQLAlchemyDatabase:
-    def __init__(self):
+    def __init__(self, database_url: str = None, pragmas: Dict[str, Any] = None):
         """
-        Initializes a SQLAlchemy engine and session
+        Initializes a SQLAlchemy engine and session.
+        database_url and pragmas default to DATABASE_URL and the configured SQLite profile.
         """
         self.engine = None
         self.Session = None
+        self.pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
         try:
-            self.engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+            self.engine = create_engine(
+                database_url or DATABASE_URL,
+                echo=False,
+                connect_args={"check_same_thread": False},
+                **POOL_CONFIG
+            )
+            _install_sqlite_pragmas(self.engine, self.pragmas)
             self.Session = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
             logger.info("SQLAlchemy engine initialized successfully")
         except Exception as e:
@@ -163,13 +831,64 @@ class SQLAlchemyDatabase:
             raise
     
     def create_tables(self):
-        """Create all tables in the database"""
+        """
+        Create all tables and bring an existing database file up to date, in one
+        transaction: if any step fails (e.g. duplicate keys, see create_indexes)
+        nothing of the migration is left behind and the error is raised.
+        """
         try:
-            Base.metadata.create_all(self.engine)
+            with self.engine.begin() as connection:
+                # pysqlite runs DDL outside any transaction unless one is opened
+                # explicitly; IMMEDIATE also serializes workers migrating at once
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+                Base.metadata.create_all(connection)
+                self.create_indexes(connection)
+                if _trade_rollups_missing(connection):
+                    # New rollup table on an existing database file: backfill it from its trades
+                    count = _rebuild_trade_rollups(connection)
+                    logger.info(f"Backfilled {count} trade rollup rows")
             logger.info("Database tables created successfully")
         except Exception as e:
             logger.error(f"Error creating database tables: {e}")
             raise
+
+    def connection_profile(self) -> Dict[str, Any]:
+        """Effective SQLite PRAGMAs on a pooled connection plus the pool configuration and usage."""
+        with self.engine.connect() as connection:
+            pragmas = _read_sqlite_pragmas(connection, self.pragmas)
+        return {"pragmas": pragmas, "pool": _pool_status(self.engine)}
+
+    def create_indexes(self, connection, drop_duplicates: bool = DROP_DUPLICATE_KEYS) -> List[str]:
+        """
+        Migration step for existing database files, run on the caller's connection
+        and transaction: create_all only creates indexes together with new tables,
+        so add any declared index that is still missing and then drop the
+        SUPERSEDED_INDEXES it replaces.
+        A missing unique index over duplicate keys raises unless drop_duplicates is set.
+        Returns the names of the indexes that were created.
+        """
+        created = []
+        existing = {
+            row[0] for row in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing:
+                    if index.unique:
+                        _drop_duplicate_keys(connection, index, drop_duplicates)
+                    index.create(connection)
+                    created.append(index.name)
+        for name, replacement in SUPERSEDED_INDEXES.items():
+            if name in existing:
+                connection.exec_driver_sql(f'DROP INDEX "{name}"')
+                logger.info(f"Dropped index {name}, superseded by {replacement}")
+        if created:
+            # Refresh planner statistics so the new indexes are picked up right away
+            connection.exec_driver_sql("ANALYZE")
+            logger.info(f"Created missing indexes: {', '.join(created)}")
+        return created
     
     def execute_query(self, query_func, timeout: int = 60) -> List[Dict[str, Any]]:
         """
@@ -177,80 +896,9 @@ class SQLAlchemyDatabase:
         The query_func should accept a session parameter and return a query result.
         """
         try:
-            logger.info(f"Executing SQLAlchemy query with timeout={timeout}s")
-            
+            # Statement timings are recorded by the cursor event hooks in metrics.py
             with self.Session() as session:
-                start_time = datetime.now()
-                result = query_func(session)
-                query_time = (datetime.now() - start_time).total_seconds()
-                logger.info(f"Query executed in {query_time:.2f} seconds")
-                
-                # Convert results to a list of dicts
-                if hasattr(result, 'all'):
-                    # This is a SQLAlchemy query result that can be iterated
-                    rows = result.all()
-                    result_list = []
-                    for row in rows:
-                        row_dict = {}
-                        if hasattr(row, '_asdict'):  # For SQLAlchemy Row objects
-                            row_dict = row._asdict()
-                        elif hasattr(row, '__table__'):  # For SQLAlchemy ORM models
-                            for column in row.__table__.columns:
-                                # Use column.key to get the Python attribute name
-                                value = getattr(row, column.key, None)
-                                # Use column.name for the dict key (DB column name)
-                                row_dict[column.name] = value
-                        elif isinstance(row, dict):  # Already a dict
-                            row_dict = row
-                        else:  # Fallback for other types
-                            try:
-                                row_dict = dict(row)
-                            except (TypeError, ValueError):
-                                # Last resort: try to convert using __dict__
-                                if hasattr(row, '__dict__'):
-                                    row_dict = row.__dict__
-                                    # Remove SQLAlchemy internal attributes
-                                    if '_sa_instance_state' in row_dict:
-                                        del row_dict['_sa_instance_state']
-                        
-                        # Convert datetime objects to ISO format strings
-                        for key, value in row_dict.items():
-                            if isinstance(value, datetime):
-                                row_dict[key] = value.isoformat()
-                        
-                        # Make sure primary keys use consistent naming (both ID and _id forms)
-                        for key in list(row_dict.keys()):
-                            if key.endswith('_ID') and key[:-3].lower() + '_id' not in row_dict:
-                                row_dict[key[:-3].lower() + '_id'] = row_dict[key]
-                            elif key.endswith('_id') and key[:-3].upper() + '_ID' not in row_dict:
-                                row_dict[key[:-3].upper() + '_ID'] = row_dict[key]
-                        
-                        result_list.append(row_dict)
-                    
-                    logger.info(f"Query returned {len(result_list)} rows")
-                    return result_list
-                elif result is None:
-                    return []
-                elif hasattr(result, '__table__'):  # Single SQLAlchemy ORM model
-                    # Convert the single ORM model to a dictionary
-                    row_dict = {}
-                    for column in result.__table__.columns:
-                        value = getattr(result, column.key, None)
-                        row_dict[column.name] = value
-                        
-                        # Also add lowercase version of ID fields for consistency
-                        if column.name.endswith('_ID'):
-                            row_dict[column.name[:-3].lower() + '_id'] = value
-                    
-                    # Convert datetime objects to ISO format strings
-                    for key, value in row_dict.items():
-                        if isinstance(value, datetime):
-                            row_dict[key] = value.isoformat()
-                    
-                    return [row_dict]
-                else:
-                    # For non-query results (like count)
-                    return [{"result": result}]
+                return _result_to_dicts(query_func(session))
                 
         except Exception as e:
             error_type = type(e).__name__
@@ -259,6 +907,165 @@ class SQLAlchemyDatabase:
             logger.warning("Returning empty list due to query error")
             return []
     
+    def fetch_rows(self, statement, model_class, alias_keys: bool = True) -> List[Dict[str, Any]]:
+        """
+        Execute a column-projection select (see select_columns) and convert the plain
+        tuples with the model's precompiled converter. Much cheaper than execute_query
+        for large results because no ORM objects are built.
+        Set alias_keys=False to skip the duplicate user_id/User_ID style keys.
+        """
+        convert = _ROW_CONVERTERS[model_class][alias_keys]
+        try:
+            with self.engine.connect() as connection:
+                rows = connection.execute(statement).all()
+            return list(map(convert, rows))
+        except Exception as e:
+            logger.error(f"Projection query error on {model_class.__tablename__} ({type(e).__name__}): {str(e)}")
+            return []
+
+    def stream_rows(
+        self,
+        statement,
+        model_class,
+        alias_keys: bool = True,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Like fetch_rows, but yields the converted rows in batches of batch_size from a
+        server-side cursor (yield_per), so memory stays flat however many rows match.
+        Errors are logged and re-raised: a partial stream cannot be turned into [].
+        """
+        convert = _ROW_CONVERTERS[model_class][alias_keys]
+        try:
+            with self.engine.connect() as connection:
+                result = connection.execute(statement.execution_options(yield_per=batch_size))
+                for partition in result.partitions():
+                    yield list(map(convert, partition))
+        except Exception as e:
+            logger.error(f"Streaming query error on {model_class.__tablename__} ({type(e).__name__}): {str(e)}")
+            raise
+
+    def fetch_mappings(self, statement) -> List[Dict[str, Any]]:
+        """Execute an arbitrary select (e.g. an aggregate) and return each row as a dict keyed by label."""
+        try:
+            with self.engine.connect() as connection:
+                return [dict(row) for row in connection.execute(statement).mappings()]
+        except Exception as e:
+            logger.error(f"Query error ({type(e).__name__}): {str(e)}")
+            return []
+
+    def explain_query_plan(self, statement) -> List[str]:
+        """Return SQLite's EXPLAIN QUERY PLAN detail lines for a select statement."""
+        with self.engine.connect() as connection:
+            # render_postcompile expands IN (...) parameters into plain placeholders
+            compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+            params = tuple(compiled.params[name] for name in compiled.positiontup)
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        # Columns are (id, parent, notused, detail)
+        return [row[3] for row in rows]
+
+    def bulk_insert(
+        self,
+        model_class,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE
+    ) -> int:
+        """
+        Insert many rows (dicts keyed by column name) in one transaction, one
+        executemany call per chunk_size rows, without building ORM objects.
+        Returns the number of rows inserted. Core inserts skip the session hooks:
+        the MarketDataVersion of market data months is bumped here, and callers keep
+        this process's market store and Parquet cache in step (see market_ingest).
+        Errors are logged and re-raised; the transaction is rolled back.
+        """
+        table = model_class.__table__
+        count = 0
+        months = set()
+        try:
+            with self.engine.begin() as connection:
+                for chunk in _row_chunks(rows, chunk_size):
+                    columns, parameters = _bulk_parameters(table, chunk)
+                    connection.execute(insert(table), parameters)
+                    count += len(parameters)
+                    if table.name in VERSIONED_DAY_COLUMNS:
+                        months |= _row_months(table, columns, parameters)
+                _bump_market_versions(connection, table.name, months)
+            logger.info(f"Bulk inserted {count} rows into {table.name}")
+            return count
+        except Exception as e:
+            logger.error(f"Error bulk inserting into {table.name} ({type(e).__name__}): {str(e)}")
+            raise
+
+    def bulk_insert_columns(self, model_class, columns: Dict[str, List[Any]]) -> int:
+        """
+        Column-oriented bulk_insert for very large loads (e.g. seed_load_test): the
+        zipped column values go to the driver's executemany as they are, skipping
+        SQLAlchemy's per-value type processing and Python-side defaults. Values must
+        already be in storage form, e.g. DateTime as "YYYY-MM-DD HH:MM:SS.ffffff"
+        strings. One transaction; returns the row count. Errors are logged and re-raised.
+        """
+        table = model_class.__table__
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        placeholders = ", ".join("?" * len(columns))
+        statement = f'INSERT INTO "{table.name}" ({column_list}) VALUES ({placeholders})'
+        try:
+            rows = list(zip(*columns.values()))
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql(statement, rows)
+                if table.name in VERSIONED_DAY_COLUMNS:
+                    _bump_market_versions(connection, table.name, _row_months(
+                        table, list(columns), [dict(zip(columns, row)) for row in rows]
+                    ))
+            logger.info(f"Bulk inserted {len(rows)} rows into {table.name}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error bulk inserting into {table.name} ({type(e).__name__}): {str(e)}")
+            raise
+
+    def bulk_upsert(
+        self,
+        model_class,
+        rows: Iterable[Dict[str, Any]],
+        index_elements: Optional[Tuple[str, ...]] = None,
+        chunk_size: int = BULK_CHUNK_SIZE
+    ) -> int:
+        """
+        Like bulk_insert, but a row whose natural key (index_elements, by default
+        UPSERT_KEYS[model_class]) already exists overwrites the stored row's other
+        columns instead (INSERT ... ON CONFLICT DO UPDATE). Rows repeating a key
+        within the input: the last one wins. Returns the number of rows written.
+        """
+        table = model_class.__table__
+        keys = list(index_elements or UPSERT_KEYS[model_class])
+        count = 0
+        months = set()
+        try:
+            with self.engine.begin() as connection:
+                for chunk in _row_chunks(rows, chunk_size):
+                    columns, parameters = _bulk_parameters(table, chunk)
+                    missing = [key for key in keys if key not in columns]
+                    if missing:
+                        raise ValueError(f"Rows for {table.name} are missing key columns: {', '.join(missing)}")
+                    statement = sqlite_insert(table)
+                    updates = {
+                        name: statement.excluded[name] for name in columns
+                        if name not in keys and not table.columns[name].primary_key
+                    }
+                    if updates:
+                        statement = statement.on_conflict_do_update(index_elements=keys, set_=updates)
+                    else:
+                        statement = statement.on_conflict_do_nothing(index_elements=keys)
+                    connection.execute(statement, parameters)
+                    count += len(parameters)
+                    if table.name in VERSIONED_DAY_COLUMNS:
+                        months |= _row_months(table, columns, parameters)
+                _bump_market_versions(connection, table.name, months)
+            logger.info(f"Bulk upserted {count} rows into {table.name}")
+            return count
+        except Exception as e:
+            logger.error(f"Error bulk upserting into {table.name} ({type(e).__name__}): {str(e)}")
+            raise
+
     def insert_row(self, model_class, row_data: Dict[str, Any]) -> bool:
         """Insert a single row into a table."""
         try:
@@ -267,7 +1074,7 @@ class SQLAlchemyDatabase:
                 new_record = model_class(**row_data)
                 session.add(new_record)
                 session.commit()
-                logger.info(f"Inserted row into {model_class.__tablename__}")
+                logger.debug("Inserted row into %s", model_class.__tablename__)
                 return True
         except Exception as e:
             logger.error(f"Error inserting row into {model_class.__tablename__}: {str(e)}")
@@ -295,9 +1102,12 @@ class SQLAlchemyDatabase:
                 # Update the record with the provided data
                 for key, value in update_data.items():
                     setattr(record, key, value)
+                user_id = record.User_ID if model_class is User else None
                 
                 session.commit()
-                logger.info(f"Updated row in {model_class.__tablename__} where {condition_field}={condition_value}")
+                if user_id is not None:
+                    _principal_cache.invalidate_user(user_id)
+                logger.debug("Updated row in %s where %s=%s", model_class.__tablename__, condition_field, condition_value)
                 return True
         except Exception as e:
             logger.error(f"Error updating row in {model_class.__tablename__}: {str(e)}")
@@ -321,14 +1131,181 @@ class SQLAlchemyDatabase:
                     logger.warning(f"No record found to delete in {model_class.__tablename__} where {condition_field}={condition_value}")
                     return False
                 
+                user_id = record.User_ID if model_class is User else None
                 session.delete(record)
                 session.commit()
-                logger.info(f"Deleted row from {model_class.__tablename__} where {condition_field}={condition_value}")
+                if user_id is not None:
+                    _principal_cache.invalidate_user(user_id)
+                logger.debug("Deleted row from %s where %s=%s", model_class.__tablename__, condition_field, condition_value)
                 return True
         except Exception as e:
             logger.error(f"Error deleting row from {model_class.__tablename__}: {str(e)}")
             return False
 
+class AsyncSQLAlchemyDatabase:
+    def __init__(self):
+        """
+        Initializes an async SQLAlchemy engine (aiosqlite driver) and session factory.
+        SQLite I/O runs on the driver's worker thread, so awaiting a query never blocks the event loop.
+        """
+        self.engine = None
+        self.Session = None
+        self.pragmas = SQLITE_PRAGMAS
+        try:
+            self.engine = create_async_engine(
+                ASYNC_DATABASE_URL,
+                echo=False,
+                connect_args={"check_same_thread": False},
+                **POOL_CONFIG
+            )
+            # Pool events live on the sync facade of the async engine
+            _install_sqlite_pragmas(self.engine.sync_engine, self.pragmas)
+            self.Session = async_sessionmaker(self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            logger.info("Async SQLAlchemy engine initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing async SQLAlchemy engine: {e}")
+            raise
+
+    async def execute_query(self, query_func, timeout: int = 60) -> List[Dict[str, Any]]:
+        """
+        Async counterpart of SQLAlchemyDatabase.execute_query.
+        The same sync query_func is run through AsyncSession.run_sync, so every
+        query helper can be shared between the sync and async code paths.
+        """
+        try:
+            async with self.Session() as session:
+                return await session.run_sync(
+                    lambda sync_session: _result_to_dicts(query_func(sync_session))
+                )
+
+        except Exception as e:
+            error_type = type(e).__name__
+            logger.error(f"Async query execution error ({error_type}): {str(e)}")
+            # Return empty list on error rather than raising
+            logger.warning("Returning empty list due to query error")
+            return []
+
+    async def fetch_rows(self, statement, model_class, alias_keys: bool = True) -> List[Dict[str, Any]]:
+        """Async counterpart of SQLAlchemyDatabase.fetch_rows."""
+        convert = _ROW_CONVERTERS[model_class][alias_keys]
+        try:
+            async with self.engine.connect() as connection:
+                result = await connection.execute(statement)
+                rows = result.all()
+            return list(map(convert, rows))
+        except Exception as e:
+            logger.error(f"Async projection query error on {model_class.__tablename__} ({type(e).__name__}): {str(e)}")
+            return []
+
+    async def stream_rows(
+        self,
+        statement,
+        model_class,
+        alias_keys: bool = True,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Async counterpart of SQLAlchemyDatabase.stream_rows."""
+        convert = _ROW_CONVERTERS[model_class][alias_keys]
+        try:
+            async with self.engine.connect() as connection:
+                result = await connection.stream(statement.execution_options(yield_per=batch_size))
+                async for partition in result.partitions():
+                    yield list(map(convert, partition))
+        except Exception as e:
+            logger.error(f"Async streaming query error on {model_class.__tablename__} ({type(e).__name__}): {str(e)}")
+            raise
+
+    async def fetch_mappings(self, statement) -> List[Dict[str, Any]]:
+        """Async counterpart of SQLAlchemyDatabase.fetch_mappings."""
+        try:
+            async with self.engine.connect() as connection:
+                result = await connection.execute(statement)
+                return [dict(row) for row in result.mappings()]
+        except Exception as e:
+            logger.error(f"Async query error ({type(e).__name__}): {str(e)}")
+            return []
+
+    async def insert_row(self, model_class, row_data: Dict[str, Any]) -> bool:
+        """Insert a single row into a table."""
+        try:
+            async with self.Session() as session, session.begin():
+                session.add(model_class(**row_data))
+            logger.debug("Inserted row into %s", model_class.__tablename__)
+            return True
+        except Exception as e:
+            logger.error(f"Error inserting row into {model_class.__tablename__}: {str(e)}")
+            return False
+
+    async def update_row(
+        self,
+        model_class,
+        update_data: Dict[str, Any],
+        condition_field: str,
+        condition_value: Any
+    ) -> bool:
+        """Update a row in a table based on a condition."""
+        try:
+            async with self.Session() as session, session.begin():
+                result = await session.execute(
+                    select(model_class).filter(getattr(model_class, condition_field) == condition_value).limit(1)
+                )
+                record = result.scalars().first()
+
+                if not record:
+                    logger.warning(f"No record found to update in {model_class.__tablename__} where {condition_field}={condition_value}")
+                    return False
+
+                for key, value in update_data.items():
+                    setattr(record, key, value)
+                user_id = record.User_ID if model_class is User else None
+
+            if user_id is not None:
+                _principal_cache.invalidate_user(user_id)
+            logger.debug("Updated row in %s where %s=%s", model_class.__tablename__, condition_field, condition_value)
+            return True
+        except Exception as e:
+            logger.error(f"Error updating row in {model_class.__tablename__}: {str(e)}")
+            return False
+
+    async def delete_row(
+        self,
+        model_class,
+        condition_field: str,
+        condition_value: Any
+    ) -> bool:
+        """Delete a row from a table based on a condition."""
+        try:
+            async with self.Session() as session, session.begin():
+                result = await session.execute(
+                    select(model_class).filter(getattr(model_class, condition_field) == condition_value).limit(1)
+                )
+                record = result.scalars().first()
+
+                if not record:
+                    logger.warning(f"No record found to delete in {model_class.__tablename__} where {condition_field}={condition_value}")
+                    return False
+
+                user_id = record.User_ID if model_class is User else None
+                await session.delete(record)
+
+            if user_id is not None:
+                _principal_cache.invalidate_user(user_id)
+            logger.debug("Deleted row from %s where %s=%s", model_class.__tablename__, condition_field, condition_value)
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting row from {model_class.__tablename__}: {str(e)}")
+            return False
+
+    async def connection_profile(self) -> Dict[str, Any]:
+        """Async counterpart of SQLAlchemyDatabase.connection_profile."""
+        async with self.engine.connect() as connection:
+            pragmas = await connection.run_sync(_read_sqlite_pragmas, self.pragmas)
+        return {"pragmas": pragmas, "pool": _pool_status(self.engine.sync_engine)}
+
+    async def dispose(self):
+        """Close all pooled aiosqlite connections."""
+        await self.engine.dispose()
+
 def get_db() -> SQLAlchemyDatabase:
     """
     Returns a singleton instance of the SQLAlchemyDatabase.
@@ -336,10 +1313,28 @@ def get_db() -> SQLAlchemyDatabase:
     """
     global _db_instance
     if _db_instance is None:
-        _db_instance = SQLAlchemyDatabase()
-        _db_instance.create_tables()
+        db = SQLAlchemyDatabase()
+        try:
+            db.create_tables()
+        except Exception:
+            # Not published: the next call retries the migration instead of
+            # handing out a database that never finished it
+            db.engine.dispose()
+            raise
+        _db_instance = db
     return _db_instance
 
+def get_async_db() -> AsyncSQLAlchemyDatabase:
+    """
+    Returns a singleton instance of the AsyncSQLAlchemyDatabase.
+    The sync instance is created first so the tables are guaranteed to exist.
+    """
+    global _async_db_instance
+    if _async_db_instance is None:
+        get_db()
+        _async_db_instance = AsyncSQLAlchemyDatabase()
+    return _async_db_instance
+
 def get_session() -> Session:
     """
     Returns a new SQLAlchemy session.
@@ -347,129 +1342,153 @@ def get_session() -> Session:
     db = get_db()
     return db.Session()
 
+def _user_by_email_select(email: str):
+    return select_columns(User).where(User.email == email).limit(1)
+
+def _user_by_id_select(user_id: int):
+    return select_columns(User).where(User.User_ID == user_id).limit(1)
+
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get a user by email."""
     db = get_db()
-    def query_func(session):
-        return session.query(User).filter(User.email == email).first()
-    
-    results = db.execute_query(query_func)
-    # When the result is a single object (which should be for this query)
-    # it's wrapped in a {'result': <user_object>} dict
-    if results and len(results) == 1 and 'result' in results[0]:
-        # The SQLAlchemy object is in the 'result' key
-        user_obj = results[0]['result']
-        
-        # Check if it's an SQLAlchemy model object
-        if hasattr(user_obj, '__table__'):
-            # Convert to dict manually
-            user_dict = {}
-            for column in user_obj.__table__.columns:
-                user_dict[column.name] = getattr(user_obj, column.key, None)
-            return user_dict
-        
-        # If it's already a dict, return it
-        if isinstance(user_obj, dict):
-            return user_obj
-            
-    # If the result is already properly formatted, return the first item
+    results = db.fetch_rows(_user_by_email_select(email), User)
     return results[0] if results else None
 
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get a user by ID."""
     db = get_db()
-    def query_func(session):
-        return session.query(User).filter(User.User_ID == user_id).first()
-    
-    results = db.execute_query(query_func)
-    # When the result is a single object (which should be for this query)
-    # it's wrapped in a {'result': <user_object>} dict
-    if results and len(results) == 1 and 'result' in results[0]:
-        # The SQLAlchemy object is in the 'result' key
-        user_obj = results[0]['result']
-        
-        # Check if it's an SQLAlchemy model object
-        if hasattr(user_obj, '__table__'):
-            # Convert to dict manually
-            user_dict = {}
-            for column in user_obj.__table__.columns:
-                user_dict[column.name] = getattr(user_obj, column.key, None)
-            return user_dict
-        
-        # If it's already a dict, return it
-        if isinstance(user_obj, dict):
-            return user_obj
-            
-    # If the result is already properly formatted, return the first item
+    results = db.fetch_rows(_user_by_id_select(user_id), User)
     return results[0] if results else None
 
+def _portfolio_select(user_id: int):
+    return select_columns(Portfolio).where(Portfolio.User_ID == user_id).limit(1)
+
 def get_portfolio_by_user_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get a user's portfolio by their user ID."""
     db = get_db()
-    def query_func(session):
-        return session.query(Portfolio).filter(Portfolio.User_ID == user_id).first()
-    
-    results = db.execute_query(query_func)
+    results = db.fetch_rows(_portfolio_select(user_id), Portfolio)
     return results[0] if results else None
 
+def get_user_trades_cache_stats() -> Dict[str, Any]:
+    """Size, budget and hit/miss counters of the user-trades cache."""
+    return _user_trades_cache.stats()
+
+def get_principal_cache() -> PrincipalCache:
+    """The verified-token cache used by auth.dependencies.get_current_user."""
+    return _principal_cache
+
+def set_user_active(user_id: int, is_active: bool) -> bool:
+    """Activate or deactivate a user; their cached tokens stop authenticating immediately."""
+    return get_db().update_row(User, {"is_active": is_active}, "User_ID", user_id)
+
+def encode_trade_cursor(trade: Dict[str, Any]) -> str:
+    """Opaque keyset cursor pointing just past the given trade (newest-first order)."""
+    execution_time = trade["execution_time"]
+    if isinstance(execution_time, datetime):
+        execution_time = execution_time.isoformat()
+    # An undated trade is encoded with an empty time
+    raw = f"{execution_time or ''}|{trade['Trade_ID']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_trade_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_trade_cursor (time None for an undated trade). Raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        execution_time, trade_id = raw.rsplit("|", 1)
+        if execution_time in ("", "None"):
+            return None, int(trade_id)
+        return datetime.fromisoformat(execution_time), int(trade_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid trade cursor: {cursor}") from e
+
+def _user_trades_select(
+    user_id: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[Tuple[Optional[datetime], int]] = None
+):
+    statement = select_columns(Trade).where(Trade.User_ID == user_id)
+    
+    if start_date:
+        statement = statement.where(Trade.execution_time >= start_date)
+    if end_date:
+        statement = statement.where(Trade.execution_time <= end_date)
+    if cursor is not None:
+        # Keyset pagination: continue strictly after the last trade of the previous page.
+        # Undated trades come last (SQLite sorts NULLs first, so last when descending)
+        # and a row comparison never matches them, so they are handled explicitly.
+        cursor_time, cursor_id = cursor
+        if cursor_time is None:
+            statement = statement.where(Trade.execution_time.is_(None), Trade.Trade_ID < cursor_id)
+        else:
+            statement = statement.where(or_(
+                tuple_(Trade.execution_time, Trade.Trade_ID) < tuple_(cursor_time, cursor_id),
+                Trade.execution_time.is_(None)
+            ))
+        
+    # Trade_ID breaks ties so the order (and therefore the cursor) is total
+    statement = statement.order_by(Trade.execution_time.desc(), Trade.Trade_ID.desc())
+    if offset:
+        statement = statement.offset(offset)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+def _paginate_cached_trades(
+    user_id: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    alias_keys: bool,
+    limit: Optional[int],
+    offset: int,
+    cursor: Optional[Tuple[Optional[datetime], int]]
+) -> Optional[List[Dict[str, Any]]]:
+    """Serve a page from the cached history when possible; cursor pages always go to SQL."""
+    if cursor is not None:
+        return None
+    cached_trades = _user_trades_cache.get(user_id, start_date, end_date, alias_keys)
+    if cached_trades is None:
+        return None
+    if limit is None and not offset:
+        return cached_trades
+    return cached_trades[offset:offset + limit if limit is not None else None]
+
 def get_user_trades(
     user_id: int, 
     start_date: Optional[datetime] = None, 
     end_date: Optional[datetime] = None,
-    cache_bypass: bool = False
+    cache_bypass: bool = False,
+    alias_keys: bool = True,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[Tuple[Optional[datetime], int]] = None
 ) -> List[Dict[str, Any]]:
-    """Get trades for a user, with optional date filtering."""
+    """
+    Get trades for a user, newest first, with optional date filtering.
+    alias_keys=False leaves out the duplicate trade_id/user_id keys.
+    limit/offset and cursor (execution_time, Trade_ID of the last trade already
+    seen, see decode_trade_cursor) are applied in SQL.
+    """
     # Check cache first, unless bypass is requested
-    cache_key = f"user_{user_id}_trades"
-    current_time = datetime.now()
-    
-    if not cache_bypass and cache_key in _user_trades_cache:
-        last_updated = _user_trades_cache_last_updated.get(cache_key, datetime.min)
-        if (current_time - last_updated).total_seconds() < _user_trades_cache_ttl:
-            cached_trades = _user_trades_cache[cache_key]
-            logger.info(f"Returning {len(cached_trades)} cached trades for user {user_id}")
-            
-            # Apply date filtering on the cached data if needed
-            if start_date or end_date:
-                filtered_trades = []
-                for trade in cached_trades:
-                    trade_date = datetime.fromisoformat(trade['execution_time']) if isinstance(trade['execution_time'], str) else trade['execution_time']
-                    if start_date and trade_date < start_date:
-                        continue
-                    if end_date and trade_date > end_date:
-                        continue
-                    filtered_trades.append(trade)
-                return filtered_trades
-            
+    if not cache_bypass:
+        cached_trades = _paginate_cached_trades(user_id, start_date, end_date, alias_keys, limit, offset, cursor)
+        if cached_trades is not None:
             return cached_trades
     
     # If not in cache or cache bypassed, query database
     db = get_db()
+    trades = db.fetch_rows(_user_trades_select(user_id, start_date, end_date, limit, offset, cursor), Trade, alias_keys)
     
-    def query_func(session):
-        query = session.query(Trade).filter(Trade.User_ID == user_id)
-        
-        if start_date:
-            query = query.filter(Trade.execution_time >= start_date)
-        if end_date:
-            query = query.filter(Trade.execution_time <= end_date)
-            
-        return query.order_by(Trade.execution_time.desc())
-    
-    trades = db.execute_query(query_func)
-    
-    # Update cache
-    if not start_date and not end_date:
-        _user_trades_cache[cache_key] = trades
-        _user_trades_cache_last_updated[cache_key] = current_time
-        logger.info(f"Updated cache with {len(trades)} trades for user {user_id}")
+    # Only the full history is cached; date ranges and pages are served from it
+    if not start_date and not end_date and limit is None and not offset and cursor is None:
+        _user_trades_cache.put(user_id, trades, alias_keys)
     
     return trades
 
-def create_trade(trade_data: Dict[str, Any]) -> bool:
-    """Create a new trade record."""
-    db = get_db()
-    
+def _prepare_trade_data(trade_data: Dict[str, Any]) -> bool:
+    """Validate trade data in place before it is inserted."""
     # Make sure we have a User_ID
     if "User_ID" not in trade_data or not trade_data["User_ID"]:
         logger.error("Cannot create trade without User_ID")
@@ -483,34 +1502,141 @@ def create_trade(trade_data: Dict[str, Any]) -> bool:
             logger.error(f"Invalid execution_time format: {trade_data['execution_time']}")
             return False
     
-    # Insert the trade
-    return db.insert_row(Trade, trade_data)
+    return True
 
-def get_market_data(
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    min_price: Optional[float] = None,
-    max_price: Optional[float] = None,
-    market: str = "Germany"
-) -> List[Dict[str, Any]]:
-    """Get market data with optional filtering by date and price range."""
+def _add_rollup_delta(deltas: Dict[tuple, List[float]], trade: Trade, sign: int = 1):
+    """Accumulate one trade's contribution (sign=1) or removal (sign=-1) into deltas, keyed by rollup row."""
+    execution_time = trade.execution_time
+    if execution_time is None:
+        return  # Undated trades fall outside every date range
+    if isinstance(execution_time, str):
+        execution_time = datetime.fromisoformat(execution_time)
+
+    quantity = trade.quantity or 0.0
+    value = quantity * trade.price if trade.price is not None else 0.0
+    key = (trade.User_ID, execution_time.strftime("%Y-%m-%d"), (trade.type or "").lower(), trade.status)
+    delta = deltas.setdefault(key, [0, 0.0, 0.0])
+    delta[0] += sign
+    delta[1] += sign * quantity
+    delta[2] += sign * value
+
+def _apply_rollup_deltas(session: Session, deltas: Dict[tuple, List[float]]):
+    """Upsert accumulated deltas into TradeRollup in one statement, in the caller's transaction."""
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    now = datetime.now()
+    statement = sqlite_insert(TradeRollup).values([
+        {"User_ID": user_id, "day": day, "type": trade_type, "status": status,
+         "trade_count": count, "volume": volume, "value": value, "updated_at": now}
+        for (user_id, day, trade_type, status), (count, volume, value) in deltas.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["User_ID", "day", "type", "status"],
+        set_={
+            "trade_count": TradeRollup.trade_count + statement.excluded.trade_count,
+            "volume": TradeRollup.volume + statement.excluded.volume,
+            "value": TradeRollup.value + statement.excluded.value,
+            "updated_at": statement.excluded.updated_at,
+        }
+    )
+    session.execute(statement)
+
+    if any(delta[0] < 0 for delta in deltas.values()):
+        # Drop groups that no longer contain any trade
+        session.execute(
+            delete(TradeRollup).where(
+                TradeRollup.User_ID.in_({key[0] for key, delta in deltas.items() if delta[0] < 0}),
+                TradeRollup.trade_count <= 0
+            )
+        )
+
+def _apply_trade_to_rollup(session: Session, trade: Trade, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) one trade's contribution to its TradeRollup row,
+    as an upsert in the caller's transaction.
+    """
+    deltas = {}
+    _add_rollup_delta(deltas, trade, sign)
+    _apply_rollup_deltas(session, deltas)
+
+def _insert_trade(session: Session, trade_data: Dict[str, Any]) -> Trade:
+    """Insert a trade and count it in the rollup, in the caller's transaction."""
+    trade = Trade(**trade_data)
+    session.add(trade)
+    session.flush()
+    _apply_trade_to_rollup(session, trade)
+    return trade
+
+def _update_trade(session: Session, trade_id: int, update_data: Dict[str, Any]) -> Optional[int]:
+    """Update a trade and move its rollup contribution; returns the owner's User_ID or None if missing."""
+    trade = session.get(Trade, trade_id)
+    if trade is None:
+        return None
+    _apply_trade_to_rollup(session, trade, -1)
+    for key, value in update_data.items():
+        setattr(trade, key, value)
+    session.flush()
+    _apply_trade_to_rollup(session, trade)
+    return trade.User_ID
+
+def create_trade(trade_data: Dict[str, Any]) -> bool:
+    """Create a new trade record."""
     db = get_db()
     
-    def query_func(session):
-        query = session.query(MarketData).filter(MarketData.market == market)
+    if not _prepare_trade_data(trade_data):
+        return False
+    
+    # Insert the trade together with its rollup update
+    try:
+        with db.Session() as session, session.begin():
+            _insert_trade(session, trade_data)
+    except Exception as e:
+        logger.error(f"Error inserting row into trades: {str(e)}")
+        return False
+    _user_trades_cache.invalidate(trade_data["User_ID"])
+    return True
+
+def _market_data_select(
+    start_date: Optional[str],
+    end_date: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    market: str
+):
+    statement = select_columns(MarketData).where(MarketData.market == market)
+    
+    if start_date:
+        statement = statement.where(MarketData.delivery_day >= start_date)
+    if end_date:
+        statement = statement.where(MarketData.delivery_day <= end_date)
+    if min_price is not None:
+        statement = statement.where(MarketData.close >= min_price)
+    if max_price is not None:
+        statement = statement.where(MarketData.close <= max_price)
         
-        if start_date:
-            query = query.filter(MarketData.delivery_day >= start_date)
-        if end_date:
-            query = query.filter(MarketData.delivery_day <= end_date)
-        if min_price is not None:
-            query = query.filter(MarketData.close >= min_price)
-        if max_price is not None:
-            query = query.filter(MarketData.close <= max_price)
-            
-        return query.order_by(MarketData.delivery_day, MarketData.delivery_period)
-    
-    return db.execute_query(query_func)
+    return statement.order_by(MarketData.delivery_day, MarketData.delivery_period)
+
+def get_market_data(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    market: str = "Germany"
+) -> List[Dict[str, Any]]:
+    """Get market data with optional filtering by date and price range."""
+    db = get_db()
+    return db.fetch_rows(_market_data_select(start_date, end_date, min_price, max_price, market), MarketData)
+
+def _forecasts_select(market: str, start_timestamp: Optional[datetime], end_timestamp: Optional[datetime]):
+    statement = select_columns(Forecast).where(Forecast.market == market)
+    
+    if start_timestamp:
+        statement = statement.where(Forecast.timestamp >= start_timestamp)
+    if end_timestamp:
+        statement = statement.where(Forecast.timestamp <= end_timestamp)
+        
+    return statement.order_by(Forecast.timestamp)
 
 def get_forecasts(
     market: str = "Germany",
@@ -519,30 +1645,16 @@ def get_forecasts(
 ) -> List[Dict[str, Any]]:
     """Get price forecasts for a specific market and time range."""
     db = get_db()
-    
-    def query_func(session):
-        query = session.query(Forecast).filter(Forecast.market == market)
-        
-        if start_timestamp:
-            query = query.filter(Forecast.timestamp >= start_timestamp)
-        if end_timestamp:
-            query = query.filter(Forecast.timestamp <= end_timestamp)
-            
-        return query.order_by(Forecast.timestamp)
-    
-    return db.execute_query(query_func)
+    return db.fetch_rows(_forecasts_select(market, start_timestamp, end_timestamp), Forecast)
 
-def get_battery_status(user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
-    """Get a user's battery status."""
-    db = get_db()
-    
-    def query_func(session):
-        if user_id:
-            return session.query(Battery).filter(Battery.User_ID == user_id).first()
-        else:
-            return session.query(Battery).first()  # Return any battery if no specific user
-    
-    results = db.execute_query(query_func)
+def _battery_select(user_id: Optional[int]):
+    statement = select_columns(Battery)
+    if user_id:
+        statement = statement.where(Battery.User_ID == user_id)
+    # Without a user this returns any battery
+    return statement.limit(1)
+
+def _battery_with_derived_fields(results: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if not results:
         return None
     
@@ -558,38 +1670,271 @@ def get_battery_status(user_id: Optional[int] = None) -> Optional[Dict[str, Any]
     
     return battery_data
 
-def get_performance_metrics(
-    user_id: int, 
-    start_date: Optional[datetime] = None, 
-    end_date: Optional[datetime] = None
+def get_battery_status(user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Get a user's battery status."""
+    db = get_db()
+    return _battery_with_derived_fields(db.fetch_rows(_battery_select(user_id), Battery))
+
+# Trade aggregation
+# Counts, volume (SUM(quantity)) and value (SUM(quantity * price)) per trade type
+# and status, computed by SQLite in one grouped query over the
+# (User_ID, execution_time) index instead of materializing every trade.
+
+# strftime formats for optional time bucketing of aggregates
+TRADE_BUCKET_FORMATS = {
+    "day": "%Y-%m-%d",
+    "hour": "%Y-%m-%d %H:00",
+}
+
+def _trade_aggregates_select(
+    user_id: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    bucket: Optional[str] = None
+):
+    trade_type = func.lower(Trade.type).label("type")
+    group_columns = [trade_type, Trade.status]
+    if bucket:
+        group_columns.insert(0, func.strftime(TRADE_BUCKET_FORMATS[bucket], Trade.execution_time).label("bucket"))
+
+    statement = select(
+        *group_columns,
+        func.count().label("trade_count"),
+        func.coalesce(func.sum(Trade.quantity), 0.0).label("volume"),
+        func.coalesce(func.sum(Trade.quantity * Trade.price), 0.0).label("value"),
+    ).where(Trade.User_ID == user_id)
+
+    if start_date:
+        statement = statement.where(Trade.execution_time >= start_date)
+    if end_date:
+        statement = statement.where(Trade.execution_time <= end_date)
+
+    return statement.group_by(*group_columns)
+
+def _fold_trade_aggregates(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Fold grouped (type, status) rows into totals: trade counts per type and per
+    status, plus count/volume/value of executed trades per type.
+    """
+    totals = {
+        "trade_count": 0,
+        "by_type": {},
+        "by_status": {},
+        "executed": {
+            "buy": {"trade_count": 0, "volume": 0.0, "value": 0.0},
+            "sell": {"trade_count": 0, "volume": 0.0, "value": 0.0},
+        },
+    }
+    for row in rows:
+        count = row["trade_count"]
+        totals["trade_count"] += count
+        totals["by_type"][row["type"]] = totals["by_type"].get(row["type"], 0) + count
+        totals["by_status"][row["status"]] = totals["by_status"].get(row["status"], 0) + count
+        if row["status"] == "executed" and row["type"] in totals["executed"]:
+            executed = totals["executed"][row["type"]]
+            executed["trade_count"] += count
+            executed["volume"] += row["volume"]
+            executed["value"] += row["value"]
+    return totals
+
+def _trade_aggregates(rows: List[Dict[str, Any]], bucket: Optional[str]) -> Dict[str, Any]:
+    totals = _fold_trade_aggregates(rows)
+    if bucket:
+        rows_by_bucket = {}
+        for row in rows:
+            rows_by_bucket.setdefault(row["bucket"], []).append(row)
+        totals["buckets"] = [
+            {"bucket": key, **_fold_trade_aggregates(bucket_rows)}
+            for key, bucket_rows in sorted(rows_by_bucket.items())
+        ]
+    return totals
+
+def get_trade_aggregates(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Get performance metrics for a user over a time period."""
+    """
+    Aggregate a user's trades by type and status (see _fold_trade_aggregates).
+    bucket="day" or "hour" adds a "buckets" list with the same totals per period.
+    """
     db = get_db()
-    
-    # Get the user's portfolio
-    def portfolio_query(session):
-        return session.query(Portfolio).filter(Portfolio.User_ID == user_id).first()
-    
-    portfolio_results = db.execute_query(portfolio_query)
-    if not portfolio_results:
-        return {"error": "Portfolio not found"}
-    
-    portfolio = portfolio_results[0]
-    
-    # Get the user's trades in the specified period
-    trades = get_user_trades(user_id, start_date, end_date, cache_bypass=True)
-    
+    rows = db.fetch_mappings(_trade_aggregates_select(user_id, start_date, end_date, bucket))
+    return _trade_aggregates(rows, bucket)
+
+def _rollup_aggregates_select(
+    user_id: int,
+    first_day: Optional[str],
+    last_day: Optional[str],
+    bucket: Optional[str] = None
+):
+    """Same columns as _trade_aggregates_select, read from whole days of TradeRollup."""
+    group_columns = [TradeRollup.type.label("type"), TradeRollup.status.label("status")]
+    if bucket:
+        group_columns.insert(0, TradeRollup.day.label("bucket"))
+
+    statement = select(
+        *group_columns,
+        func.sum(TradeRollup.trade_count).label("trade_count"),
+        func.sum(TradeRollup.volume).label("volume"),
+        func.sum(TradeRollup.value).label("value"),
+    ).where(TradeRollup.User_ID == user_id)
+
+    if first_day:
+        statement = statement.where(TradeRollup.day >= first_day)
+    if last_day:
+        statement = statement.where(TradeRollup.day <= last_day)
+
+    return statement.group_by(*group_columns)
+
+def _rollup_trade_aggregates_select(
+    user_id: int,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    bucket: Optional[str] = None
+):
+    """
+    Trade aggregates for [start_date, end_date] as one UNION ALL: days lying entirely
+    inside the range come from TradeRollup, the partial days at either edge from
+    the trades themselves. Hourly buckets need the raw trades.
+    """
+    if bucket == "hour":
+        return _trade_aggregates_select(user_id, start_date, end_date, bucket)
+
+    first_full_day = None
+    if start_date is not None:
+        first_full_day = start_date.date() if start_date.time() == time.min else start_date.date() + timedelta(days=1)
+    last_full_day = None
+    if end_date is not None:
+        last_full_day = end_date.date() if end_date.time() == time.max else end_date.date() - timedelta(days=1)
+
+    if first_full_day and last_full_day and first_full_day > last_full_day:
+        # Less than a whole day: nothing to gain from the rollup
+        return _trade_aggregates_select(user_id, start_date, end_date, bucket)
+
+    parts = [_rollup_aggregates_select(
+        user_id,
+        first_full_day.isoformat() if first_full_day else None,
+        last_full_day.isoformat() if last_full_day else None,
+        bucket
+    )]
+    if start_date is not None and start_date.time() != time.min:
+        parts.append(_trade_aggregates_select(
+            user_id, start_date, datetime.combine(first_full_day, time.min) - timedelta(microseconds=1), bucket
+        ))
+    if end_date is not None and end_date.time() != time.max:
+        parts.append(_trade_aggregates_select(
+            user_id, datetime.combine(last_full_day + timedelta(days=1), time.min), end_date, bucket
+        ))
+    return union_all(*parts) if len(parts) > 1 else parts[0]
+
+def get_trade_rollup_aggregates(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: Optional[str] = None
+) -> Dict[str, Any]:
+    """Same result as get_trade_aggregates, read mostly from the TradeRollup table."""
+    db = get_db()
+    rows = db.fetch_mappings(_rollup_trade_aggregates_select(user_id, start_date, end_date, bucket))
+    return _trade_aggregates(rows, bucket)
+
+def _rollup_rebuild_select(user_id: Optional[int] = None):
+    """TradeRollup rows recomputed from the raw trades table."""
+    day = func.strftime("%Y-%m-%d", Trade.execution_time)
+    trade_type = func.lower(Trade.type)
+    statement = select(
+        Trade.User_ID.label("User_ID"),
+        day.label("day"),
+        trade_type.label("type"),
+        Trade.status.label("status"),
+        func.count().label("trade_count"),
+        func.coalesce(func.sum(Trade.quantity), 0.0).label("volume"),
+        func.coalesce(func.sum(Trade.quantity * Trade.price), 0.0).label("value"),
+    ).where(Trade.execution_time.is_not(None))
+    if user_id is not None:
+        statement = statement.where(Trade.User_ID == user_id)
+    return statement.group_by(Trade.User_ID, day, trade_type, Trade.status)
+
+def _trade_rollups_missing(connection) -> bool:
+    """True when TradeRollup is empty although there are dated trades to roll up."""
+    return not connection.execute(select(TradeRollup.User_ID).limit(1)).first() and bool(
+        connection.execute(select(Trade.Trade_ID).where(Trade.execution_time.is_not(None)).limit(1)).first()
+    )
+
+def _rebuild_trade_rollups(session: Session, user_id: Optional[int] = None) -> int:
+    clear = delete(TradeRollup)
+    if user_id is not None:
+        clear = clear.where(TradeRollup.User_ID == user_id)
+    session.execute(clear)
+
+    columns = ["User_ID", "day", "type", "status", "trade_count", "volume", "value"]
+    result = session.execute(insert(TradeRollup).from_select(columns, _rollup_rebuild_select(user_id)))
+    return result.rowcount
+
+def rebuild_trade_rollups(user_id: Optional[int] = None) -> int:
+    """Recompute TradeRollup (for one user or everyone) from the trades table. Returns the row count."""
+    db = get_db()
+    with db.Session() as session, session.begin():
+        count = _rebuild_trade_rollups(session, user_id)
+    logger.info(f"Rebuilt {count} trade rollup rows" + (f" for user {user_id}" if user_id is not None else ""))
+    return count
+
+def check_trade_rollups(user_id: Optional[int] = None, tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+    """
+    Compare the stored TradeRollup rows with a fresh recomputation without writing.
+    Returns one entry per mismatching (User_ID, day, type, status) group.
+    """
+    db = get_db()
+    stored_select = select(
+        TradeRollup.User_ID, TradeRollup.day, TradeRollup.type, TradeRollup.status,
+        TradeRollup.trade_count, TradeRollup.volume, TradeRollup.value
+    )
+    if user_id is not None:
+        stored_select = stored_select.where(TradeRollup.User_ID == user_id)
+
+    def by_key(rows):
+        return {(row["User_ID"], row["day"], row["type"], row["status"]): row for row in rows}
+
+    stored = by_key(db.fetch_mappings(stored_select))
+    expected = by_key(db.fetch_mappings(_rollup_rebuild_select(user_id)))
+
+    mismatches = []
+    for key in sorted(set(stored) | set(expected), key=str):
+        have, want = stored.get(key), expected.get(key)
+        if have and want and have["trade_count"] == want["trade_count"] and all(
+            abs(have[field] - want[field]) <= tolerance * max(1.0, abs(want[field]))
+            for field in ("volume", "value")
+        ):
+            continue
+        mismatches.append({
+            "User_ID": key[0], "day": key[1], "type": key[2], "status": key[3],
+            "stored": {field: have[field] for field in ("trade_count", "volume", "value")} if have else None,
+            "expected": {field: want[field] for field in ("trade_count", "volume", "value")} if want else None,
+        })
+    return mismatches
+
+def _performance_metrics(
+    user_id: int,
+    portfolio: Dict[str, Any],
+    aggregates: Dict[str, Any],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> Dict[str, Any]:
     # Calculate metrics
+    by_type = aggregates["by_type"]
+    by_status = aggregates["by_status"]
     metrics = {
         "user_id": user_id,
         "balance": portfolio.get('balance', 0),
         "profit_loss": portfolio.get('profit_loss', 0),
-        "trade_count": len(trades),
-        "buy_trades": sum(1 for t in trades if t.get('type') == 'buy'),
-        "sell_trades": sum(1 for t in trades if t.get('type') == 'sell'),
-        "executed_trades": sum(1 for t in trades if t.get('status') == 'executed'),
-        "pending_trades": sum(1 for t in trades if t.get('status') == 'pending'),
-        "cancelled_trades": sum(1 for t in trades if t.get('status') == 'cancelled'),
+        "trade_count": aggregates["trade_count"],
+        "buy_trades": by_type.get('buy', 0),
+        "sell_trades": by_type.get('sell', 0),
+        "executed_trades": by_status.get('executed', 0),
+        "pending_trades": by_status.get('pending', 0),
+        "cancelled_trades": by_status.get('cancelled', 0),
     }
     
     # Add time period info
@@ -600,18 +1945,48 @@ def get_performance_metrics(
     
     return metrics
 
+def get_performance_metrics(
+    user_id: int, 
+    start_date: Optional[datetime] = None, 
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Get performance metrics for a user over a time period."""
+    db = get_db()
+    
+    # Get the user's portfolio
+    portfolio_results = db.fetch_rows(_portfolio_select(user_id), Portfolio)
+    if not portfolio_results:
+        return {"error": "Portfolio not found"}
+    
+    # Aggregate the user's trades in the specified period
+    aggregates = get_trade_rollup_aggregates(user_id, start_date, end_date)
+    
+    return _performance_metrics(user_id, portfolio_results[0], aggregates, start_date, end_date)
+
 def test_db_connection() -> bool:
     """Test the database connection."""
     try:
         db = get_db()
         with db.Session() as session:
             session.execute(text("SELECT 1"))
-        logger.info("Database connection test successful")
+        logger.debug("Database connection test successful")
         return True
     except Exception as e:
         logger.error(f"Database connection test failed: {e}")
         return False
 
+def _default_battery_data(user_id: int) -> Dict[str, Any]:
+    return {
+        "User_ID": user_id,
+        "current_level": 50.0,
+        "capacity": 100.0,
+        "max_charge_rate": 10.0,
+        "max_discharge_rate": 10.0,
+        "efficiency": 0.95,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now()
+    }
+
 def create_battery_if_not_exists(user_id: Optional[int] = None) -> Dict[str, Any]:
     """Create a battery for a user if one doesn't already exist."""
     if not user_id:
@@ -621,84 +1996,74 @@ def create_battery_if_not_exists(user_id: Optional[int] = None) -> Dict[str, Any
     db = get_db()
     
     # Check if battery already exists
-    def check_query(session):
-        return session.query(Battery).filter(Battery.User_ID == user_id).first()
-    
-    existing_battery = db.execute_query(check_query)
+    check_query = _battery_select(user_id)
+    existing_battery = db.fetch_rows(check_query, Battery)
     
     if existing_battery:
-        logger.info(f"Battery already exists for user {user_id}")
+        logger.debug("Battery already exists for user %s", user_id)
         return existing_battery[0]
     
     # Create new battery
-    battery_data = {
-        "User_ID": user_id,
-        "current_level": 50.0,
-        "capacity": 100.0,
-        "max_charge_rate": 10.0,
-        "max_discharge_rate": 10.0,
-        "efficiency": 0.95,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
-    
-    success = db.insert_row(Battery, battery_data)
+    success = db.insert_row(Battery, _default_battery_data(user_id))
     
     if success:
         logger.info(f"Created new battery for user {user_id}")
         # Get the newly created battery
-        new_battery = db.execute_query(check_query)
+        new_battery = db.fetch_rows(check_query, Battery)
         return new_battery[0] if new_battery else {"error": "Failed to retrieve new battery"}
     else:
         return {"error": "Failed to create battery"}
 
-def get_pending_trades() -> List[Dict[str, Any]]:
-    """Get all pending trades."""
+def _pending_trades_select(now: Optional[datetime] = None, limit: Optional[int] = None):
+    statement = select_columns(Trade).where(
+        Trade.status == "pending",
+        Trade.execution_time <= (now or datetime.now())
+    ).order_by(Trade.execution_time, Trade.Trade_ID)
+    if limit:
+        statement = statement.limit(limit)
+    return statement
+
+def get_pending_trades(limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Get pending trades due by now (default: the current time), earliest first, at most limit."""
     db = get_db()
-    
-    def query_func(session):
-        return session.query(Trade).filter(
-            Trade.status == "pending",
-            Trade.execution_time <= datetime.now()
-        ).order_by(Trade.execution_time)
-    
-    return db.execute_query(query_func)
+    return db.fetch_rows(_pending_trades_select(now, limit), Trade)
+
+def _trade_by_id_select(trade_id: int, user_id: Optional[int]):
+    statement = select_columns(Trade).where(Trade.Trade_ID == trade_id)
+    if user_id:
+        statement = statement.where(Trade.User_ID == user_id)
+    return statement.limit(1)
 
 def get_trade_by_id(trade_id: int, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """Get a trade by its ID, optionally filtering by user ID."""
     db = get_db()
-    
-    def query_func(session):
-        query = session.query(Trade).filter(Trade.Trade_ID == trade_id)
-        if user_id:
-            query = query.filter(Trade.User_ID == user_id)
-        return query.first()
-    
-    results = db.execute_query(query_func)
+    results = db.fetch_rows(_trade_by_id_select(trade_id, user_id), Trade)
     return results[0] if results else None
 
 def update_trade_status(trade_id: int, update_data: Dict[str, Any]) -> bool:
     """Update a trade's status and related fields."""
     db = get_db()
     
-    # Get the existing trade
-    trade = get_trade_by_id(trade_id)
-    if not trade:
-        logger.error(f"Trade {trade_id} not found for status update")
+    # Update the trade and its rollup contribution in one transaction
+    try:
+        with db.Session() as session, session.begin():
+            user_id = _update_trade(session, trade_id, update_data)
+    except Exception as e:
+        logger.error(f"Error updating trade {trade_id}: {str(e)}")
         return False
     
-    # Update the trade
-    return db.update_row(Trade, update_data, "Trade_ID", trade_id)
+    if user_id is None:
+        logger.error(f"Trade {trade_id} not found for status update")
+        return False
+    _user_trades_cache.invalidate(user_id)
+    return True
 
 def update_battery_level(user_id: int, new_level: float) -> bool:
     """Update a user's battery level."""
     db = get_db()
     
     # Get the existing battery
-    def battery_query(session):
-        return session.query(Battery).filter(Battery.User_ID == user_id).first()
-    
-    battery_results = db.execute_query(battery_query)
+    battery_results = db.fetch_rows(_battery_select(user_id), Battery)
     if not battery_results:
         logger.error(f"Battery for user {user_id} not found")
         return False
@@ -711,22 +2076,24 @@ def update_battery_level(user_id: int, new_level: float) -> bool:
     
     return db.update_row(Battery, update_data, "User_ID", user_id)
 
-def get_market_data_today(delivery_period: int = None, resolution: int = None) -> List[Dict[str, Any]]:
-    """Get market data for today."""
-    db = get_db()
+def _market_data_today_select(delivery_period: Optional[int], market: str):
     today = datetime.now().strftime("%Y-%m-%d")
-    
-    def query_func(session):
-        query = session.query(MarketData).filter(MarketData.delivery_day == today)
+    statement = select_columns(MarketData).where(
+        MarketData.market == market,
+        MarketData.delivery_day == today
+    )
+    
+    if delivery_period:
+        # Convert delivery_period (hour) to delivery_period string format
+        period_str = f"{delivery_period:02d}:00-{(delivery_period+1):02d}:00"
+        statement = statement.where(MarketData.delivery_period == period_str)
         
-        if delivery_period:
-            # Convert delivery_period (hour) to delivery_period string format
-            period_str = f"{delivery_period:02d}:00-{(delivery_period+1):02d}:00"
-            query = query.filter(MarketData.delivery_period == period_str)
-            
-        return query.order_by(MarketData.delivery_period)
-    
-    return db.execute_query(query_func)
+    return statement.order_by(MarketData.delivery_period)
+
+def get_market_data_today(delivery_period: int = None, resolution: int = None, market: str = "Germany") -> List[Dict[str, Any]]:
+    """Get market data for today."""
+    db = get_db()
+    return db.fetch_rows(_market_data_today_select(delivery_period, market), MarketData)
 
 def update_portfolio_balance(user_id: int, update_data: Dict[str, Any]) -> bool:
     """Update a user's portfolio balance and related fields."""
@@ -751,7 +2118,7 @@ def create_portfolio(user_id: int) -> Dict[str, Any]:
     # Check if portfolio already exists
     portfolio = get_portfolio_by_user_id(user_id)
     if portfolio:
-        logger.info(f"Portfolio already exists for user {user_id}")
+        logger.debug("Portfolio already exists for user %s", user_id)
         return portfolio
     
     # Create new portfolio
@@ -772,36 +2139,526 @@ def create_portfolio(user_id: int) -> Dict[str, Any]:
     else:
         return {"error": "Failed to create portfolio"}
 
-def get_current_market_price(market: str = "Germany") -> float:
-    """Get the current market price (latest price for the current hour)."""
-    db = get_db()
-    
-    # Get the current hour
+# Trade execution
+# A buy or sell moves energy in or out of the user's battery and records the trade.
+# Both happen in one transaction: the capacity check is folded into a conditional
+# UPDATE, so concurrent trades against the same battery cannot overdraw or overfill it.
+
+def _battery_trade_update(user_id: int, trade_type: str, quantity: float, now: datetime):
+    """Conditional UPDATE that applies the trade only if the battery can take it."""
+    stored_energy = Battery.current_level * Battery.capacity / 100.0
+    level_change = quantity * 100.0 / Battery.capacity
+    if trade_type == "buy":
+        new_level = func.min(Battery.current_level + level_change, 100.0)  # Cap at 100%
+        has_room = Battery.capacity - stored_energy >= quantity
+    else:
+        new_level = func.max(Battery.current_level - level_change, 0.0)  # Don't go below 0%
+        has_room = stored_energy >= quantity
+
+    # Same battery _battery_select returns when a user has more than one
+    first_battery = aliased(Battery)
+    first_battery_id = select(func.min(first_battery.Battery_ID)).where(
+        first_battery.User_ID == user_id
+    ).scalar_subquery()
+
+    return (
+        update(Battery)
+        .where(Battery.Battery_ID == first_battery_id, has_room)
+        .values(current_level=new_level, updated_at=now)
+        .returning(Battery.current_level, Battery.capacity)
+    )
+
+def _execute_battery_trade(
+    session: Session,
+    user_id: int,
+    trade_type: str,
+    quantity: float,
+    price: float,
+    market: str
+) -> Dict[str, Any]:
+    """Body of the trade transaction; the caller owns the session and commits."""
     now = datetime.now()
-    current_hour = now.hour
-    today = now.strftime('%Y-%m-%d')
-    
-    # Format the current period string
-    current_period = f"{current_hour:02d}:00-{(current_hour+1):02d}:00"
-    
-    # Query for current hour's data
-    def query_func(session):
-        return session.query(MarketData).filter(
-            MarketData.delivery_day == today,
-            MarketData.market == market,
-            MarketData.delivery_period == current_period
+    battery_update = _battery_trade_update(user_id, trade_type, quantity, now)
+
+    row = session.execute(battery_update).first()
+    if row is None and session.execute(_battery_select(user_id)).first() is None:
+        # First trade for this user: create the default battery in the same transaction
+        session.add(Battery(**_default_battery_data(user_id)))
+        session.flush()
+        row = session.execute(battery_update).first()
+
+    if row is None:
+        current_level, capacity = session.execute(
+            select(Battery.current_level, Battery.capacity)
+            .where(Battery.User_ID == user_id)
+            .order_by(Battery.Battery_ID)
+            .limit(1)
         ).first()
-    
-    current_data = db.execute_query(query_func)
-    
-    # If we have data, return the price
-    if current_data:
-        return current_data.get("close", 50.0)
-    
-    # If no data, create a synthetic price
-    # Base price with time-of-day pattern and random variation
-    base_price = 50 + 10 * math.sin(current_hour / 12 * math.pi)
-    variation = random.uniform(-5, 5)
-    current_price = round(base_price + variation, 2)
-    
-    return current_price 
\ No newline at end of file
+        current_energy = (current_level / 100.0) * capacity
+        if trade_type == "buy":
+            return {
+                "error": f"Not enough capacity in battery. Can only store {capacity - current_energy:.2f} kWh more",
+                "reason": "insufficient_capacity"
+            }
+        return {
+            "error": f"Not enough energy in battery. Only have {current_energy:.2f} kWh available",
+            "reason": "insufficient_energy"
+        }
+
+    new_level, capacity = row
+    trade = Trade(
+        User_ID=user_id,
+        type=trade_type,
+        quantity=quantity,
+        price=price,
+        status="executed",
+        execution_time=now,
+        executed_at=now,
+        created_at=now,
+        resolution=60,  # 1 hour resolution
+        market=market
+    )
+    session.add(trade)
+    session.flush()
+    _apply_trade_to_rollup(session, trade)
+
+    return {
+        # Column values in table order, for the cache write-through after commit
+        "row": tuple(getattr(trade, column.key) for column in Trade.__table__.columns),
+        "Trade_ID": trade.Trade_ID,
+        "type": trade_type,
+        "quantity": quantity,
+        "price": price,
+        "new_level": float(new_level),
+        "capacity": float(capacity),
+        "executed_at": now
+    }
+
+def _finish_battery_trade(user_id: int, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Once the trade transaction has committed, write the new trade through to the cache."""
+    row = result.pop("row", None)
+    if row is not None:
+        _user_trades_cache.add_trade(user_id, row)
+    return result
+
+def execute_battery_trade(
+    user_id: int,
+    trade_type: str,
+    quantity: float,
+    price: float,
+    market: str = "Electricity"
+) -> Dict[str, Any]:
+    """
+    Execute a buy or sell against the user's battery in a single transaction.
+    Returns the executed trade, or a dict with "error" and "reason"
+    ("insufficient_capacity", "insufficient_energy" or "failed").
+    """
+    db = get_db()
+    try:
+        with db.Session() as session, session.begin():
+            result = _execute_battery_trade(session, user_id, trade_type, quantity, price, market)
+    except Exception as e:
+        logger.error(f"Error executing {trade_type} trade for user {user_id}: {e}")
+        return {"error": "Trade execution failed", "reason": "failed"}
+    return _finish_battery_trade(user_id, result)
+
+# Settlement of scheduled trades
+# A batch of due pending trades is settled in one transaction: each trade still
+# pending is applied to its owner's battery in order and executed at the price
+# it was given, or cancelled when the battery cannot take it.
+
+def _battery_level_after(current_level: float, capacity: float, trade_type: str, quantity: float) -> Optional[float]:
+    """Battery level after a trade, or None if the battery cannot take it (the rule _battery_trade_update applies in SQL)."""
+    stored_energy = current_level * capacity / 100.0
+    level_change = quantity * 100.0 / capacity
+    if trade_type == "buy":
+        return min(current_level + level_change, 100.0) if capacity - stored_energy >= quantity else None
+    return max(current_level - level_change, 0.0) if stored_energy >= quantity else None
+
+def _settle_trades(session: Session, settlements: List[Tuple[int, float]], now: datetime) -> Dict[str, Any]:
+    """Body of the settlement transaction; settlements are (Trade_ID, price) in execution order."""
+    trade_ids = [trade_id for trade_id, _ in settlements]
+    # Claiming first takes SQLite's write lock: nothing read below can change until commit,
+    # so battery levels are worked out here rather than with a conditional UPDATE per trade
+    claimed = set(session.execute(
+        update(Trade)
+        .where(Trade.Trade_ID.in_(trade_ids), Trade.status == "pending")
+        .values(updated_at=now)
+        .returning(Trade.Trade_ID)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+    if not claimed:
+        return {"executed": [], "cancelled": [], "skipped": trade_ids}
+
+    trades = {trade.Trade_ID: trade for trade in session.execute(
+        select(Trade).where(Trade.Trade_ID.in_(claimed))
+    ).scalars()}
+    user_ids = {trade.User_ID for trade in trades.values()}
+    # Same battery _battery_select returns when a user has more than one
+    batteries = {battery.User_ID: battery for battery in session.execute(
+        select(Battery).where(Battery.Battery_ID.in_(
+            select(func.min(Battery.Battery_ID)).where(Battery.User_ID.in_(user_ids)).group_by(Battery.User_ID)
+        ))
+    ).scalars()}
+
+    executed, cancelled, rollup_deltas = [], [], {}
+    for trade_id, price in settlements:
+        trade = trades.get(trade_id)
+        if trade is None:
+            continue
+        trade_type = (trade.type or "").lower()
+        new_level = None
+        if trade_type in ("buy", "sell") and trade.quantity and trade.quantity > 0:
+            battery = batteries.get(trade.User_ID)
+            if battery is None:
+                # First trade for this user: create the default battery in the same transaction
+                battery = batteries[trade.User_ID] = Battery(**_default_battery_data(trade.User_ID))
+                session.add(battery)
+            new_level = _battery_level_after(battery.current_level, battery.capacity, trade_type, trade.quantity)
+
+        _add_rollup_delta(rollup_deltas, trade, -1)
+        if new_level is None:
+            trade.status = "cancelled"
+            cancelled.append((trade.User_ID, trade_id))
+        else:
+            battery.current_level = new_level
+            battery.updated_at = now
+            trade.status = "executed"
+            trade.price = price
+            trade.executed_at = now
+            executed.append((trade.User_ID, trade_id, trade.execution_time))
+        _add_rollup_delta(rollup_deltas, trade)
+
+    session.flush()
+    _apply_rollup_deltas(session, rollup_deltas)
+    return {
+        "executed": executed,
+        "cancelled": cancelled,
+        "skipped": [trade_id for trade_id in trade_ids if trade_id not in trades],
+    }
+
+def _finish_settlement(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Once the settlement has committed, drop the cached trade lists of the users involved."""
+    for user_id in {entry[0] for entry in result["executed"] + result["cancelled"]}:
+        _user_trades_cache.invalidate(user_id)
+    return result
+
+def settle_trades(settlements: List[Tuple[int, float]], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Settle (Trade_ID, price) pairs in one transaction, in the given order. Trades
+    no longer pending are skipped. Returns the executed ((User_ID, Trade_ID,
+    execution_time)), cancelled ((User_ID, Trade_ID)) and skipped (Trade_ID)
+    trades, plus "error" if the transaction failed and nothing was settled.
+    """
+    db = get_db()
+    now = now or datetime.now()
+    try:
+        with db.Session() as session, session.begin():
+            result = _settle_trades(session, settlements, now)
+    except Exception as e:
+        logger.error(f"Error settling {len(settlements)} trades: {e}")
+        return {"error": "Settlement failed", "executed": [], "cancelled": [], "skipped": []}
+    return _finish_settlement(result)
+
+def query_plan_statements() -> Dict[str, Any]:
+    """
+    Representative statement for every hot query builder, keyed by helper name.
+    Used to check that each one is served by an index rather than a table scan.
+    """
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    return {
+        "get_user_by_email": _user_by_email_select("user@example.com"),
+        "get_user_by_id": _user_by_id_select(1),
+        "get_portfolio_by_user_id": _portfolio_select(1),
+        "get_battery_status": _battery_select(1),
+        "get_user_trades": _user_trades_select(1, None, None),
+        "get_user_trades (range)": _user_trades_select(1, now - timedelta(days=7), now),
+        "get_user_trades (cursor page)": _user_trades_select(1, None, None, limit=50, cursor=(now, 1000)),
+        "get_trade_aggregates": _trade_aggregates_select(1, now - timedelta(days=365), now, "day"),
+        "get_trade_rollup_aggregates": _rollup_aggregates_select(1, "2024-01-01", "2024-12-31", "day"),
+        "get_trade_by_id": _trade_by_id_select(1, 1),
+        "get_pending_trades": _pending_trades_select(),
+        "get_pending_trades (batch)": _pending_trades_select(now, 500),
+        "get_market_data": _market_data_select(today, today, None, None, "Germany"),
+        "get_market_data_today": _market_data_today_select(None, "Germany"),
+        "get_market_data_today (period)": _market_data_today_select(12, "Germany"),
+        "get_market_versions": _market_versions_select("Germany", VERSIONED_DAY_COLUMNS, "2024-01", "2024-12"),
+        "get_forecasts": _forecasts_select("Germany", now, now + timedelta(days=1)),
+    }
+
+def find_full_scans() -> Dict[str, List[str]]:
+    """Map each hot query that still does a full table scan to its plan lines."""
+    db = get_db()
+    full_scans = {}
+    for name, statement in query_plan_statements().items():
+        plan = db.explain_query_plan(statement)
+        # "SCAN <table>" is a full scan; index use shows up as "SEARCH ... USING INDEX"
+        if any(detail.startswith("SCAN ") and "USING" not in detail for detail in plan):
+            full_scans[name] = plan
+    return full_scans
+
+# Async query helpers
+# Awaitable twins of the helpers above for use from async route handlers.
+# They share the query builders, so both code paths always run the same SQL.
+
+async def get_user_by_email_async(email: str) -> Optional[Dict[str, Any]]:
+    """Get a user by email without blocking the event loop."""
+    db = get_async_db()
+    results = await db.fetch_rows(_user_by_email_select(email), User)
+    return results[0] if results else None
+
+async def get_user_by_id_async(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user by ID without blocking the event loop."""
+    db = get_async_db()
+    results = await db.fetch_rows(_user_by_id_select(user_id), User)
+    return results[0] if results else None
+
+async def set_user_active_async(user_id: int, is_active: bool) -> bool:
+    """Async counterpart of set_user_active."""
+    return await get_async_db().update_row(User, {"is_active": is_active}, "User_ID", user_id)
+
+async def get_portfolio_by_user_id_async(user_id: int) -> Optional[Dict[str, Any]]:
+    """Get a user's portfolio by their user ID without blocking the event loop."""
+    db = get_async_db()
+    results = await db.fetch_rows(_portfolio_select(user_id), Portfolio)
+    return results[0] if results else None
+
+async def get_user_trades_async(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    cache_bypass: bool = False,
+    alias_keys: bool = True,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[Tuple[Optional[datetime], int]] = None
+) -> List[Dict[str, Any]]:
+    """Get trades for a user without blocking the event loop. Shares the sync cache."""
+    if not cache_bypass:
+        cached_trades = _paginate_cached_trades(user_id, start_date, end_date, alias_keys, limit, offset, cursor)
+        if cached_trades is not None:
+            return cached_trades
+
+    db = get_async_db()
+    trades = await db.fetch_rows(_user_trades_select(user_id, start_date, end_date, limit, offset, cursor), Trade, alias_keys)
+
+    if not start_date and not end_date and limit is None and not offset and cursor is None:
+        _user_trades_cache.put(user_id, trades, alias_keys)
+
+    return trades
+
+def stream_user_trades_async(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    alias_keys: bool = True,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[Tuple[Optional[datetime], int]] = None
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """A user's trades in get_user_trades order, in batches from a server-side cursor (never cached)."""
+    db = get_async_db()
+    return db.stream_rows(_user_trades_select(user_id, start_date, end_date, limit, offset, cursor), Trade, alias_keys)
+
+async def create_trade_async(trade_data: Dict[str, Any]) -> bool:
+    """Create a new trade record without blocking the event loop."""
+    if not _prepare_trade_data(trade_data):
+        return False
+
+    db = get_async_db()
+    try:
+        async with db.Session() as session, session.begin():
+            await session.run_sync(_insert_trade, trade_data)
+    except Exception as e:
+        logger.error(f"Error inserting row into trades: {str(e)}")
+        return False
+    _user_trades_cache.invalidate(trade_data["User_ID"])
+    return True
+
+async def get_market_data_async(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    market: str = "Germany"
+) -> List[Dict[str, Any]]:
+    """Get market data without blocking the event loop."""
+    db = get_async_db()
+    return await db.fetch_rows(_market_data_select(start_date, end_date, min_price, max_price, market), MarketData)
+
+def stream_market_data_async(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    market: str = "Germany"
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Market data matching the get_market_data filters, in batches from a server-side cursor."""
+    db = get_async_db()
+    return db.stream_rows(_market_data_select(start_date, end_date, min_price, max_price, market), MarketData)
+
+async def get_market_data_today_async(delivery_period: int = None, resolution: int = None, market: str = "Germany") -> List[Dict[str, Any]]:
+    """Get market data for today without blocking the event loop."""
+    db = get_async_db()
+    return await db.fetch_rows(_market_data_today_select(delivery_period, market), MarketData)
+
+async def get_forecasts_async(
+    market: str = "Germany",
+    start_timestamp: Optional[datetime] = None,
+    end_timestamp: Optional[datetime] = None
+) -> List[Dict[str, Any]]:
+    """Get price forecasts without blocking the event loop."""
+    db = get_async_db()
+    return await db.fetch_rows(_forecasts_select(market, start_timestamp, end_timestamp), Forecast)
+
+async def get_battery_status_async(user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Get a user's battery status without blocking the event loop."""
+    db = get_async_db()
+    return _battery_with_derived_fields(await db.fetch_rows(_battery_select(user_id), Battery))
+
+async def create_battery_if_not_exists_async(user_id: Optional[int] = None) -> Dict[str, Any]:
+    """Create a battery for a user if one doesn't already exist, without blocking the event loop."""
+    if not user_id:
+        logger.error("Cannot create battery without user_id")
+        return {"error": "User ID required"}
+
+    db = get_async_db()
+    check_query = _battery_select(user_id)
+
+    existing_battery = await db.fetch_rows(check_query, Battery)
+    if existing_battery:
+        logger.debug("Battery already exists for user %s", user_id)
+        return existing_battery[0]
+
+    if not await db.insert_row(Battery, _default_battery_data(user_id)):
+        return {"error": "Failed to create battery"}
+
+    logger.info(f"Created new battery for user {user_id}")
+    new_battery = await db.fetch_rows(check_query, Battery)
+    return new_battery[0] if new_battery else {"error": "Failed to retrieve new battery"}
+
+async def execute_battery_trade_async(
+    user_id: int,
+    trade_type: str,
+    quantity: float,
+    price: float,
+    market: str = "Electricity"
+) -> Dict[str, Any]:
+    """Execute a buy or sell in a single transaction without blocking the event loop."""
+    db = get_async_db()
+    try:
+        async with db.Session() as session, session.begin():
+            result = await session.run_sync(
+                _execute_battery_trade, user_id, trade_type, quantity, price, market
+            )
+    except Exception as e:
+        logger.error(f"Error executing {trade_type} trade for user {user_id}: {e}")
+        return {"error": "Trade execution failed", "reason": "failed"}
+    return _finish_battery_trade(user_id, result)
+
+async def update_battery_level_async(user_id: int, new_level: float) -> bool:
+    """Update a user's battery level without blocking the event loop."""
+    db = get_async_db()
+    update_data = {
+        "current_level": new_level,
+        "updated_at": datetime.now()
+    }
+    # update_row already reports a missing battery, so no separate existence check is needed
+    return await db.update_row(Battery, update_data, "User_ID", user_id)
+
+async def get_trade_by_id_async(trade_id: int, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Get a trade by its ID without blocking the event loop."""
+    db = get_async_db()
+    results = await db.fetch_rows(_trade_by_id_select(trade_id, user_id), Trade)
+    return results[0] if results else None
+
+async def update_trade_status_async(trade_id: int, update_data: Dict[str, Any]) -> bool:
+    """Update a trade's status and related fields without blocking the event loop."""
+    db = get_async_db()
+    try:
+        async with db.Session() as session, session.begin():
+            user_id = await session.run_sync(_update_trade, trade_id, update_data)
+    except Exception as e:
+        logger.error(f"Error updating trade {trade_id}: {str(e)}")
+        return False
+
+    if user_id is None:
+        logger.error(f"Trade {trade_id} not found for status update")
+        return False
+    _user_trades_cache.invalidate(user_id)
+    return True
+
+async def get_pending_trades_async(limit: Optional[int] = None, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Get pending trades due by now without blocking the event loop."""
+    db = get_async_db()
+    return await db.fetch_rows(_pending_trades_select(now, limit), Trade)
+
+async def settle_trades_async(settlements: List[Tuple[int, float]], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """settle_trades in one transaction without blocking the event loop."""
+    db = get_async_db()
+    now = now or datetime.now()
+    try:
+        async with db.Session() as session, session.begin():
+            result = await session.run_sync(_settle_trades, settlements, now)
+    except Exception as e:
+        logger.error(f"Error settling {len(settlements)} trades: {e}")
+        return {"error": "Settlement failed", "executed": [], "cancelled": [], "skipped": []}
+    return _finish_settlement(result)
+
+async def get_trade_aggregates_async(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: Optional[str] = None
+) -> Dict[str, Any]:
+    """Aggregate a user's trades by type and status without blocking the event loop."""
+    db = get_async_db()
+    rows = await db.fetch_mappings(_trade_aggregates_select(user_id, start_date, end_date, bucket))
+    return _trade_aggregates(rows, bucket)
+
+async def get_trade_rollup_aggregates_async(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    bucket: Optional[str] = None
+) -> Dict[str, Any]:
+    """Same result as get_trade_aggregates_async, read mostly from the TradeRollup table."""
+    db = get_async_db()
+    rows = await db.fetch_mappings(_rollup_trade_aggregates_select(user_id, start_date, end_date, bucket))
+    return _trade_aggregates(rows, bucket)
+
+async def get_performance_metrics_async(
+    user_id: int,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Get performance metrics for a user without blocking the event loop."""
+    portfolio = await get_portfolio_by_user_id_async(user_id)
+    if not portfolio:
+        return {"error": "Portfolio not found"}
+
+    aggregates = await get_trade_rollup_aggregates_async(user_id, start_date, end_date)
+    return _performance_metrics(user_id, portfolio, aggregates, start_date, end_date)
+
+async def test_db_connection_async() -> bool:
+    """Test the async database connection."""
+    try:
+        db = get_async_db()
+        async with db.Session() as session:
+            await session.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        logger.error(f"Async database connection test failed: {e}")
+        return False
+
+async def get_connection_profile_async() -> Optional[Dict[str, Any]]:
+    """SQLite tuning profile and pool status of the async engine used by the routes."""
+    try:
+        db = get_async_db()
+        profile = await db.connection_profile()
+        profile["file"] = db.engine.url.database
+        return profile
+    except Exception as e:
+        logger.error(f"Error reading database connection profile: {e}")
+        return None
@@ -0,0 +1,53 @@
+import argparse
+import logging
+import os
+import sys
+
+# market_ingest imports the application as the Python_Assignment package
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PACKAGE_PARENT not in sys.path:
+    sys.path.insert(0, PACKAGE_PARENT)
+
+from Python_Assignment.database import BULK_CHUNK_SIZE
+from Python_Assignment.market_ingest import INGEST_TABLES, ingest_market_file
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Bulk-load market data CSV/Parquet files, reporting throughput per file."""
+    parser = argparse.ArgumentParser(description="Load market data from CSV or Parquet files in bulk.")
+    parser.add_argument("files", nargs="+", help=".csv or .parquet files with the target table's column names")
+    parser.add_argument("--table", choices=sorted(INGEST_TABLES), default="market_data", help="target table")
+    parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--insert-only", action="store_true",
+                        help="plain inserts; fails on rows whose market/day/period already exist")
+    args = parser.parse_args()
+
+    # Per-chunk database logging would drown the progress lines
+    logging.getLogger("Python_Assignment.database").setLevel(logging.WARNING)
+
+    def progress(stats):
+        logger.info(f"{stats['file']}: {stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
+
+    total_rows = 0
+    total_seconds = 0.0
+    for path in args.files:
+        try:
+            stats = ingest_market_file(path, args.table, args.chunk_size, not args.insert_only, progress)
+        except Exception as e:
+            logger.error(f"Failed to ingest {path}: {e}")
+            return 1
+        logger.info(f"Ingested {stats['rows']} rows from {path} into {args.table} "
+                    f"in {stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
+        total_rows += stats["rows"]
+        total_seconds += stats["seconds"]
+
+    if len(args.files) > 1:
+        logger.info(f"Ingested {total_rows} rows in {total_seconds:.3f}s "
+                    f"({round(total_rows / max(total_seconds, 1e-9))} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Application logging: records are handed to a QueueHandler on the calling
+thread and written by a QueueListener thread, so request handlers never block
+on file or console I/O.
+
+Environment:
+    LOG_LEVEL           root level (default INFO)
+    LOG_FORMAT          "json" (default) for one JSON object per line, or "text"
+    LOG_FILE            log file (default app.log); empty to log to stderr only
+    LOG_SAMPLE_SECONDS  minimum interval between log_sampled records sharing a key (default 10)
+
+Hot paths log at DEBUG, or through log_sampled, which emits at most one record
+per key per interval and reports how many were suppressed in between.
+"""
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+from typing import Optional
+import copy
+import logging
+import os
+import queue
+import threading
+import time
+
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_SAMPLE_SECONDS = float(os.getenv("LOG_SAMPLE_SECONDS", "10"))
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# LogRecord attributes; anything else on a record came from extra= and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, level, logger, message, extra fields, exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+_traceback_formatter = logging.Formatter()
+
+
+class _QueueHandler(QueueHandler):
+    # The stock prepare() folds the traceback into the message; keep it in exc_text
+    # so the formatter on the writer thread can emit it as its own field
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT,
+                      log_file: Optional[str] = LOG_FILE) -> QueueListener:
+    """
+    Route the root logger through a queue to a writer thread (file and stderr).
+    Safe to call more than once; later calls return the running listener.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+        handlers = [logging.StreamHandler()]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_QueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class _Sampler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}  # key -> [last emitted monotonic time, suppressed count]
+
+    def admit(self, key: str, interval: float) -> Optional[int]:
+        """Number of records suppressed since the last emitted one, or None to suppress this one."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None:
+                self._state[key] = [now, 0]
+                return 0
+            if now - state[0] < interval:
+                state[1] += 1
+                return None
+            suppressed = state[1]
+            state[0], state[1] = now, 0
+            return suppressed
+
+
+_sampler = _Sampler()
+
+
+def log_sampled(logger: logging.Logger, key: str, message: str, *args,
+                level: int = logging.INFO, interval: float = LOG_SAMPLE_SECONDS):
+    """
+    Log at most once per interval for key (per process); message is %-formatted
+    lazily, and the emitted record carries a `suppressed` count.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    suppressed = _sampler.admit(key, interval)
+    if suppressed is not None:
+        logger.log(level, message, *args, extra={"sample_key": key, "suppressed": suppressed})
@@ -0,0 +1,318 @@
+"""
+Arrow / Parquet export of market data.
+
+Bulk market data is assembled as pyarrow Tables straight from columns: SQL rows
+are transposed once per query rather than turned into dicts, and
+MarketSeriesStore / synthetic series hand over their NumPy arrays.
+
+MarketData is additionally cached on disk as Parquet, one file per market and
+delivery month (<PARQUET_CACHE_DIR>/market_data/market=<m>/month=<YYYY-MM>.parquet).
+A range request reads the cached months and queries SQL only for the missing
+ones, writing those back. Committed inserts, updates and deletes of MarketData drop
+the affected partitions through the session hooks at the bottom of this module;
+Core bulk writes call get_parquet_cache().invalidate(...) themselves.
+
+Those only reach this process's cache, so each partition also records the
+MarketDataVersion of its month in the file metadata. Every write bumps that
+counter in its own transaction, whichever process makes it; a read looks up the
+counters of the requested months (a primary key range on a small table) and
+rebuilds the partitions whose month moved on: seed scripts, other workers, or
+writes made before a restart.
+"""
+from sqlalchemy import event, select, func, inspect
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Iterable
+import logging
+import os
+import threading
+import uuid
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from Python_Assignment.database import get_db, get_market_versions, MarketData, DATABASE_URL
+from Python_Assignment.market_store import MarketSeries
+from Python_Assignment.utils.synthetic import iter_germany_market_columns, _germany_constants, GERMANY_FIELDS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def _default_cache_dir() -> str:
+    # Next to the SQLite file, so a different database never sees another one's partitions
+    prefix = "sqlite:///"
+    if DATABASE_URL.startswith(prefix) and DATABASE_URL[len(prefix):] not in ("", ":memory:"):
+        return os.path.splitext(DATABASE_URL[len(prefix):])[0] + "_parquet_cache"
+    return "./parquet_cache"
+
+
+PARQUET_CACHE_DIR = os.getenv("PARQUET_CACHE_DIR") or _default_cache_dir()
+
+# MarketData columns in table order, with their Arrow types
+MARKET_DATA_SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("delivery_day", pa.string()),
+    ("delivery_period", pa.string()),
+    ("cleared", pa.bool_()),
+    ("market", pa.string()),
+    ("high", pa.float64()),
+    ("low", pa.float64()),
+    ("close", pa.float64()),
+    ("open", pa.float64()),
+    ("transaction_volume", pa.float64()),
+    ("created_at", pa.timestamp("us")),
+])
+
+
+# Germany rows (GERMANY_FIELDS) as /germany downloads them, whether stored or synthetic
+GERMANY_SCHEMA = pa.schema([
+    (name, pa.int64() if name == "id" else pa.timestamp("us") if name == "created_at"
+     else pa.string() if name in ("date", "resolution", "delivery_period", "market",
+                                  "contract_open_time", "contract_close_time")
+     else pa.float64())
+    for name in GERMANY_FIELDS
+])
+
+
+def _market_data_table(rows: List[tuple]) -> pa.Table:
+    """Arrow table from MarketData result tuples (columns in table order)."""
+    if not rows:
+        return MARKET_DATA_SCHEMA.empty_table()
+    columns = list(zip(*rows))
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, MARKET_DATA_SCHEMA)],
+        schema=MARKET_DATA_SCHEMA,
+    )
+
+
+# Parquet schema metadata key holding the MarketDataVersion a partition was written at
+VERSION_KEY = b"market_data_version"
+
+
+class MarketParquetCache:
+    """Per-(market, delivery month) Parquet partitions of the market_data table."""
+
+    def __init__(self, root: str = PARQUET_CACHE_DIR):
+        self.root = os.path.join(root, "market_data")
+        self._lock = threading.Lock()
+        # Bumped by invalidate(); a read that started before an invalidation doesn't write back
+        self._generations = {}  # market -> int
+        self.partition_hits = 0
+        self.partition_misses = 0
+        self.stale_partitions = 0
+        self.invalidations = 0
+
+    def _market_dir(self, market: str) -> str:
+        return os.path.join(self.root, f"market={market}")
+
+    def _partition_path(self, market: str, month: str) -> str:
+        return os.path.join(self._market_dir(market), f"month={month}.parquet")
+
+    def cached_months(self, market: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        try:
+            names = os.listdir(self._market_dir(market))
+        except FileNotFoundError:
+            return []
+        months = sorted(name[len("month="):-len(".parquet")] for name in names
+                        if name.startswith("month=") and name.endswith(".parquet"))
+        return [month for month in months
+                if (not start_date or month >= start_date[:7]) and (not end_date or month <= end_date[:7])]
+
+    def _write_partition(self, market: str, month: str, table: pa.Table, version: int):
+        path = self._partition_path(market, month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename so readers never see a partial file
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(table.replace_schema_metadata({VERSION_KEY: str(version).encode()}), temp_path)
+        os.replace(temp_path, path)
+
+    def _read_partition(self, market: str, month: str, version: int) -> Optional[pa.Table]:
+        """The cached month, or None when it is missing or older than the month's version."""
+        path = self._partition_path(market, month)
+        try:
+            # ParquetFile rather than read_table: no dataset discovery (or hive key parsing) per file
+            parquet_file = pq.ParquetFile(path)
+            if (parquet_file.schema_arrow.metadata or {}).get(VERSION_KEY) == str(version).encode():
+                return parquet_file.read().replace_schema_metadata()
+        except (FileNotFoundError, OSError) as e:
+            # Invalidated (or damaged) since listing: fall back to SQL for this month
+            logger.debug(f"Skipping unreadable partition {market}/{month}: {e}")
+            return None
+        # Written before the month's latest write (e.g. by another process): drop it,
+        # the SQL read below writes it back if the month still has rows
+        self.stale_partitions += 1
+        with self._lock:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return None
+
+    def table(
+        self,
+        market: str = "Germany",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> pa.Table:
+        """
+        MarketData rows as an Arrow table, filtered like get_market_data and
+        ordered by delivery day and period.
+        """
+        generation = self._generations.get(market, 0)
+        # Versions before rows: a write landing in between makes the partition
+        # written back look stale on the next read, never the other way round
+        versions = {
+            month: version for (_, month), version in get_market_versions(
+                market, [MarketData.__tablename__], start_date and start_date[:7], end_date and end_date[:7]
+            ).items()
+        }
+        cached = []
+        tables = []
+        for cached_month in self.cached_months(market, start_date, end_date):
+            partition = self._read_partition(market, cached_month, versions.get(cached_month, 0))
+            if partition is not None:
+                tables.append(partition)
+                cached.append(cached_month)
+        self.partition_hits += len(tables)
+
+        # Whole months, so every partition written back is complete
+        month = func.substr(MarketData.delivery_day, 1, 7)
+        statement = select(*MarketData.__table__.columns).where(MarketData.market == market)
+        if start_date:
+            statement = statement.where(MarketData.delivery_day >= start_date[:7])
+        if end_date:
+            statement = statement.where(month <= end_date[:7])
+        if cached:
+            statement = statement.where(month.not_in(cached))
+        statement = statement.order_by(MarketData.delivery_day, MarketData.delivery_period)
+
+        with get_db().engine.connect() as connection:
+            fresh = _market_data_table(connection.execute(statement).all())
+
+        if fresh.num_rows:
+            months = pc.utf8_slice_codeunits(fresh.column("delivery_day"), 0, 7)
+            with self._lock:
+                if self._generations.get(market, 0) == generation:
+                    for value in pc.unique(months).to_pylist():
+                        self._write_partition(market, value, fresh.filter(pc.equal(months, value)),
+                                              versions.get(value, 0))
+                        self.partition_misses += 1
+            tables.append(fresh)
+
+        table = pa.concat_tables(tables) if tables else MARKET_DATA_SCHEMA.empty_table()
+        if start_date:
+            table = table.filter(pc.greater_equal(table.column("delivery_day"), start_date))
+        if end_date:
+            table = table.filter(pc.less_equal(table.column("delivery_day"), end_date))
+        if min_price is not None:
+            table = table.filter(pc.greater_equal(table.column("close"), min_price))
+        if max_price is not None:
+            table = table.filter(pc.less_equal(table.column("close"), max_price))
+        return table.sort_by([("delivery_day", "ascending"), ("delivery_period", "ascending")])
+
+    def invalidate(self, market: str, days: Optional[Iterable[str]] = None):
+        """Drop cached partitions of a market holding any of `days` (all of them when days is None)."""
+        with self._lock:
+            self._generations[market] = self._generations.get(market, 0) + 1
+            targets = self.cached_months(market) if days is None else {day[:7] for day in days}
+            for month in targets:
+                try:
+                    os.remove(self._partition_path(market, month))
+                    self.invalidations += 1
+                except FileNotFoundError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "partition_hits": self.partition_hits,
+            "partition_misses": self.partition_misses,
+            "stale_partitions": self.stale_partitions,
+            "invalidations": self.invalidations,
+        }
+
+
+_parquet_cache = MarketParquetCache()
+
+
+def get_parquet_cache() -> MarketParquetCache:
+    return _parquet_cache
+
+
+def _germany_table(columns: Dict[str, Any], count: int) -> pa.Table:
+    """GERMANY_SCHEMA table from array-like columns; columns not given are null, NaN becomes null."""
+    return pa.Table.from_arrays([
+        pa.array(columns[field.name], type=field.type, from_pandas=True) if field.name in columns
+        else pa.nulls(count, field.type)
+        for field in GERMANY_SCHEMA
+    ], schema=GERMANY_SCHEMA)
+
+
+def series_table(series: MarketSeries, market: str) -> pa.Table:
+    """GERMANY_SCHEMA table of a MarketSeries, columns taken from its arrays without row conversion."""
+    count = len(series)
+    columns = series.germany_columns()
+    columns["resolution"] = np.full(count, series.resolution_label())
+    columns["market"] = np.full(count, market)
+    return _germany_table(columns, count)
+
+
+def synthetic_germany_table(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Optional[int] = None,
+    limit: Optional[int] = None
+) -> pa.Table:
+    """Synthetic Germany market data (see utils.synthetic) built block by block from its NumPy columns."""
+    tables = []
+    remaining = limit
+    constants = _germany_constants(resolution)
+    constants["created_at"] = np.datetime64(constants["created_at"], "us")
+    for columns in iter_germany_market_columns(start_date, end_date, resolution, seed):
+        block = {name: values[:remaining] for name, values in columns.items()}
+        count = len(block["id"])
+        block.update((name, np.full(count, value)) for name, value in constants.items())
+        tables.append(_germany_table(block, count))
+        if remaining is not None:
+            remaining -= count
+            if remaining <= 0:
+                break
+    return pa.concat_tables(tables) if tables else GERMANY_SCHEMA.empty_table()
+
+
+# Drop cached partitions for MarketData rows touched by a committed ORM transaction.
+_PENDING_KEY = "parquet_cache_pending"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_market_days(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if getattr(obj, "__tablename__", None) != MarketData.__tablename__:
+            continue
+        pending = session.info.setdefault(_PENDING_KEY, set())
+        pending.add((obj.market, obj.delivery_day))
+        # A row moved to another day or market also changes its old partition
+        state = inspect(obj)
+        old_markets = state.attrs.market.history.deleted or [obj.market]
+        for day in state.attrs.delivery_day.history.deleted or [obj.delivery_day]:
+            for market in old_markets:
+                pending.add((market, day))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_market_days(session):
+    for market, day in session.info.pop(_PENDING_KEY, ()):
+        try:
+            _parquet_cache.invalidate(market, [day])
+        except Exception as e:
+            logger.error(f"Error invalidating parquet cache for {market}/{day}: {e}")
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_market_days(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
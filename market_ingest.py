@@ -0,0 +1,161 @@
+"""
+Bulk ingestion of market data files.
+
+CSV and Parquet files are read in chunks of rows with pyarrow, cast to the
+column types of the target table (market_data or historical_market_data) and
+written with SQLAlchemyDatabase.bulk_upsert, one transaction per chunk, so a
+re-delivered file overwrites the rows it already loaded instead of duplicating
+them. Those are Core statements the session hooks never see, so each committed
+chunk is appended to the market store and drops the Parquet cache partitions
+it touched.
+
+Command line: ingest_market_data.py
+"""
+from sqlalchemy import String, Float, Integer, Boolean, DateTime
+from typing import Dict, Any, List, Iterator, Optional, Callable
+import logging
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from Python_Assignment.database import get_db, MarketData, HistoricalMarketData, BULK_CHUNK_SIZE
+from Python_Assignment.market_store import get_market_store, MARKET_DATA_RESOLUTION
+from Python_Assignment.market_export import get_parquet_cache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Tables a file can be loaded into, by table name
+INGEST_TABLES = {
+    MarketData.__tablename__: MarketData,
+    HistoricalMarketData.__tablename__: HistoricalMarketData,
+}
+
+_ARROW_TYPES = {
+    String: pa.string(),
+    Float: pa.float64(),
+    Integer: pa.int64(),
+    Boolean: pa.bool_(),
+    DateTime: pa.timestamp("us"),
+}
+
+# Price columns handed to the market store, in SERIES_FIELDS order
+_SERIES_COLUMNS = {
+    MarketData: ("delivery_day", ("open", "high", "low", "close", "transaction_volume", "close")),
+    HistoricalMarketData: ("date", ("open_price", "high_price", "low_price", "close_price", "volume", "vwap1h")),
+}
+
+
+def ingest_schema(model_class) -> pa.Schema:
+    """Arrow schema of the columns a file may provide (all but the primary key)."""
+    return pa.schema([
+        (column.name, _ARROW_TYPES[type(column.type)])
+        for column in model_class.__table__.columns if not column.primary_key
+    ])
+
+
+def _read_batches(path: str, schema: pa.Schema, chunk_size: int) -> Iterator[pa.RecordBatch]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        # Typed from the table, so e.g. delivery_day stays a string instead of becoming a date
+        reader = pa_csv.open_csv(
+            path, convert_options=pa_csv.ConvertOptions(column_types={field.name: field.type for field in schema})
+        )
+        return iter(reader)
+    if extension in (".parquet", ".pq"):
+        parquet_file = pq.ParquetFile(path)
+        columns = [name for name in parquet_file.schema_arrow.names if name in schema.names]
+        return parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+    raise ValueError(f"Unsupported file type {extension!r}, expected .csv or .parquet")
+
+
+def iter_file_chunks(path: str, model_class, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[pa.Table]:
+    """
+    Tables of up to chunk_size rows from a CSV or Parquet file, restricted to the
+    model's columns and cast to their types. Unknown columns are ignored.
+    """
+    schema = ingest_schema(model_class)
+    pending = []
+    pending_rows = 0
+    checked = False
+    for batch in _read_batches(path, schema, chunk_size):
+        if not checked:
+            ignored = [name for name in batch.schema.names if name not in schema.names]
+            if ignored:
+                logger.warning(f"Ignoring columns not in {model_class.__tablename__}: {', '.join(ignored)}")
+            checked = True
+        columns = [name for name in batch.schema.names if name in schema.names]
+        table = pa.Table.from_batches([batch]).select(columns)
+        pending.append(table.cast(pa.schema([schema.field(name) for name in columns])))
+        pending_rows += batch.num_rows
+        # CSV batches are sized in bytes: regroup into chunks of chunk_size rows
+        while pending_rows >= chunk_size:
+            combined = pa.concat_tables(pending)
+            yield combined.slice(0, chunk_size)
+            pending = [combined.slice(chunk_size)]
+            pending_rows -= chunk_size
+    if pending_rows:
+        yield pa.concat_tables(pending)
+
+
+def _sync_caches(model_class, rows: List[Dict[str, Any]]):
+    """Apply Core-written rows to the market store and drop their Parquet cache partitions."""
+    day_key, fields = _SERIES_COLUMNS[model_class]
+    groups = {}
+    for row in rows:
+        resolution = MARKET_DATA_RESOLUTION if model_class is MarketData else row["resolution"]
+        groups.setdefault((row.get("market"), resolution), []).append(row)
+    for (market, resolution), group in groups.items():
+        days = [row[day_key] for row in group]
+        try:
+            stamps = [f"{day}T{row['delivery_period'][:5]}" for day, row in zip(days, group)]
+            columns = [np.array([row.get(name) for row in group], dtype=np.float64) for name in fields]
+            get_market_store().append(market, resolution, stamps, *columns)
+        except Exception as e:
+            # The rows are committed; drop the market so it reloads from the database
+            logger.error(f"Error updating market store for {market}: {e}")
+            get_market_store().invalidate(market)
+        if model_class is MarketData:
+            get_parquet_cache().invalidate(market, set(days))
+
+
+def ingest_market_rows(model_class, rows: List[Dict[str, Any]], upsert: bool = True) -> int:
+    """Write rows in one transaction (upserting on UPSERT_KEYS unless upsert=False), then sync the caches."""
+    db = get_db()
+    if upsert:
+        count = db.bulk_upsert(model_class, rows)
+    else:
+        count = db.bulk_insert(model_class, rows)
+    _sync_caches(model_class, rows)
+    return count
+
+
+def ingest_market_file(
+    path: str,
+    table: str = MarketData.__tablename__,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    upsert: bool = True,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Load a CSV or Parquet file into table chunk by chunk. Chunks already committed
+    stay committed if a later one fails. Returns row count, timing and rows/sec;
+    progress, if given, is called with the running totals after every chunk.
+    """
+    model_class = INGEST_TABLES[table]
+    stats = {"file": path, "table": table, "rows": 0, "chunks": 0}
+    start = time.perf_counter()
+    for chunk in iter_file_chunks(path, model_class, chunk_size):
+        stats["rows"] += ingest_market_rows(model_class, chunk.to_pylist(), upsert)
+        stats["chunks"] += 1
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        stats["rows_per_sec"] = round(stats["rows"] / max(stats["seconds"], 1e-9))
+        if progress:
+            progress(stats)
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["rows_per_sec"] = round(stats["rows"] / max(stats["seconds"], 1e-9))
+    return stats
@@ -0,0 +1,501 @@
+"""
+Columnar in-process store for market price series.
+
+Each market's MarketData and HistoricalMarketData rows are held as NumPy arrays
+(period start timestamps plus open/high/low/close, volume and vwap), one series
+per native resolution, sorted by timestamp. Range queries are two searchsorted
+calls and a slice; coarser resolutions (15 -> 30 -> 60 min, daily) are computed
+with ufunc.reduceat over the slice. Neither path touches SQL or loops over rows
+in Python.
+
+A market is loaded from the database on first use. Rows committed through an
+ORM session afterwards are appended by the session hooks at the bottom of this
+module; code that inserts with Core statements (bulk loads) calls
+get_market_store().append(...) itself. Writes from other processes (ingest and
+seed scripts, other workers) are picked up through MarketDataVersion: at most
+every MARKET_STORE_CHECK_INTERVAL seconds a query compares a loaded market's
+month counters with the database and reloads the months that changed.
+"""
+from sqlalchemy import event, select, or_
+from sqlalchemy.orm import Session
+from datetime import datetime, date
+from itertools import repeat
+from typing import Dict, Any, List, Optional, Iterator, Tuple, Union
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+from Python_Assignment.database import get_db, get_market_versions, MarketData, HistoricalMarketData
+from Python_Assignment.utils.synthetic import GERMANY_FIELDS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Columns of every series, in addition to the timestamps
+SERIES_FIELDS = ("open", "high", "low", "close", "volume", "vwap")
+MINUTES_PER_DAY = 24 * 60
+# MarketData has no resolution column: its delivery periods are hourly
+MARKET_DATA_RESOLUTION = 60
+
+_EMPTY_TIMESTAMPS = np.empty(0, dtype="datetime64[m]")
+
+# Seconds between checks of a loaded market against its MarketDataVersion counters
+MARKET_STORE_CHECK_INTERVAL = float(os.getenv("MARKET_STORE_CHECK_INTERVAL", "1"))
+
+
+def _parse_resolution(resolution: Union[int, str, None]) -> int:
+    """Resolution in minutes from 15, "15", "15min" or "day"/"daily"."""
+    if resolution is None:
+        return MARKET_DATA_RESOLUTION
+    if isinstance(resolution, str):
+        value = resolution.strip().lower()
+        if value in ("day", "daily", "1d"):
+            return MINUTES_PER_DAY
+        resolution = int(value[:-3] if value.endswith("min") else value)
+    if resolution <= 0 or MINUTES_PER_DAY % resolution:
+        raise ValueError(f"Resolution must divide a day evenly, got {resolution} minutes")
+    return resolution
+
+
+def _to_minute(value: Union[str, date, datetime, np.datetime64, None]) -> Optional[np.datetime64]:
+    if value is None:
+        return None
+    return np.datetime64(value, "m")
+
+
+def _period_starts(days: List[str], periods: List[str]) -> np.ndarray:
+    """Vectorized "YYYY-MM-DD" + "HH:MM-HH:MM" -> datetime64[m] of the period start."""
+    if not days:
+        return _EMPTY_TIMESTAMPS
+    stamps = np.char.add(np.char.add(np.asarray(days, dtype="U10"), "T"), np.asarray(periods, dtype="U5"))
+    return stamps.astype("datetime64[m]")
+
+
+def _float_column(values) -> np.ndarray:
+    # None becomes NaN
+    return np.asarray(values, dtype=np.float64)
+
+
+class MarketSeries:
+    """
+    One market's prices at one native resolution.
+
+    timestamps is ascending and unique (period start, minute precision); the
+    field arrays are aligned with it. Instances are treated as immutable:
+    merge() returns a new series, so readers never see a half-updated one.
+    """
+
+    __slots__ = ("resolution", "timestamps") + SERIES_FIELDS
+
+    def __init__(self, resolution: int, timestamps: np.ndarray, **fields: np.ndarray):
+        self.resolution = resolution
+        self.timestamps = timestamps
+        for name in SERIES_FIELDS:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def empty(cls, resolution: int) -> "MarketSeries":
+        return cls(resolution, _EMPTY_TIMESTAMPS, **{name: np.empty(0) for name in SERIES_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {"timestamp": self.timestamps, **{name: getattr(self, name) for name in SERIES_FIELDS}}
+
+    def merge(self, timestamps: np.ndarray, **fields: np.ndarray) -> "MarketSeries":
+        """Return a new series with these points added; a point at an existing timestamp replaces it."""
+        if not len(timestamps):
+            return self
+        if not len(self) or (timestamps[0] > self.timestamps[-1] and np.all(timestamps[1:] > timestamps[:-1])):
+            # Appending newer points in order, the common case for live inserts
+            merged_ts = np.concatenate([self.timestamps, timestamps])
+            merged = {name: np.concatenate([getattr(self, name), fields[name]]) for name in SERIES_FIELDS}
+            return MarketSeries(self.resolution, merged_ts, **merged)
+
+        merged_ts = np.concatenate([self.timestamps, timestamps])
+        order = np.argsort(merged_ts, kind="stable")
+        merged_ts = merged_ts[order]
+        # Keep the last of equal timestamps; the stable sort puts the newest write last
+        keep = np.ones(len(merged_ts), dtype=bool)
+        keep[:-1] = merged_ts[1:] != merged_ts[:-1]
+        merged = {
+            name: np.concatenate([getattr(self, name), fields[name]])[order][keep] for name in SERIES_FIELDS
+        }
+        return MarketSeries(self.resolution, merged_ts[keep], **merged)
+
+    def slice(self, start=None, end=None) -> "MarketSeries":
+        """Points with start <= timestamp < end (either bound may be None)."""
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, _to_minute(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.timestamps, _to_minute(end), side="left"))
+        return self.slice_index(lo, hi)
+
+    def slice_index(self, start: int = 0, stop: Optional[int] = None) -> "MarketSeries":
+        """Points start..stop by position."""
+        return MarketSeries(
+            self.resolution, self.timestamps[start:stop],
+            **{name: getattr(self, name)[start:stop] for name in SERIES_FIELDS}
+        )
+
+    def head(self, count: int) -> "MarketSeries":
+        return self.slice_index(0, count)
+
+    def resample(self, resolution: int) -> "MarketSeries":
+        """
+        Aggregate into buckets of `resolution` minutes aligned to midnight:
+        first open, max high, min low, last close, summed volume and
+        volume-weighted vwap. Buckets with no points are omitted.
+        """
+        if resolution == self.resolution or not len(self):
+            return MarketSeries(resolution, self.timestamps, **{name: getattr(self, name) for name in SERIES_FIELDS})
+        if resolution < self.resolution or resolution % self.resolution:
+            raise ValueError(f"Cannot resample {self.resolution}-minute data to {resolution} minutes")
+
+        minutes = self.timestamps.astype(np.int64)
+        buckets = minutes - minutes % resolution
+        # timestamps are sorted, so every bucket is one contiguous run
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+
+        volume = np.add.reduceat(np.nan_to_num(self.volume), starts)
+        weighted = np.add.reduceat(np.nan_to_num(self.vwap * self.volume), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            vwap = np.where(volume > 0, weighted / volume, np.nan)
+
+        return MarketSeries(
+            resolution,
+            buckets[starts].astype("datetime64[m]"),
+            open=self.open[starts],
+            # fmax/fmin skip NaN unless a whole bucket is NaN
+            high=np.fmax.reduceat(self.high, starts),
+            low=np.fmin.reduceat(self.low, starts),
+            close=self.close[ends],
+            volume=volume,
+            vwap=vwap,
+        )
+
+    def resolution_label(self) -> str:
+        return "1d" if self.resolution == MINUTES_PER_DAY else f"{self.resolution}min"
+
+    def germany_columns(self) -> Dict[str, np.ndarray]:
+        """
+        The series under its GERMANY_FIELDS names: date, delivery_period
+        ("HH:MM-HH:MM", a midnight end as 00:00 like the synthetic rows) and
+        the prices, with vwap as vwap1h, the column it is loaded from.
+        """
+        if len(self):
+            stamps = np.char.partition(np.datetime_as_string(self.timestamps, unit="m"), "T")
+            end_times = np.char.partition(
+                np.datetime_as_string(self.timestamps + np.timedelta64(self.resolution, "m"), unit="m"), "T"
+            )[:, 2]
+        else:
+            # np.char.partition cannot size an empty result
+            stamps, end_times = np.empty((0, 3), dtype=str), np.empty(0, dtype=str)
+        return {
+            "date": stamps[:, 0],
+            "delivery_period": np.char.add(np.char.add(stamps[:, 2], "-"), end_times),
+            "open_price": self.open,
+            "high_price": self.high,
+            "low_price": self.low,
+            "close_price": self.close,
+            "volume": self.volume,
+            "vwap1h": self.vwap,
+        }
+
+    def to_records(self, market: str) -> List[Dict[str, Any]]:
+        """
+        Rows with the keys of the synthetic and stored Germany rows (GERMANY_FIELDS),
+        in that order. The store keeps no id, average, buy/sell volume, 3h vwap,
+        contract times or created_at, so those are None. NaN -> None.
+        """
+        if not len(self):
+            return []
+        columns = {
+            name: (np.where(np.isnan(values), None, values) if values.dtype.kind == "f" else values).tolist()
+            for name, values in self.germany_columns().items()
+        }
+        columns["resolution"] = repeat(self.resolution_label())
+        columns["market"] = repeat(market)
+        return [
+            dict(zip(GERMANY_FIELDS, row))
+            for row in zip(*(columns.get(name, repeat(None)) for name in GERMANY_FIELDS))
+        ]
+
+
+def _sorted_columns(timestamps: np.ndarray, *columns) -> Tuple[np.ndarray, ...]:
+    """Timestamps and float columns (in SERIES_FIELDS order) sorted by timestamp."""
+    order = np.argsort(timestamps, kind="stable")
+    return (timestamps[order],) + tuple(_float_column(column)[order] for column in columns)
+
+
+def _merge_columns(base: MarketSeries, columns: Tuple[np.ndarray, ...]) -> MarketSeries:
+    return base.merge(columns[0], **dict(zip(SERIES_FIELDS, columns[1:])))
+
+
+def _without_months(series: MarketSeries, months: np.ndarray) -> MarketSeries:
+    """The series minus its points in any of months (datetime64[M])."""
+    keep = ~np.isin(series.timestamps.astype("datetime64[M]"), months)
+    return MarketSeries(series.resolution, series.timestamps[keep],
+                        **{name: getattr(series, name)[keep] for name in SERIES_FIELDS})
+
+
+def _month_filter(day_column, months: Optional[List[str]]):
+    """WHERE clause for the "YYYY-MM" months of a "YYYY-MM-DD" column (a range each, so the index applies)."""
+    return or_(*(day_column.between(f"{month}-01", f"{month}-31") for month in months))
+
+
+def iter_record_batches(series: MarketSeries, market: str, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """MarketSeries.to_records in batches of batch_size rows, built lazily."""
+    for start in range(0, len(series), batch_size):
+        yield series.slice_index(start, start + batch_size).to_records(market)
+
+
+class MarketSeriesStore:
+    """
+    Per-market collection of MarketSeries keyed by native resolution.
+
+    Markets are loaded lazily from the database the first time they are
+    queried, and the months whose MarketDataVersion changed are reloaded when
+    a query finds the last check older than check_interval. Loads, reloads and
+    appends hold the lock, so an append arriving during a load waits for it
+    rather than being lost. They replace series objects; readers take a
+    reference and work on it without locking.
+    """
+
+    def __init__(self, check_interval: float = MARKET_STORE_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._series = {}  # market -> {resolution minutes -> MarketSeries}
+        self._versions = {}  # market -> {(table name, month) -> MarketDataVersion at load}
+        self._checked = {}  # market -> time.monotonic() of the last version check
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.reloaded_months = 0
+        self.appended_points = 0
+
+    def _load(self, market: str, months: Optional[List[str]] = None) -> Dict[int, MarketSeries]:
+        """All series of a market, or only their points in months ("YYYY-MM")."""
+        db = get_db()
+        series = {}
+        market_select = (
+            select(MarketData.delivery_day, MarketData.delivery_period, MarketData.open, MarketData.high,
+                   MarketData.low, MarketData.close, MarketData.transaction_volume)
+            .where(MarketData.market == market)
+        )
+        historical_select = (
+            select(HistoricalMarketData.resolution, HistoricalMarketData.date, HistoricalMarketData.delivery_period,
+                   HistoricalMarketData.open_price, HistoricalMarketData.high_price,
+                   HistoricalMarketData.low_price, HistoricalMarketData.close_price,
+                   HistoricalMarketData.volume, HistoricalMarketData.vwap1h)
+            .where(HistoricalMarketData.market == market)
+            .order_by(HistoricalMarketData.resolution)
+        )
+        if months is not None:
+            market_select = market_select.where(_month_filter(MarketData.delivery_day, months))
+            historical_select = historical_select.where(_month_filter(HistoricalMarketData.date, months))
+        with db.engine.connect() as connection:
+            market_rows = connection.execute(market_select).all()
+            historical_rows = connection.execute(historical_select).all()
+
+        if market_rows:
+            days, periods, opens, highs, lows, closes, volumes = zip(*market_rows)
+            # MarketData has no vwap of its own; the close is the best per-period estimate
+            series[MARKET_DATA_RESOLUTION] = _merge_columns(
+                MarketSeries.empty(MARKET_DATA_RESOLUTION),
+                _sorted_columns(_period_starts(days, periods), opens, highs, lows, closes, volumes, closes),
+            )
+
+        # Rows are ordered by resolution, so each resolution is one run
+        start = 0
+        while start < len(historical_rows):
+            label = historical_rows[start][0]
+            stop = start
+            while stop < len(historical_rows) and historical_rows[stop][0] == label:
+                stop += 1
+            try:
+                resolution = _parse_resolution(label)
+            except ValueError:
+                logger.warning(f"Skipping {stop - start} {market} rows with unsupported resolution {label!r}")
+                start = stop
+                continue
+            _, days, periods, opens, highs, lows, closes, volumes, vwaps = zip(*historical_rows[start:stop])
+            base = series.get(resolution, MarketSeries.empty(resolution))
+            series[resolution] = _merge_columns(
+                base, _sorted_columns(_period_starts(days, periods), opens, highs, lows, closes, volumes, vwaps)
+            )
+            start = stop
+
+        logger.debug(f"Loaded {sum(len(s) for s in series.values())} {market} price points into the market store")
+        return series
+
+    def _reload_months(self, market: str, series: Dict[int, MarketSeries], months: List[str]) -> Dict[int, MarketSeries]:
+        """series with its points in months replaced by the database's current rows."""
+        reloaded = self._load(market, months)
+        month_array = np.array(months, dtype="datetime64[M]")
+        updated = {}
+        for resolution in set(series) | set(reloaded):
+            base = _without_months(series.get(resolution, MarketSeries.empty(resolution)), month_array)
+            fresh = reloaded.get(resolution)
+            if fresh is not None:
+                base = base.merge(fresh.timestamps, **{name: getattr(fresh, name) for name in SERIES_FIELDS})
+            if len(base):
+                updated[resolution] = base
+        self.reloaded_months += len(months)
+        return updated
+
+    def _market(self, market: str) -> Dict[int, MarketSeries]:
+        series = self._series.get(market)
+        if series is not None and time.monotonic() - self._checked.get(market, 0.0) < self.check_interval:
+            return series
+        with self._lock:
+            series = self._series.get(market)
+            if series is not None and time.monotonic() - self._checked.get(market, 0.0) < self.check_interval:
+                return series  # Checked by another thread meanwhile
+            # Versions before rows: a write landing in between is reloaded again next check
+            versions = get_market_versions(market)
+            if series is None:
+                series = self._load(market)
+                self.loads += 1
+            else:
+                known = self._versions.get(market, {})
+                changed = sorted({month for (table_name, month), version in versions.items()
+                                  if known.get((table_name, month), 0) != version})
+                if changed:
+                    series = self._reload_months(market, series, changed)
+            self._series[market] = series
+            self._versions[market] = versions
+            self._checked[market] = time.monotonic()
+        return series
+
+    def append(
+        self,
+        market: str,
+        resolution: Union[int, str],
+        timestamps,
+        open=None, high=None, low=None, close=None, volume=None, vwap=None
+    ):
+        """
+        Add points to a market that is already loaded (unloaded markets pick
+        them up from the database when first queried). Column arguments are
+        array-likes aligned with timestamps; missing columns are NaN.
+        """
+        resolution = _parse_resolution(resolution)
+        timestamps = np.asarray(timestamps, dtype="datetime64[m]")
+        nan = np.full(len(timestamps), np.nan)
+        columns = [nan if column is None else column for column in (open, high, low, close, volume, vwap)]
+        sorted_columns = _sorted_columns(timestamps, *columns)
+        with self._lock:
+            # Taken after any load in progress, which therefore either saw these rows or is done
+            series = self._series.get(market)
+            if series is None:
+                return
+            base = series.get(resolution, MarketSeries.empty(resolution))
+            series[resolution] = _merge_columns(base, sorted_columns)
+            self.appended_points += len(timestamps)
+
+    def query(
+        self,
+        market: str,
+        start=None,
+        end=None,
+        resolution: Union[int, str, None] = None
+    ) -> Optional[MarketSeries]:
+        """
+        Points of a market with start <= timestamp < end at the requested
+        resolution (minutes, or "day"). Uses the coarsest native series that
+        divides the resolution and has points in the range, resampling it if
+        needed. Dates as bounds mean midnight. None if no series qualifies.
+        """
+        target = _parse_resolution(resolution)
+        series = self._market(market)
+        if start is not None:
+            # Widen to the bucket boundary so the first bucket is complete
+            start = _to_minute(start)
+            start = start - start.astype(np.int64) % target
+        for native in sorted(series, reverse=True):
+            if target % native:
+                continue
+            window = series[native].slice(start, end)
+            if len(window):
+                return window.resample(target)
+        return None
+
+    def invalidate(self, market: Optional[str] = None):
+        """Forget a market (or all of them); the next query reloads it from the database."""
+        with self._lock:
+            if market is None:
+                self._series.clear()
+                self._versions.clear()
+            else:
+                self._series.pop(market, None)
+                self._versions.pop(market, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "markets": {
+                market: {f"{resolution}min": len(s) for resolution, s in sorted(series.items())}
+                for market, series in self._series.items()
+            },
+            "loads": self.loads,
+            "reloaded_months": self.reloaded_months,
+            "appended_points": self.appended_points,
+        }
+
+
+# Shared store used by the market data routes
+_market_store = MarketSeriesStore()
+
+
+def get_market_store() -> MarketSeriesStore:
+    return _market_store
+
+
+# Keep loaded markets in sync with rows committed through ORM sessions.
+# New MarketData / HistoricalMarketData objects are collected at flush time and
+# appended once the transaction commits; a rollback discards them.
+_PENDING_KEY = "market_store_pending"
+
+
+def _row_point(obj) -> Optional[Tuple[str, int, str, Tuple]]:
+    table = getattr(obj, "__tablename__", None)
+    if table == MarketData.__tablename__:
+        return (obj.market, MARKET_DATA_RESOLUTION, f"{obj.delivery_day}T{obj.delivery_period[:5]}",
+                (obj.open, obj.high, obj.low, obj.close, obj.transaction_volume, obj.close))
+    if table == HistoricalMarketData.__tablename__:
+        return (obj.market, obj.resolution, f"{obj.date}T{obj.delivery_period[:5]}",
+                (obj.open_price, obj.high_price, obj.low_price, obj.close_price, obj.volume, obj.vwap1h))
+    return None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_market_rows(session, flush_context):
+    for obj in session.new:
+        point = _row_point(obj)
+        if point is not None:
+            session.info.setdefault(_PENDING_KEY, []).append(point)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_market_rows(session):
+    points = session.info.pop(_PENDING_KEY, None)
+    if not points:
+        return
+    grouped = {}
+    for market, resolution, stamp, values in points:
+        grouped.setdefault((market, resolution), []).append((stamp, values))
+    for (market, resolution), rows in grouped.items():
+        try:
+            stamps, values = zip(*rows)
+            columns = np.array(values, dtype=np.float64).T
+            _market_store.append(market, resolution, list(stamps), *columns)
+        except Exception as e:
+            # Never fail a committed transaction; drop the market so it reloads
+            logger.error(f"Error updating market store for {market}: {e}")
+            _market_store.invalidate(market)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_market_rows(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,313 @@
+"""
+In-process latency metrics, exposed at /api/metrics in Prometheus text format.
+
+- MetricsMiddleware (added in server.py) times every HTTP request, labelled
+  with the matched route template rather than the raw path.
+- SQLAlchemy cursor events on every Engine (sync, and the async engine's
+  sync_engine) time every statement, labelled with its normalized SQL
+  (literals and IN-lists collapsed to ?) and the database.py helper that
+  issued it.
+
+Histograms are cumulative since process start and kept in memory only;
+observing one is a bisect and two increments under a lock.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import logging
+import re
+import sys
+import threading
+import time
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # only installed alongside SQLAlchemy's asyncio extra
+    getcurrent = None
+
+from Python_Assignment import database
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds; Prometheus' default buckets plus finer steps below 5 ms for SQLite queries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}  # label values tuple -> state
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple = (), amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_number(value)}" for labels, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, labels: Tuple = ()):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def dec(self, labels: Tuple = (), amount: float = 1.0):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect_left(self.buckets, value)  # le buckets: value <= bound
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket (non-cumulative) counts with +Inf last, sum, count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self) -> Dict[Tuple, Dict[str, Any]]:
+        """Count, sum and cumulative bucket counts per label set."""
+        with self._lock:
+            items = [(labels, list(state[0]), state[1], state[2]) for labels, state in self._values.items()]
+        snapshot = {}
+        for labels, counts, total, count in items:
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            snapshot[labels] = {"count": count, "sum": total, "buckets": cumulative}
+        return snapshot
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        bounds = [_format_number(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, state in sorted(self.snapshot().items()):
+            for bound, count in zip(bounds, state["buckets"]):
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {state['sum']!r}")
+            lines.append(f"{self.name}_count{label_text} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+HTTP_REQUEST_DURATION = _registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template, until the last body byte is sent.",
+    ("method", "route", "status"),
+)
+HTTP_REQUESTS_IN_PROGRESS = _registry.gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method",)
+)
+DB_QUERY_DURATION = _registry.histogram(
+    "db_query_duration_seconds", "SQL statement execution time by database.py helper and normalized statement.",
+    ("caller", "statement"),
+)
+DB_QUERY_ERRORS = _registry.counter(
+    "db_query_errors_total", "SQL statements that raised, by database.py helper and normalized statement.",
+    ("caller", "statement"),
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed until they finish."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec((method,))
+            # Routing stores the matched route in the (shared) scope; static files and 404s have none
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, (method, getattr(route, "path", "unmatched"), str(status))
+            )
+
+
+# SQL normalization: literals and value lists collapse to ?, so one statement shape is one label
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+_POSTCOMPILE = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+MAX_STATEMENT_LENGTH = 240
+_NORMALIZED_CACHE_SIZE = 2048
+_normalized = OrderedDict()
+_normalized_lock = threading.Lock()
+
+
+def normalize_sql(statement: str) -> str:
+    """One line, literals replaced by ?, IN-lists and multi-row VALUES collapsed, length capped."""
+    with _normalized_lock:
+        cached = _normalized.get(statement)
+    if cached is not None:
+        return cached
+    text = _WHITESPACE.sub(" ", statement).strip()
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    text = _PLACEHOLDER_LIST.sub("(?)", text)
+    text = _VALUES_LIST.sub(r"\1", text)
+    text = _POSTCOMPILE.sub("(?)", text)
+    if len(text) > MAX_STATEMENT_LENGTH:
+        text = text[:MAX_STATEMENT_LENGTH - 3] + "..."
+    with _normalized_lock:
+        _normalized[statement] = text
+        if len(_normalized) > _NORMALIZED_CACHE_SIZE:
+            _normalized.popitem(last=False)
+    return text
+
+
+_DATABASE_FILE = database.__file__
+
+
+def _caller_from_frames(frame) -> Optional[str]:
+    # The outermost function of the run of database.py frames nearest to the cursor call
+    caller = None
+    while frame is not None:
+        if frame.f_code.co_filename == _DATABASE_FILE:
+            caller = frame.f_code.co_name
+        elif caller is not None:
+            break
+        frame = frame.f_back
+    return caller
+
+
+def _caller_from_greenlet() -> Optional[str]:
+    # Async engine statements run in a child greenlet whose stack ends at SQLAlchemy's
+    # greenlet_spawn; the awaiting coroutines are on the parent greenlet's stack
+    parent = getcurrent().parent if getcurrent is not None else None
+    return _caller_from_frames(parent.gr_frame) if parent is not None else None
+
+
+def _database_caller() -> str:
+    return _caller_from_frames(sys._getframe(2)) or _caller_from_greenlet() or "other"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _observe_query(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_QUERY_DURATION.observe(elapsed, (_database_caller(), normalize_sql(statement)))
+
+
+@event.listens_for(Engine, "handle_error")
+def _count_query_error(exception_context):
+    connection = exception_context.connection
+    starts = connection.info.get("query_start_time") if connection is not None else None
+    if starts:
+        starts.pop()
+    statement = exception_context.statement
+    if statement:
+        DB_QUERY_ERRORS.inc((_database_caller(), normalize_sql(statement)))
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format (0.0.4)."""
+    return _registry.render()
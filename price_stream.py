@@ -0,0 +1,178 @@
+"""
+Push channel for real-time prices (Server-Sent Events at /api/market-data/stream).
+
+One producer task computes each market's price tick once per
+PRICE_STREAM_INTERVAL seconds and serializes it once, then hands the same
+encoded frame to every subscriber of that market. Subscribers start with a
+"snapshot" event (the day's 15-minute history, as /realtime returns it) and
+then get "tick" events carrying only the spot price, the day statistics and
+history points added since the previous tick.
+
+Each subscriber has a bounded queue of PRICE_STREAM_QUEUE frames. A consumer
+that falls that far behind has its backlog dropped and replaced by a fresh
+snapshot (a "resync"), so a slow client costs at most one queue of memory and
+never delays the producer or the other clients. The producer only runs while
+someone is subscribed.
+"""
+from datetime import datetime
+from typing import Dict, Any, Optional, Set
+import asyncio
+import logging
+import os
+import time
+
+import orjson
+
+from Python_Assignment.metrics import get_metrics_registry
+from Python_Assignment.utils.synthetic import generate_sample_price_data, sample_price_tick
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PRICE_STREAM_INTERVAL = float(os.getenv("PRICE_STREAM_INTERVAL", "5"))
+PRICE_STREAM_QUEUE = int(os.getenv("PRICE_STREAM_QUEUE", "16"))
+
+_registry = get_metrics_registry()
+STREAM_SUBSCRIBERS = _registry.gauge(
+    "price_stream_subscribers", "Open price stream connections.", ("market",)
+)
+STREAM_TICKS = _registry.counter(
+    "price_stream_ticks_total", "Price ticks computed and broadcast.", ("market",)
+)
+STREAM_RESYNCS = _registry.counter(
+    "price_stream_resyncs_total", "Slow subscribers whose backlog was replaced by a snapshot.", ("market",)
+)
+STREAM_TICK_SECONDS = _registry.histogram(
+    "price_stream_tick_seconds", "Time to compute, encode and fan out one tick to every subscriber.", ("market",)
+)
+
+
+def sse_frame(event: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class Subscriber:
+    def __init__(self, market: str, queue_size: int):
+        self.market = market
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+
+class PriceStream:
+    def __init__(self, interval: float = PRICE_STREAM_INTERVAL, queue_size: int = PRICE_STREAM_QUEUE):
+        self.interval = interval
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._last_index: Dict[str, tuple] = {}  # market -> (date, last 15-minute index sent)
+        self._snapshots: Dict[str, bytes] = {}  # market -> snapshot frame of the current tick
+        self._snapshot_position: Dict[str, tuple] = {}  # market -> (date, last index) of that snapshot
+        self._task: Optional[asyncio.Task] = None
+        self.ticks = 0
+        self.resyncs = 0
+
+    def subscribe(self, market: str = "Germany") -> Subscriber:
+        subscriber = Subscriber(market, self.queue_size)
+        subscriber.queue.put_nowait(self._snapshot(market))
+        if market not in self._subscribers:
+            # Ticks continue from where this first snapshot ends
+            self._last_index[market] = self._snapshot_position[market]
+        self._subscribers.setdefault(market, set()).add(subscriber)
+        STREAM_SUBSCRIBERS.inc((market,))
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.market)
+        if subscribers and subscriber in subscribers:
+            subscribers.discard(subscriber)
+            STREAM_SUBSCRIBERS.dec((subscriber.market,))
+            if not subscribers:
+                del self._subscribers[subscriber.market]
+                self._last_index.pop(subscriber.market, None)
+                self._snapshots.pop(subscriber.market, None)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _snapshot(self, market: str) -> bytes:
+        # Built at most once per tick, however many clients connect or resync in between
+        frame = self._snapshots.get(market)
+        if frame is None:
+            today = datetime.now().strftime('%Y-%m-%d')
+            snapshot = generate_sample_price_data(today, market)
+            date, last_index = self._last_index.get(market, (None, None))
+            if date == today:
+                # End where the last tick ended, so the next tick's points follow on exactly
+                del snapshot["priceHistory"][last_index + 1:]
+            snapshot["index"] = len(snapshot["priceHistory"]) - 1
+            self._snapshot_position[market] = (today, snapshot["index"])
+            frame = self._snapshots[market] = sse_frame("snapshot", snapshot)
+        return frame
+
+    def _offer(self, subscriber: Subscriber, frame: bytes):
+        try:
+            subscriber.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Too far behind for increments to be useful: start it over from a snapshot
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(self._snapshot(subscriber.market))
+            self.resyncs += 1
+            STREAM_RESYNCS.inc((subscriber.market,))
+
+    def tick(self, now: Optional[datetime] = None):
+        """Compute one tick per subscribed market and queue it for every subscriber."""
+        now = now or datetime.now()
+        today = now.strftime('%Y-%m-%d')
+        self._snapshots.clear()
+        for market, subscribers in list(self._subscribers.items()):
+            started = time.perf_counter()
+            date, last_index = self._last_index.get(market, (None, None))
+            if date != today:
+                # The day rolled over: everyone starts again from a snapshot of the new day
+                frame = self._snapshot(market)
+                self._last_index[market] = self._snapshot_position[market]
+            else:
+                update = sample_price_tick(now, market, last_index)
+                self._last_index[market] = (today, update["index"])
+                frame = sse_frame("tick", update)
+            for subscriber in list(subscribers):
+                self._offer(subscriber, frame)
+            self.ticks += 1
+            STREAM_TICKS.inc((market,))
+            STREAM_TICK_SECONDS.observe(time.perf_counter() - started, (market,))
+
+    async def _run(self):
+        logger.info("Price stream producer started")
+        try:
+            while self._subscribers:
+                await asyncio.sleep(self.interval)
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Price stream tick failed: {e}")
+        finally:
+            logger.info("Price stream producer stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": {market: len(subscribers) for market, subscribers in self._subscribers.items()},
+            "interval_seconds": self.interval,
+            "queue_size": self.queue_size,
+            "producer_running": self._task is not None and not self._task.done(),
+            "ticks": self.ticks,
+            "resyncs": self.resyncs,
+        }
+
+
+_price_stream = PriceStream()
+
+
+def get_price_stream() -> PriceStream:
+    return _price_stream
@@ -0,0 +1,36 @@
+import argparse
+import logging
+import sys
+
+from database import get_db, rebuild_trade_rollups, check_trade_rollups
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Verify or rebuild the trade_rollups table from the raw trades table."""
+    parser = argparse.ArgumentParser(description="Recompute the per-day trade rollups from the trades table.")
+    parser.add_argument("--user-id", type=int, help="only this user's rollups")
+    parser.add_argument("--check", action="store_true", help="report mismatches without rewriting anything")
+    args = parser.parse_args()
+
+    # Initialize database and create tables
+    get_db()
+
+    mismatches = check_trade_rollups(args.user_id)
+    for mismatch in mismatches:
+        logger.warning(
+            f"Rollup mismatch for user {mismatch['User_ID']} on {mismatch['day']} "
+            f"({mismatch['type']}/{mismatch['status']}): stored {mismatch['stored']}, expected {mismatch['expected']}"
+        )
+
+    if args.check:
+        logger.info(f"Rollup check finished with {len(mismatches)} mismatching groups")
+        return 1 if mismatches else 0
+
+    rebuild_trade_rollups(args.user_id)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,15 +3,15 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import datetime, timedelta
 from typing import List
 
-from Python_Assignment.database import get_db, get_user_by_email, User
+from Python_Assignment.database import get_async_db, get_user_by_email_async, User
 from Python_Assignment.models.auth import UserCreate, User as UserModel, Token, LoginRequest
 from Python_Assignment.auth.dependencies import (
-    get_password_hash, 
-    authenticate_user, 
+    authenticate_user_async,
     create_access_token,
     get_current_active_user, 
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from Python_Assignment.auth.passwords import get_password_hash_async, PasswordQueueFull
 
 import logging
 logger = logging.getLogger(__name__)
@@ -19,6 +19,14 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
+def _password_pool_busy() -> HTTPException:
+    # Every bcrypt worker is busy and the wait queue is full: shed the request
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, please retry",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserModel, status_code=status.HTTP_201_CREATED)
 async def register_user(user_data: UserCreate):
     """
@@ -26,7 +34,7 @@ async def register_user(user_data: UserCreate):
     """
     try:
         # Check if user already exists
-        existing_user = get_user_by_email(user_data.email)
+        existing_user = await get_user_by_email_async(user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,8 +42,8 @@ async def register_user(user_data: UserCreate):
             )
         
         # Create new user
-        db = get_db()
-        hashed_password = get_password_hash(user_data.password)
+        db = get_async_db()
+        hashed_password = await get_password_hash_async(user_data.password)
         
         new_user_data = {
             "email": user_data.email,
@@ -46,10 +54,10 @@ async def register_user(user_data: UserCreate):
         }
         
         # Insert user into database
-        db.insert_row(User, new_user_data)
+        await db.insert_row(User, new_user_data)
         
         # Get the created user
-        created_user = get_user_by_email(user_data.email)
+        created_user = await get_user_by_email_async(user_data.email)
         if not created_user:
             logger.error("Failed to retrieve newly created user")
             raise HTTPException(
@@ -57,8 +65,7 @@ async def register_user(user_data: UserCreate):
                 detail="Failed to create user"
             )
         
-        # Log the created user structure to debug response validation
-        logger.info(f"Created user data: {created_user}")
+        logger.info(f"Created user {created_user.get('User_ID')}")
         
         # Make sure all required fields are present for UserModel response
         if "email" not in created_user or "User_ID" not in created_user:
@@ -67,12 +74,14 @@ async def register_user(user_data: UserCreate):
                 created_user["email"] = new_user_data["email"]
                 
             # Log the fixed user data
-            logger.info(f"Fixed user data for response: {created_user}")
+            logger.debug("Fixed user data for response: %s", created_user)
         
         return created_user
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
+    except PasswordQueueFull:
+        raise _password_pool_busy()
     except Exception as e:
         logger.exception(f"Error in register_user: {str(e)}")
         raise HTTPException(
@@ -85,7 +94,10 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    try:
+        user = await authenticate_user_async(form_data.username, form_data.password)
+    except PasswordQueueFull:
+        raise _password_pool_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -106,7 +118,10 @@ async def login(login_data: LoginRequest):
     """
     Login endpoint for clients that don't support OAuth2 form data.
     """
-    user = authenticate_user(login_data.email, login_data.password)
+    try:
+        user = await authenticate_user_async(login_data.email, login_data.password)
+    except PasswordQueueFull:
+        raise _password_pool_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
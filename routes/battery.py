@@ -5,7 +5,7 @@ import logging
 
 from Python_Assignment.models.battery import BatteryStatus, BatteryUpdate
 from Python_Assignment.auth.dependencies import get_current_active_user
-from Python_Assignment.database import get_battery_status, create_trade, update_battery_level, create_battery_if_not_exists
+from Python_Assignment.database import get_battery_status_async, create_trade_async, update_battery_level_async, create_battery_if_not_exists_async
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -24,9 +24,9 @@ async def get_battery_status_api(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Getting battery status for authenticated user_id: {user_id}")
+        logger.debug("Getting battery status for authenticated user_id: %s", user_id)
         
-        battery = get_battery_status(user_id)
+        battery = await get_battery_status_async(user_id)
         if battery:
             # Get the battery status fields
             current_level = battery.get("current_level", 50.0)
@@ -34,9 +34,6 @@ async def get_battery_status_api(
             current_energy = battery.get("current_energy", 50.0)
             remaining_capacity = battery.get("remaining_capacity", 50.0)
             
-            # Log the battery status for debugging
-            logger.info(f"Battery status for user {user_id}: {battery}")
-            
             return {
                 "level": current_level,
                 "capacity": {
@@ -49,7 +46,7 @@ async def get_battery_status_api(
         else:
             # Create a new battery if not found
             logger.info(f"No battery found for user {user_id}. Creating a new one.")
-            battery = create_battery_if_not_exists(user_id)
+            battery = await create_battery_if_not_exists_async(user_id)
             if not battery or "error" in battery:
                 raise HTTPException(status_code=500, detail="Failed to create battery for user")
                 
@@ -82,7 +79,7 @@ async def get_battery_history(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Getting battery history for authenticated user_id: {user_id}")
+        logger.debug("Getting battery history for authenticated user_id: %s", user_id)
         
         today = datetime.now()
         # In a real app, you would query a BatteryHistory table here
@@ -114,11 +111,11 @@ async def charge_battery(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Charging battery for authenticated user_id: {user_id}")
+        logger.debug("Charging battery for authenticated user_id: %s", user_id)
         
-        battery = get_battery_status(user_id)
+        battery = await get_battery_status_async(user_id)
         if not battery:
-            battery = create_battery_if_not_exists(user_id)
+            battery = await create_battery_if_not_exists_async(user_id)
             if not battery or "error" in battery:
                 raise HTTPException(status_code=500, detail="Failed to create battery for user")
         
@@ -130,7 +127,7 @@ async def charge_battery(
             new_level = 100
         
         # Update the battery level in the database
-        update_success = update_battery_level(user_id, new_level)
+        update_success = await update_battery_level_async(user_id, new_level)
         if not update_success:
             logger.error(f"Failed to update battery level for user {user_id}")
             raise HTTPException(status_code=500, detail="Failed to update battery level")
@@ -149,7 +146,7 @@ async def charge_battery(
             "resolution": 60,
             "market": "Battery"
         }
-        create_trade(trade_data)
+        await create_trade_async(trade_data)
         
         return {
             "success": True, 
@@ -176,11 +173,11 @@ async def discharge_battery(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Discharging battery for authenticated user_id: {user_id}")
+        logger.debug("Discharging battery for authenticated user_id: %s", user_id)
         
-        battery = get_battery_status(user_id)
+        battery = await get_battery_status_async(user_id)
         if not battery:
-            battery = create_battery_if_not_exists(user_id)
+            battery = await create_battery_if_not_exists_async(user_id)
             if not battery or "error" in battery:
                 raise HTTPException(status_code=500, detail="Failed to create battery for user")
         
@@ -193,7 +190,7 @@ async def discharge_battery(
             new_level = 0
         
         # Update the battery level in the database
-        update_success = update_battery_level(user_id, new_level)
+        update_success = await update_battery_level_async(user_id, new_level)
         if not update_success:
             logger.error(f"Failed to update battery level for user {user_id}")
             raise HTTPException(status_code=500, detail="Failed to update battery level")
@@ -211,7 +208,7 @@ async def discharge_battery(
             "resolution": 60,
             "market": "Battery"
         }
-        create_trade(trade_data)
+        await create_trade_async(trade_data)
         
         return {
             "success": True, 
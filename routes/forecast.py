@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import logging
-import math
-import random
 
 from Python_Assignment.auth.dependencies import get_current_user
-from Python_Assignment.database import get_db, Forecast
+from Python_Assignment.database import get_db, get_forecasts_async
+from Python_Assignment.utils.responses import FastJSONResponse
+from Python_Assignment.logging_setup import log_sampled
+from Python_Assignment.utils.synthetic import generate_synthetic_forecasts
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -45,7 +46,7 @@ async def get_price_forecasts(
         if not forecasts:
             return []
             
-        return forecasts
+        return FastJSONResponse(forecasts)
     except Exception as e:
         logger.error(f"Error retrieving price forecasts: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving forecasts: {str(e)}")
@@ -58,68 +59,23 @@ async def get_price_forecast(
     current_user: Dict[str, Any] = Depends(get_current_user)
 ):
     try:
-        db = get_db()
         # Define forecast period
         start_time = datetime.now()
         end_time = start_time + timedelta(hours=hours)
         
-        # Create a query function that accepts a session
-        def query_func(session):
-            return session.query(Forecast).filter(
-                Forecast.timestamp >= start_time,
-                Forecast.timestamp <= end_time,
-                Forecast.market == market
-            ).order_by(Forecast.timestamp)
-        
-        # Execute the query
-        forecasts = db.execute_query(query_func)
+        # Query forecasts through the async engine so the event loop stays free
+        forecasts = await get_forecasts_async(market, start_time, end_time)
         
         # If no forecasts found, generate synthetic data
         if not forecasts:
-            logger.info(f"No forecast data found, generating synthetic forecasts for {market}")
+            log_sampled(logger, f"forecast.synthetic.{market}", "No forecast data found, generating synthetic forecasts for %s", market)
             forecasts = generate_synthetic_forecasts(start_time, end_time, market)
             
-        return forecasts
+        return FastJSONResponse(forecasts)
     except Exception as e:
         logger.error(f"Error retrieving price forecast: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving forecast: {str(e)}")
 
-# Helper function to generate synthetic forecasts
-def generate_synthetic_forecasts(start_time, end_time, market):
-    forecasts = []
-    current_time = start_time
-    
-    # Generate hourly forecasts
-    while current_time < end_time:
-        # Create price patterns with daily cycles
-        hour = current_time.hour
-        # Higher prices during morning and evening peaks, lower at night
-        hour_factor = 1.0 + 0.3 * (
-            math.exp(-((hour - 8) ** 2) / 10) +  # Morning peak around 8am
-            math.exp(-((hour - 18) ** 2) / 10)   # Evening peak around 6pm
-        )
-        
-        # Base price with randomness
-        base_price = 50 * hour_factor
-        price = base_price * random.uniform(0.9, 1.1)
-        
-        # Add some trend over days
-        day_offset = (current_time - start_time).days
-        trend_factor = 1 + (day_offset * 0.02)  # Small increasing trend
-        
-        forecast = {
-            "forecast_id": len(forecasts) + 1,
-            "timestamp": current_time.isoformat(),
-            "market": market,
-            "price": round(price * trend_factor, 2),
-            "confidence": round(random.uniform(0.7, 0.95), 2),
-            "created_at": datetime.now().isoformat()
-        }
-        forecasts.append(forecast)
-        current_time += timedelta(hours=1)
-    
-    return forecasts
-
 # Get accuracy metrics for past forecasts
 @router.get("/accuracy", response_model=Dict[str, Any])
 async def get_forecast_accuracy(
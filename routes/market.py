@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional, List
 import logging
 from datetime import datetime, timedelta
-import random
-import math
 
 from Python_Assignment.auth.dependencies import get_current_active_user
-from Python_Assignment.database import get_market_data, get_market_data_today
+from Python_Assignment.database import get_market_data_async, get_market_data_today_async, stream_market_data_async, row_keys, MarketData
+from Python_Assignment.market_store import get_market_store, iter_record_batches
+from Python_Assignment.market_export import get_parquet_cache, series_table, synthetic_germany_table
+from Python_Assignment.utils.export import COLUMNAR_FORMAT_PATTERN, export_response, negotiate_format, columnar_response
+from Python_Assignment.utils.responses import FastJSONResponse
+from Python_Assignment.logging_setup import log_sampled
+from Python_Assignment.price_stream import get_price_stream
+from Python_Assignment.utils.synthetic import (
+    stream_sample_germany_market_data, iter_sample_germany_market_batches,
+    generate_sample_market_data, generate_sample_price_data, synthetic_current_price, GERMANY_FIELDS
+)
 from Python_Assignment.models.market import MarketDataPoint, MarketDataFilter
 
 # Configure logging
@@ -17,11 +27,14 @@ router = APIRouter()
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def get_market_data_api(
+    request: Request,
     start_date: str = Query(None, description="Start date filter in YYYY-MM-DD format"),
     end_date: str = Query(None, description="End date filter in YYYY-MM-DD format"),
     min_price: float = Query(None, description="Minimum price filter"),
     max_price: float = Query(None, description="Maximum price filter"),
     market: str = Query("Germany", description="Market identifier"),
+    format: str = Query("json", pattern=COLUMNAR_FORMAT_PATTERN,
+                        description="json; ndjson/csv to stream the whole range; arrow/parquet for columnar downloads"),
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
     """Get market data with optional filters."""
@@ -31,20 +44,32 @@ async def get_market_data_api(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Fetching market data for authenticated user_id: {user_id}")
+        logger.debug("Fetching market data for authenticated user_id: %s", user_id)
+        
+        format = negotiate_format(request, format)
+        if format in ("arrow", "parquet"):
+            # Columnar download, assembled from the per-day Parquet cache plus SQL for uncached days
+            table = await run_in_threadpool(get_parquet_cache().table, market, start_date, end_date, min_price, max_price)
+            return columnar_response(table, format, f"market_data_{market}")
+        if format != "json":
+            # Stream straight from a server-side cursor, without the synthetic fallback
+            return export_response(
+                stream_market_data_async(start_date, end_date, min_price, max_price, market), format, f"market_data_{market}",
+                row_keys(MarketData)
+            )
         
         # Get data from database
-        market_data = get_market_data(start_date, end_date, min_price, max_price, market)
+        market_data = await get_market_data_async(start_date, end_date, min_price, max_price, market)
         
         # If no data is found and it's for today, generate synthetic data
         if not market_data and (not start_date or start_date == datetime.now().strftime('%Y-%m-%d')):
-            logger.info(f"No market data found for date range, generating synthetic data")
+            log_sampled(logger, "market.synthetic_range", "No market data found for date range, generating synthetic data")
             market_data = generate_sample_market_data(
                 start_date or datetime.now().strftime('%Y-%m-%d'), 
                 market
             )
         
-        return market_data
+        return FastJSONResponse(market_data)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -67,17 +92,17 @@ async def get_market_data_today_api(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Fetching today's market data for authenticated user_id: {user_id}")
+        logger.debug("Fetching today's market data for authenticated user_id: %s", user_id)
         
         today = datetime.now().strftime('%Y-%m-%d')
-        logger.info(f"Fetching market data for date: {today}, market: {market}")
+        logger.debug("Fetching market data for date: %s, market: %s", today, market)
         
         # Get data from database
-        market_data = get_market_data_today(delivery_period)
+        market_data = await get_market_data_today_async(delivery_period, market=market)
         
         # If no data is found, generate synthetic data
         if not market_data:
-            logger.info(f"No market data found for today, generating synthetic data")
+            log_sampled(logger, "market.synthetic_today", "No market data found for today, generating synthetic data")
             market_data = generate_sample_market_data(today, market)
             
             # Filter by delivery period if specified
@@ -85,7 +110,7 @@ async def get_market_data_today_api(
                 period_str = f"{delivery_period:02d}:00-{(delivery_period+1):02d}:00"
                 market_data = [m for m in market_data if m.get("delivery_period") == period_str]
         
-        return market_data
+        return FastJSONResponse(market_data)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -107,7 +132,7 @@ async def get_current_market_price(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Fetching current market price for authenticated user_id: {user_id}")
+        logger.debug("Fetching current market price for authenticated user_id: %s", user_id)
         
         # Get the current hour
         now = datetime.now()
@@ -115,7 +140,7 @@ async def get_current_market_price(
         today = now.strftime('%Y-%m-%d')
         
         # Get today's market data
-        all_data = get_market_data_today(current_hour)
+        all_data = await get_market_data_today_async(current_hour, market=market)
         
         # Filter for the current hour's data
         current_period = f"{current_hour:02d}:00-{(current_hour+1):02d}:00"
@@ -123,7 +148,7 @@ async def get_current_market_price(
         
         # If no data found for current hour, generate it
         if not current_data:
-            logger.info(f"No current market data found, generating synthetic data")
+            log_sampled(logger, "market.synthetic_current", "No current market data found, generating synthetic data")
             all_generated_data = generate_sample_market_data(today, market)
             current_data = [d for d in all_generated_data if d.get("delivery_period") == current_period]
         
@@ -135,9 +160,7 @@ async def get_current_market_price(
             return result
         
         # If still no data, create a simple response with estimated price
-        base_price = 50 + 10 * math.sin(current_hour / 12 * math.pi)
-        variation = random.uniform(-5, 5)
-        current_price = round(base_price + variation, 2)
+        current_price = synthetic_current_price(market, now)
         
         return {
             "market": market,
@@ -153,49 +176,16 @@ async def get_current_market_price(
         logger.error(f"Error getting current market price: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_sample_market_data(date: str, market: str):
-    """Generate synthetic market data for demo/testing purposes."""
-    market_data = []
-    
-    # Convert date string to datetime
-    try:
-        date_obj = datetime.strptime(date, '%Y-%m-%d')
-    except ValueError:
-        # Default to today if invalid date
-        date_obj = datetime.now()
-        date = date_obj.strftime('%Y-%m-%d')
-    
-    # Generate data for each hour of the day
-    for hour in range(24):
-        # Create random but somewhat realistic price patterns
-        base_price = 50 + 10 * math.sin(hour / 12 * math.pi)
-        variation = random.uniform(-5, 5)
-        close_price = base_price + variation
-        
-        # Generate data point
-        data_point = {
-            "id": int(f"{date_obj.year}{date_obj.month:02d}{date_obj.day:02d}{hour:02d}"),
-            "delivery_day": date,
-            "delivery_period": f"{hour:02d}:00-{(hour+1):02d}:00",
-            "cleared": hour < datetime.now().hour if date == datetime.now().strftime('%Y-%m-%d') else True,
-            "market": market,
-            "high": close_price + random.uniform(0, 3),
-            "low": close_price - random.uniform(0, 3),
-            "close": close_price,
-            "open": close_price - random.uniform(-2, 2),
-            "transaction_volume": random.uniform(100, 500),
-            "created_at": datetime.now().isoformat()
-        }
-        market_data.append(data_point)
-    
-    return market_data
-
 @router.get("/germany", response_model=List[Dict[str, Any]])
 async def get_germany_market_data(
+    request: Request,
     start_date: str = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(None, description="End date in YYYY-MM-DD format"),
-    resolution: int = Query(None, description="Time resolution in minutes (15, 30, 60)"),
-    limit: int = Query(1000, description="Maximum number of data points to return"),
+    resolution: int = Query(None, description="Time resolution in minutes (15, 30, 60, 1440 for daily)"),
+    limit: int = Query(None, ge=1, description="Maximum number of data points to return (JSON defaults to 1000)"),
+    seed: int = Query(None, description="Seed for reproducible synthetic data when nothing is stored"),
+    format: str = Query("json", pattern=COLUMNAR_FORMAT_PATTERN,
+                        description="json; ndjson/csv to stream the range; arrow/parquet for columnar downloads"),
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
     """
@@ -207,7 +197,7 @@ async def get_germany_market_data(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Fetching Germany market data for authenticated user_id: {user_id}")
+        logger.debug("Fetching Germany market data for authenticated user_id: %s", user_id)
         
         # Set default dates if not provided
         if not end_date:
@@ -217,17 +207,40 @@ async def get_germany_market_data(
             end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
             start_date = (end_date_obj - timedelta(days=7)).strftime('%Y-%m-%d')
         
-        logger.info(f"Querying Germany market data from {start_date} to {end_date}, resolution: {resolution}")
-        
-        # In a real application, we would query historical market data from the database
-        # For now, generate synthetic data
-        market_data = generate_sample_germany_market_data(start_date, end_date, resolution)
+        logger.debug("Querying Germany market data from %s to %s, resolution: %s", start_date, end_date, resolution)
         
-        # Apply limit
-        if len(market_data) > limit:
-            market_data = market_data[:limit]
-            
-        return market_data
+        # Slice and resample the columnar store; the first call for a market loads it from the database
+        try:
+            end_exclusive = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+            series = await run_in_threadpool(
+                get_market_store().query, "Germany", start_date, end_exclusive, resolution
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        format = negotiate_format(request, format)
+        if format in ("arrow", "parquet"):
+            if series is not None and len(series):
+                table = series_table(series.head(limit), "Germany")
+            else:
+                table = await run_in_threadpool(synthetic_germany_table, start_date, end_date, resolution, seed, limit)
+            return columnar_response(table, format, "market_data_germany")
+        if format != "json":
+            if series is not None and len(series):
+                batches = iter_record_batches(series.head(limit), "Germany")
+            else:
+                batches = iter_sample_germany_market_batches(start_date, end_date, resolution, seed, limit)
+            return export_response(batches, format, "market_data_germany", GERMANY_FIELDS)
+
+        limit = limit or 1000
+        if series is not None and len(series):
+            return FastJSONResponse(series.head(limit).to_records("Germany"))
+
+        # No stored prices for this range: stream synthetic data, generated a block of days at a time
+        return StreamingResponse(
+            stream_sample_germany_market_data(start_date, end_date, resolution, seed, limit),
+            media_type="application/json"
+        )
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -235,90 +248,6 @@ async def get_germany_market_data(
         logger.error(f"Error getting Germany market data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_sample_germany_market_data(start_date, end_date, resolution=None):
-    """Generate synthetic historical market data for Germany."""
-    market_data = []
-    
-    # Convert date strings to datetime
-    try:
-        start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-        end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-    except ValueError:
-        # Default to recent dates if invalid
-        end_date_obj = datetime.now()
-        start_date_obj = end_date_obj - timedelta(days=7)
-    
-    # Use requested resolution or default to hourly (60 min)
-    resolution = resolution or 60
-    minutes_per_day = 24 * 60
-    points_per_day = minutes_per_day // resolution
-    
-    # Generate data for each day in the range
-    current_date = start_date_obj
-    id_counter = 1
-    
-    while current_date <= end_date_obj:
-        date_str = current_date.strftime('%Y-%m-%d')
-        
-        # Base price pattern with daily and weekly patterns
-        day_of_week = current_date.weekday()  # 0-6 (Mon-Sun)
-        weekend_factor = 1.0 - (0.2 if day_of_week >= 5 else 0)  # Lower prices on weekends
-        
-        for point_idx in range(points_per_day):
-            # Time of day influences prices (higher during peak hours)
-            hour_of_day = (point_idx * resolution) // 60
-            minute_of_hour = (point_idx * resolution) % 60
-            
-            # Higher prices during morning and evening peaks
-            time_factor = 1.0 + 0.3 * (
-                math.exp(-((hour_of_day - 8) ** 2) / 10) +  # Morning peak around 8am
-                math.exp(-((hour_of_day - 18) ** 2) / 10)    # Evening peak around 6pm
-            )
-            
-            # Generate timestamp and period string
-            timestamp = current_date.replace(
-                hour=hour_of_day, 
-                minute=minute_of_hour,
-                second=0
-            )
-            
-            period_end = timestamp + timedelta(minutes=resolution)
-            period_str = f"{timestamp.strftime('%H:%M')}-{period_end.strftime('%H:%M')}"
-            
-            # Base price with some randomness
-            base_price = 45 * weekend_factor * time_factor
-            price_noise = random.uniform(0.9, 1.1)
-            avg_price = base_price * price_noise
-            
-            # Create data point
-            data_point = {
-                "id": id_counter,
-                "date": date_str,
-                "resolution": f"{resolution}min",
-                "delivery_period": period_str,
-                "market": "Germany",
-                "high_price": avg_price * random.uniform(1.01, 1.05),
-                "low_price": avg_price * random.uniform(0.95, 0.99),
-                "average_price": avg_price,
-                "open_price": avg_price * random.uniform(0.98, 1.02),
-                "close_price": avg_price * random.uniform(0.98, 1.02),
-                "buy_volume": random.uniform(100, 300),
-                "sell_volume": random.uniform(100, 300),
-                "volume": random.uniform(200, 600),
-                "vwap1h": avg_price * random.uniform(0.99, 1.01),
-                "vwap3h": avg_price * random.uniform(0.98, 1.02),
-                "contract_open_time": (timestamp - timedelta(hours=2)).isoformat(),
-                "contract_close_time": (timestamp - timedelta(minutes=15)).isoformat(),
-                "created_at": datetime.now().isoformat()
-            }
-            
-            market_data.append(data_point)
-            id_counter += 1
-        
-        current_date += timedelta(days=1)
-    
-    return market_data
-
 @router.get("/realtime", response_model=Dict[str, Any])
 async def get_realtime_prices(
     date: Optional[str] = Query(None, description="Date in YYYY-MM-DD format (defaults to today)"),
@@ -334,13 +263,13 @@ async def get_realtime_prices(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Fetching real-time prices for authenticated user_id: {user_id}")
+        logger.debug("Fetching real-time prices for authenticated user_id: %s", user_id)
         
         # Use provided date or default to today
         date_str = date or datetime.now().strftime('%Y-%m-%d')
         
         # In a real application, we would query the latest price data
-        # For demo purposes, generate synthetic data
+        # For demo purposes, serve the (cached, deterministic) synthetic day
         price_data = generate_sample_price_data(date_str)
         
         return price_data
@@ -351,69 +280,44 @@ async def get_realtime_prices(
         logger.error(f"Error getting real-time prices: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-def generate_sample_price_data(date_str: str):
-    """Generate synthetic real-time price data for demo purposes."""
+@router.get("/stream")
+async def stream_prices(
+    market: str = Query("Germany", description="Market identifier"),
+    current_user: Dict[str, Any] = Depends(get_current_active_user)
+):
+    """
+    Server-Sent Events push of real-time prices, replacing polling of /realtime.
+    Sends a "snapshot" event with the day's 15-minute history, then a "tick"
+    event per interval with the spot price, day statistics and only the new
+    history points. A client that falls behind gets a fresh snapshot instead of
+    its backlog.
+    """
     try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    except ValueError:
-        date_obj = datetime.now()
-        date_str = date_obj.strftime('%Y-%m-%d')
-    
-    now = datetime.now()
-    is_today = date_str == now.strftime('%Y-%m-%d')
-    
-    # For historical dates, use a fixed "current time" at end of day
-    reference_time = now if is_today else date_obj.replace(hour=23, minute=0, second=0)
-    
-    # Current price with some randomness
-    hour_of_day = reference_time.hour
-    time_factor = 1.0 + 0.3 * (
-        math.exp(-((hour_of_day - 8) ** 2) / 10) +  # Morning peak around 8am
-        math.exp(-((hour_of_day - 18) ** 2) / 10)    # Evening peak around 6pm
-    )
-    
-    current_price = 45 * time_factor * random.uniform(0.95, 1.05)
-    
-    # Generate price history for the day leading up to the reference time
-    history = []
-    
-    # Generate points every 15 minutes up to the reference time
-    start_time = date_obj.replace(hour=0, minute=0, second=0)
-    current_time = start_time
-    
-    while current_time <= reference_time:
-        hour = current_time.hour
-        minute = current_time.minute
-        
-        # Price factors
-        hour_factor = 1.0 + 0.3 * (
-            math.exp(-((hour - 8) ** 2) / 10) +  # Morning peak around 8am
-            math.exp(-((hour - 18) ** 2) / 10)    # Evening peak around 6pm
+        user_id = current_user.get("User_ID")
+        if user_id is None:
+            raise HTTPException(status_code=401, detail="Invalid user authentication")
+
+        logger.debug("Opening price stream for user_id %s, market %s", user_id, market)
+        price_stream = get_price_stream()
+
+        async def events():
+            # Subscribed inside the generator so the finally always runs when the client goes away
+            subscriber = price_stream.subscribe(market)
+            try:
+                while True:
+                    yield await subscriber.queue.get()
+            finally:
+                price_stream.unsubscribe(subscriber)
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            # Proxies must pass events through as they come
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-        
-        # Add some randomness and trends
-        base_price = 45 * hour_factor
-        noise = math.sin(minute / 60 * math.pi) * 1.5  # Sine wave within the hour
-        random_factor = random.uniform(0.97, 1.03)
-        
-        price = base_price * random_factor + noise
-        
-        history.append({
-            "timestamp": current_time.isoformat(),
-            "price": price
-        })
-        
-        current_time += timedelta(minutes=15)
-    
-    return {
-        "date": date_str,
-        "currentTime": reference_time.isoformat(),
-        "currentPrice": current_price,
-        "currency": "EUR",
-        "unit": "MWh",
-        "market": "Germany",
-        "dayHigh": max(point["price"] for point in history),
-        "dayLow": min(point["price"] for point in history),
-        "dayAverage": sum(point["price"] for point in history) / len(history),
-        "priceHistory": history
-    } 
\ No newline at end of file
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        logger.error(f"Error opening price stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -5,7 +5,7 @@ import logging
 import random
 
 from Python_Assignment.auth.dependencies import get_current_user, get_current_active_user
-from Python_Assignment.database import get_db, get_user_trades
+from Python_Assignment.database import get_trade_rollup_aggregates_async, get_portfolio_by_user_id_async
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,11 +13,52 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
+def _profit_loss_summary(aggregates: Dict[str, Any]) -> Dict[str, Any]:
+    """Trade counts, volumes and P&L figures from get_trade_aggregates totals."""
+    buy = aggregates["executed"]["buy"]
+    sell = aggregates["executed"]["sell"]
+    buy_volume, buy_cost = buy["volume"], buy["value"]
+    sell_volume, sell_revenue = sell["volume"], sell["value"]
+    
+    # Calculate overall P&L
+    net_volume = buy_volume - sell_volume
+    net_cost = buy_cost - sell_revenue
+    
+    # Average prices
+    avg_buy_price = buy_cost / buy_volume if buy_volume > 0 else 0
+    avg_sell_price = sell_revenue / sell_volume if sell_volume > 0 else 0
+    
+    # Profit/Loss calculation
+    profit_loss = sell_revenue - buy_cost
+    profit_loss_per_kWh = profit_loss / (buy_volume + sell_volume) if (buy_volume + sell_volume) > 0 else 0
+    
+    return {
+        "trades": {
+            "total": aggregates["trade_count"],
+            "executed": aggregates["by_status"].get("executed", 0)
+        },
+        "volume": {
+            "buy": buy_volume,
+            "sell": sell_volume,
+            "net": net_volume  # Positive means net buy, negative means net sell
+        },
+        "financials": {
+            "buy_cost": round(buy_cost, 2),
+            "sell_revenue": round(sell_revenue, 2),
+            "net_cost": round(net_cost, 2),  # Positive means net cost, negative means net revenue
+            "avg_buy_price": round(avg_buy_price, 2),
+            "avg_sell_price": round(avg_sell_price, 2),
+            "profit_loss": round(profit_loss, 2),
+            "profit_loss_per_kWh": round(profit_loss_per_kWh, 2)
+        }
+    }
+
 # New endpoint to calculate trade profit/loss
 @router.get("/trade-pnl", response_model=Dict[str, Any])
 async def get_trade_profit_loss(
     start_date: Optional[str] = Query(None, description="Start date in YYYY-MM-DD format"),
     end_date: Optional[str] = Query(None, description="End date in YYYY-MM-DD format"),
+    bucket: Optional[str] = Query(None, pattern="^(day|hour)$", description="Also break the P&L down per day or hour"),
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
     """Calculate profit and loss from executed trades within a date range."""
@@ -26,7 +67,7 @@ async def get_trade_profit_loss(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
         
-        logger.info(f"Calculating trade P&L for user {user_id}")
+        logger.debug("Calculating trade P&L for user %s", user_id)
         
         # Convert date strings to datetime objects if provided
         start_datetime = None
@@ -58,69 +99,22 @@ async def get_trade_profit_loss(
             # Default to current date if not specified
             end_datetime = datetime.now()
         
-        # Get user trades within the specified time period
-        trades = get_user_trades(user_id, start_datetime, end_datetime)
-        
-        # Calculate P&L metrics
-        buy_volume = 0
-        buy_cost = 0
-        sell_volume = 0
-        sell_revenue = 0
-        total_trades = len(trades)
-        executed_trades = 0
-        
-        for trade in trades:
-            if trade.get("status") != "executed":
-                continue
-                
-            executed_trades += 1
-            trade_type = trade.get("type", "").lower()
-            quantity = trade.get("quantity", 0)
-            price = trade.get("price", 0)
-            
-            if trade_type == "buy":
-                buy_volume += quantity
-                buy_cost += quantity * price
-            elif trade_type == "sell":
-                sell_volume += quantity
-                sell_revenue += quantity * price
-        
-        # Calculate overall P&L
-        net_volume = buy_volume - sell_volume
-        net_cost = buy_cost - sell_revenue
+        # Whole days come from the trade rollup, partial edge days from the trades themselves
+        aggregates = await get_trade_rollup_aggregates_async(user_id, start_datetime, end_datetime, bucket)
         
-        # Average prices
-        avg_buy_price = buy_cost / buy_volume if buy_volume > 0 else 0
-        avg_sell_price = sell_revenue / sell_volume if sell_volume > 0 else 0
-        
-        # Profit/Loss calculation
-        profit_loss = sell_revenue - buy_cost
-        profit_loss_per_kWh = profit_loss / (buy_volume + sell_volume) if (buy_volume + sell_volume) > 0 else 0
-        
-        return {
+        result = {
             "period": {
                 "start_date": start_datetime.strftime("%Y-%m-%d"),
                 "end_date": end_datetime.strftime("%Y-%m-%d")
             },
-            "trades": {
-                "total": total_trades,
-                "executed": executed_trades
-            },
-            "volume": {
-                "buy": buy_volume,
-                "sell": sell_volume,
-                "net": net_volume  # Positive means net buy, negative means net sell
-            },
-            "financials": {
-                "buy_cost": round(buy_cost, 2),
-                "sell_revenue": round(sell_revenue, 2),
-                "net_cost": round(net_cost, 2),  # Positive means net cost, negative means net revenue
-                "avg_buy_price": round(avg_buy_price, 2),
-                "avg_sell_price": round(avg_sell_price, 2),
-                "profit_loss": round(profit_loss, 2),
-                "profit_loss_per_kWh": round(profit_loss_per_kWh, 2)
-            }
+            **_profit_loss_summary(aggregates)
         }
+        if bucket:
+            result["buckets"] = [
+                {bucket: period["bucket"], **_profit_loss_summary(period)}
+                for period in aggregates["buckets"]
+            ]
+        return result
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -136,9 +130,13 @@ async def get_portfolio_performance(
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
     try:
-        db = get_db()
         user_id = current_user.get("User_ID")
         
+        # Metrics come from the user's trades; the portfolio only supplies the ID
+        portfolio = await get_portfolio_by_user_id_async(user_id) or {}
+        if portfolio_id is not None and portfolio_id != portfolio.get("Portfolio_ID"):
+            raise HTTPException(status_code=404, detail="Portfolio not found")
+        
         # Calculate date range based on timeframe
         end_date = datetime.now()
         if timeframe == "day":
@@ -150,21 +148,28 @@ async def get_portfolio_performance(
         else:  # default to month
             start_date = end_date - timedelta(days=30)
         
-        # In a real implementation, we would calculate these metrics from trade data
-        # For demo, return sample metrics regardless of whether portfolios are found
+        aggregates = await get_trade_rollup_aggregates_async(user_id, start_date, end_date)
+        buy_cost = aggregates["executed"]["buy"]["value"]
+        profit_loss = aggregates["executed"]["sell"]["value"] - buy_cost
+        total_trades = aggregates["trade_count"]
+        successful_trades = aggregates["by_status"].get("executed", 0)
+        
         return {
-            "portfolio_id": portfolio_id or 1,  # Default to 1 if not provided
+            "portfolio_id": portfolio.get("Portfolio_ID"),
             "timeframe": timeframe,
             "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
             "metrics": {
-                "total_trades": 42,
-                "profit_loss": 2850.75,
-                "profit_loss_percent": 12.45,
-                "successful_trades": 28,
-                "success_rate": 66.7,
-                "avg_trade_duration": 4.2  # hours
+                "total_trades": total_trades,
+                "profit_loss": round(profit_loss, 2),
+                "profit_loss_percent": round(profit_loss / buy_cost * 100, 2) if buy_cost > 0 else 0,  # Return on buy cost
+                "successful_trades": successful_trades,
+                "success_rate": round(successful_trades / total_trades * 100, 1) if total_trades else 0,
+                "avg_trade_duration": None  # Not tracked by the rollup
             }
         }
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
     except Exception as e:
         logger.error(f"Error retrieving portfolio performance: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving performance metrics: {str(e)}")
@@ -1,12 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from typing import Dict, Any
 from datetime import datetime
 import platform
 import sqlite3
 import os
 
-from Python_Assignment.database import test_db_connection
+from Python_Assignment.database import test_db_connection_async, get_connection_profile_async, get_user_trades_cache_stats, get_principal_cache
 from Python_Assignment.auth.dependencies import get_current_active_user
+from Python_Assignment.market_store import get_market_store
+from Python_Assignment.market_export import get_parquet_cache
+from Python_Assignment.utils.synthetic import get_synthetic_cache_stats
+from Python_Assignment.metrics import render_metrics
+from Python_Assignment.auth.passwords import get_password_hasher
+from Python_Assignment.admission import get_admission_controller
+from Python_Assignment.price_stream import get_price_stream
+from Python_Assignment.settlement import get_settlement_scheduler
 
 import logging
 logger = logging.getLogger(__name__)
@@ -19,13 +28,14 @@ async def get_status():
     """
     Get server status and diagnostic information.
     """
-    db_connected = test_db_connection()
+    db_connected = await test_db_connection_async()
+    connection_profile = await get_connection_profile_async() if db_connected else None
     
     # Get SQLite version
     sqlite_version = sqlite3.version
     
     # Check if database file exists
-    db_file_path = "energy_trading.db"
+    db_file_path = connection_profile["file"] if connection_profile else "energy_trading.db"
     db_file_exists = os.path.exists(db_file_path)
     db_file_size = os.path.getsize(db_file_path) if db_file_exists else 0
     
@@ -37,8 +47,22 @@ async def get_status():
             "type": "SQLite",
             "version": sqlite_version,
             "file_exists": db_file_exists,
-            "file_size_bytes": db_file_size
+            "file_size_bytes": db_file_size,
+            "library_version": sqlite3.sqlite_version,
+            "pragmas": connection_profile["pragmas"] if connection_profile else None,
+            "pool": connection_profile["pool"] if connection_profile else None
         },
+        "caches": {
+            "user_trades": get_user_trades_cache_stats(),
+            "auth_principals": get_principal_cache().stats(),
+            "market_series": get_market_store().stats(),
+            "synthetic_series": get_synthetic_cache_stats(),
+            "market_data_parquet": get_parquet_cache().stats()
+        },
+        "password_hashing": get_password_hasher().stats(),
+        "admission": get_admission_controller().stats(),
+        "price_stream": get_price_stream().stats(),
+        "settlement": get_settlement_scheduler().stats(),
         "system": {
             "platform": platform.platform(),
             "python_version": platform.python_version(),
@@ -57,4 +81,11 @@ async def who_am_i(current_user = Depends(get_current_active_user)):
         "name": current_user.get("name", "Anonymous"),
         "is_active": current_user.get("is_active", True),
         "timestamp": datetime.now().isoformat()
-    } 
\ No newline at end of file
+    } 
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Request and SQL statement latency histograms in Prometheus text format.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -3,16 +3,17 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import logging
 import uuid
-import math
-import random
 from pydantic import BaseModel, Field, validator
 
 from Python_Assignment.auth.dependencies import get_current_active_user
-from Python_Assignment.database import get_db, Trade, create_trade, get_user_trades, update_trade_status, get_battery_status, update_battery_level, get_current_market_price, update_portfolio_balance, create_battery_if_not_exists
+from Python_Assignment.database import get_db, Trade, get_user_trades_async, execute_battery_trade_async, encode_trade_cursor, decode_trade_cursor, get_market_data_today_async, stream_user_trades_async, row_keys
 from Python_Assignment.models.trade import TradeRequest, TradeResponse, TradeStatusUpdate
+from Python_Assignment.utils.export import FORMAT_PATTERN, export_response
+from Python_Assignment.utils.responses import FastJSONResponse
+from Python_Assignment.logging_setup import log_sampled
+from Python_Assignment.utils.synthetic import synthetic_current_price
 
 # Setup logger
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Create router
@@ -34,17 +35,22 @@ class ElectricityTradeRequest(BaseModel):
 async def get_trades(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: int = 50,
-    offset: int = 0,
+    limit: int = Query(None, ge=1, le=1000, description="Page size (JSON defaults to 50; ndjson/csv stream everything unless set)"),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    format: str = Query("json", pattern=FORMAT_PATTERN, description="json, or ndjson/csv to stream the whole range"),
     current_user: Dict[str, Any] = Depends(get_current_active_user)
 ):
-    """Get all trades for the authenticated user with optional date filtering."""
+    """
+    Get the authenticated user's trades, newest first, with optional date filtering.
+    When more trades follow, the X-Next-Cursor response header holds the cursor for the next page.
+    """
     try:
         user_id = current_user.get("User_ID")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
         
-        logger.info(f"Getting trades for user {user_id}")
+        logger.debug("Getting trades for user %s", user_id)
         
         # Convert date strings to datetime objects if provided
         start_datetime = None
@@ -64,27 +70,36 @@ async def get_trades(
                 logger.warning(f"Invalid end_date format: {end_date}")
                 raise HTTPException(status_code=400, detail="Invalid end_date format")
         
-        # Use database function to get trades
-        # Limit and offset are not part of the function signature, so we ignore them
-        trades = get_user_trades(user_id, start_datetime, end_datetime)
+        keyset = None
+        if cursor:
+            try:
+                keyset = decode_trade_cursor(cursor)
+            except ValueError:
+                logger.warning(f"Invalid cursor: {cursor}")
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        if format != "json":
+            # Export: stream from a server-side cursor instead of building a page
+            return export_response(
+                stream_user_trades_async(user_id, start_datetime, end_datetime, alias_keys=False,
+                                         limit=limit, offset=offset, cursor=keyset),
+                format, "trades", row_keys(Trade, alias_keys=False)
+            )
         
-        # Apply limit and offset in memory
-        if trades:
-            trades = trades[offset:offset+limit]
-            
-            # Clean up duplicate fields in the response
-            cleaned_trades = []
-            for trade in trades:
-                # Remove lowercase duplicates
-                if 'trade_id' in trade and 'Trade_ID' in trade:
-                    del trade['trade_id']
-                if 'user_id' in trade and 'User_ID' in trade:
-                    del trade['user_id']
-                cleaned_trades.append(trade)
-            
-            return cleaned_trades
+        # Paging happens in SQL; one extra row tells whether there is a next page
+        limit = limit or 50
+        # alias_keys=False leaves out the lowercase trade_id/user_id duplicates
+        trades = await get_user_trades_async(
+            user_id, start_datetime, end_datetime, alias_keys=False,
+            limit=limit + 1, offset=offset, cursor=keyset
+        )
         
-        return []
+        headers = {}
+        if len(trades) > limit:
+            trades = trades[:limit]
+            headers["X-Next-Cursor"] = encode_trade_cursor(trades[-1])
+        
+        return FastJSONResponse(trades, headers=headers)
     except HTTPException:
         # Re-raise HTTP exceptions
         raise 
@@ -92,6 +107,29 @@ async def get_trades(
         logger.error(f"Error retrieving trades: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving trades: {str(e)}")
 
+async def _current_market_price(market: str = "Germany") -> float:
+    """
+    Price per kWh when the request doesn't specify one: the current hour's
+    close, from the database or else the synthetic day /api/market-data/current shows.
+    """
+    now = datetime.now()
+    current_period = f"{now.hour:02d}:00-{(now.hour+1):02d}:00"
+    try:
+        for row in await get_market_data_today_async(now.hour, market=market):
+            if row.get("delivery_period") == current_period and row.get("close") is not None:
+                return row["close"]
+    except Exception as e:
+        logger.error(f"Error getting current price: {e}")
+    return synthetic_current_price(market, now)
+
+def _raise_for_failed_trade(result: Dict[str, Any]):
+    """Map a rejected or failed execute_battery_trade result to an HTTP error."""
+    if "error" not in result:
+        return
+    if result.get("reason") in ("insufficient_capacity", "insufficient_energy"):
+        raise HTTPException(status_code=400, detail=result["error"])
+    raise HTTPException(status_code=500, detail=result["error"])
+
 # Buy electricity endpoint
 @router.post("/buy", response_model=Dict[str, Any])
 async def buy_electricity(
@@ -104,91 +142,21 @@ async def buy_electricity(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Buying electricity for user {user_id}: {request.quantity} kWh")
-        
-        # Get battery status
-        battery = get_battery_status(user_id)
-        if not battery:
-            battery = create_battery_if_not_exists(user_id)
-            if not battery or "error" in battery:
-                raise HTTPException(status_code=500, detail="Failed to get or create battery")
-        
-        # Check if we have enough free capacity in the battery
-        current_level = battery.get("current_level", 0)
-        capacity = battery.get("capacity", 100.0)
-        current_energy = (current_level / 100.0) * capacity
-        remaining_capacity = capacity - current_energy
-        
-        if request.quantity > remaining_capacity:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Not enough capacity in battery. Can only store {remaining_capacity:.2f} kWh more"
-            )
+        log_sampled(logger, "trade.buy", "Buying electricity for user %s: %s kWh", user_id, request.quantity)
         
         # Get current market price if not provided
-        price = request.price
-        if price is None:
-            # Get current market price
-            db = get_db()
-            
-            # Create a function to get the current market price
-            def get_current_price(session):
-                # This is a simple implementation - in a real system, you'd get the actual market price 
-                # from a market data service or API
-                now = datetime.now()
-                current_hour = now.hour
-                
-                # Calculate a synthetic price
-                base_price = 50 + 10 * math.sin(current_hour / 12 * math.pi)
-                variation = random.uniform(-5, 5)
-                return base_price + variation
-            
-            # Use the database helper to execute the function
-            try:
-                import random
-                import math
-                price = get_current_price(None)  # The session is managed internally
-                price = round(price, 2)
-            except Exception as e:
-                logger.error(f"Error getting current price: {e}")
-                price = 45.0  # Default price if we can't get the current price
-        
-        # Calculate new battery level
-        energy_increase = request.quantity
-        percentage_increase = (energy_increase / capacity) * 100
-        new_level = min(current_level + percentage_increase, 100.0)  # Cap at 100%
-        
-        # Update battery level
-        update_success = update_battery_level(user_id, new_level)
-        if not update_success:
-            raise HTTPException(status_code=500, detail="Failed to update battery level")
-        
-        # Create a trade record
-        total_cost = request.quantity * price
-        trade_data = {
-            "User_ID": user_id,
-            "type": "buy",
-            "quantity": request.quantity,
-            "price": price,
-            "status": "executed",
-            "execution_time": datetime.now(),
-            "executed_at": datetime.now(),
-            "created_at": datetime.now(),
-            "resolution": 60,  # 1 hour resolution
-            "market": "Electricity"
-        }
+        price = request.price if request.price is not None else await _current_market_price()
         
-        trade_created = create_trade(trade_data)
-        if not trade_created:
-            logger.error(f"Failed to create trade record for user {user_id}")
-            # Continue anyway since the battery has been updated
+        # Capacity check, battery update and trade record commit together
+        result = await execute_battery_trade_async(user_id, "buy", request.quantity, price)
+        _raise_for_failed_trade(result)
         
         return {
             "success": True,
             "message": f"Successfully bought {request.quantity} kWh of electricity at {price} per kWh",
-            "total_cost": total_cost,
-            "new_battery_level": new_level,
-            "trade_executed": datetime.now().isoformat()
+            "total_cost": request.quantity * price,
+            "new_battery_level": result["new_level"],
+            "trade_executed": result["executed_at"].isoformat()
         }
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -209,90 +177,21 @@ async def sell_electricity(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid user authentication")
             
-        logger.info(f"Selling electricity for user {user_id}: {request.quantity} kWh")
-        
-        # Get battery status
-        battery = get_battery_status(user_id)
-        if not battery:
-            battery = create_battery_if_not_exists(user_id)
-            if not battery or "error" in battery:
-                raise HTTPException(status_code=500, detail="Failed to get or create battery")
-        
-        # Check if we have enough energy in the battery to sell
-        current_level = battery.get("current_level", 0)
-        capacity = battery.get("capacity", 100.0)
-        current_energy = (current_level / 100.0) * capacity
-        
-        if request.quantity > current_energy:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Not enough energy in battery. Only have {current_energy:.2f} kWh available"
-            )
+        log_sampled(logger, "trade.sell", "Selling electricity for user %s: %s kWh", user_id, request.quantity)
         
         # Get current market price if not provided
-        price = request.price
-        if price is None:
-            # Get current market price
-            db = get_db()
-            
-            # Create a function to get the current market price
-            def get_current_price(session):
-                # This is a simple implementation - in a real system, you'd get the actual market price
-                # from a market data service or API
-                now = datetime.now()
-                current_hour = now.hour
-                
-                # Calculate a synthetic price
-                base_price = 50 + 10 * math.sin(current_hour / 12 * math.pi)
-                variation = random.uniform(-5, 5)
-                return base_price + variation
-            
-            # Use the database helper to execute the function
-            try:
-                import random
-                import math
-                price = get_current_price(None)  # The session is managed internally
-                price = round(price, 2)
-            except Exception as e:
-                logger.error(f"Error getting current price: {e}")
-                price = 45.0  # Default price if we can't get the current price
-        
-        # Calculate new battery level
-        energy_decrease = request.quantity
-        percentage_decrease = (energy_decrease / capacity) * 100
-        new_level = max(current_level - percentage_decrease, 0.0)  # Don't go below 0%
-        
-        # Update battery level
-        update_success = update_battery_level(user_id, new_level)
-        if not update_success:
-            raise HTTPException(status_code=500, detail="Failed to update battery level")
-        
-        # Create a trade record
-        total_revenue = request.quantity * price
-        trade_data = {
-            "User_ID": user_id,
-            "type": "sell",
-            "quantity": request.quantity,
-            "price": price,
-            "status": "executed",
-            "execution_time": datetime.now(),
-            "executed_at": datetime.now(),
-            "created_at": datetime.now(),
-            "resolution": 60,  # 1 hour resolution
-            "market": "Electricity"
-        }
+        price = request.price if request.price is not None else await _current_market_price()
         
-        trade_created = create_trade(trade_data)
-        if not trade_created:
-            logger.error(f"Failed to create trade record for user {user_id}")
-            # Continue anyway since the battery has been updated
+        # Energy check, battery update and trade record commit together
+        result = await execute_battery_trade_async(user_id, "sell", request.quantity, price)
+        _raise_for_failed_trade(result)
         
         return {
             "success": True,
             "message": f"Successfully sold {request.quantity} kWh of electricity at {price} per kWh",
-            "total_revenue": total_revenue,
-            "new_battery_level": new_level,
-            "trade_executed": datetime.now().isoformat()
+            "total_revenue": request.quantity * price,
+            "new_battery_level": result["new_level"],
+            "trade_executed": result["executed_at"].isoformat()
         }
     except HTTPException:
         # Re-raise HTTP exceptions
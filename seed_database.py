@@ -4,7 +4,7 @@ import math
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
 from database import (
-    get_db, User, Portfolio, Battery, Trade, MarketData, HistoricalMarketData, Forecast
+    get_db, create_trade, User, Portfolio, Battery, Trade, MarketData, HistoricalMarketData, Forecast
 )
 
 # Configure logging
@@ -194,7 +194,8 @@ def create_sample_trades():
                 "market": "Germany"
             }
             
-            db.insert_row(Trade, trade_data)
+            # create_trade also keeps the trade rollup in step
+            create_trade(trade_data)
         
         logger.info(f"Created {num_trades} sample trades for user {user_id}")
 
@@ -215,6 +216,8 @@ def create_market_data():
     end_date = datetime.now()
     start_date = end_date - timedelta(days=30)
     
+    # Collected and written with one bulk insert instead of a transaction per row
+    rows = []
     current_date = start_date
     while current_date <= end_date:
         date_str = current_date.strftime('%Y-%m-%d')
@@ -244,10 +247,11 @@ def create_market_data():
                 "created_at": datetime.now()
             }
             
-            db.insert_row(MarketData, data_point)
+            rows.append(data_point)
         
         current_date += timedelta(days=1)
     
+    db.bulk_insert(MarketData, rows)
     logger.info(f"Created market data from {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
 
 def create_forecasts():
@@ -267,6 +271,7 @@ def create_forecasts():
     start_timestamp = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
     end_timestamp = start_timestamp + timedelta(days=7)
     
+    rows = []
     current_timestamp = start_timestamp
     while current_timestamp < end_timestamp:
         hour = current_timestamp.hour
@@ -290,9 +295,10 @@ def create_forecasts():
             "created_at": datetime.now()
         }
         
-        db.insert_row(Forecast, forecast_data)
+        rows.append(forecast_data)
         current_timestamp += timedelta(hours=1)
     
+    db.bulk_insert(Forecast, rows)
     logger.info(f"Created forecasts from {start_timestamp} to {end_timestamp}")
 
 def seed_database():
@@ -0,0 +1,278 @@
+"""
+Seed a database at production scale for load and performance tests.
+
+    python seed_load_test.py --users 10000 --trades-per-user 1000 --market-days 365 --forecast-hours 168
+
+Load-test users are loadtest<N>@loadtest.example.com with one shared password
+(--password); their bcrypt hashes are computed in a process pool. Trades, market
+data and forecasts are generated as NumPy columns; trades go to the database
+through bulk_insert_columns (a block of users per transaction), the rest
+through bulk_insert / bulk_upsert.
+
+Re-running is safe and tops up instead of duplicating: existing users are kept,
+users only get the trades they are missing, market data is upserted on its
+natural key and forecast hours that already exist are skipped. Trade rollups
+are rebuilt from the trades table at the end.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+from passlib.context import CryptContext
+from sqlalchemy import select, func
+
+from database import (
+    get_db, rebuild_trade_rollups, User, Portfolio, Battery, Trade, MarketData, HistoricalMarketData, Forecast
+)
+from utils.synthetic import germany_market_columns, columns_to_records, make_rng
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMAIL_DOMAIN = "loadtest.example.com"
+# passlib's bcrypt default, i.e. what production hashes cost to verify
+DEFAULT_BCRYPT_ROUNDS = 12
+
+HISTORICAL_FIELDS = [column.name for column in HistoricalMarketData.__table__.columns if column.name != "id"]
+
+_contexts = {}
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    # Runs in the worker processes; one CryptContext per worker and cost
+    context = _contexts.get(rounds)
+    if context is None:
+        context = _contexts[rounds] = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds)
+    return context.hash(password)
+
+
+def _load_test_email(index: int) -> str:
+    return f"loadtest{index:06d}@{EMAIL_DOMAIN}"
+
+
+def _load_test_user_ids(db):
+    with db.engine.connect() as connection:
+        return [row[0] for row in connection.execute(
+            select(User.User_ID).where(User.email.like(f"%@{EMAIL_DOMAIN}")).order_by(User.User_ID)
+        )]
+
+
+def seed_users(db, count: int, password: str, rounds: int, workers: int):
+    """Create the missing load-test users, hashing their passwords in parallel."""
+    with db.engine.connect() as connection:
+        existing = {row[0] for row in connection.execute(select(User.email).where(User.email.like(f"%@{EMAIL_DOMAIN}")))}
+    emails = [email for email in map(_load_test_email, range(count)) if email not in existing]
+    if emails:
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(partial(_hash_password, rounds=rounds), [password] * len(emails),
+                                   chunksize=max(1, len(emails) // (workers * 8))))
+        logger.info(f"Hashed {len(hashes)} passwords with {workers} workers in {time.perf_counter() - start:.1f}s")
+        now = datetime.now()
+        db.bulk_insert(User, [
+            {"email": email, "hashed_password": hashed, "name": f"Load Test User {email[8:14]}",
+             "created_at": now, "is_active": True}
+            for email, hashed in zip(emails, hashes)
+        ])
+    logger.info(f"Load-test users: {len(existing) + len(emails)} ({len(emails)} new)")
+
+
+def seed_accounts(db, rng: np.random.Generator):
+    """A portfolio and a battery for every load-test user that lacks one."""
+    user_ids = _load_test_user_ids(db)
+    now = datetime.now()
+    for model_class in (Portfolio, Battery):
+        with db.engine.connect() as connection:
+            covered = {row[0] for row in connection.execute(select(model_class.User_ID))}
+        missing = [user_id for user_id in user_ids if user_id not in covered]
+        if not missing:
+            continue
+        count = len(missing)
+        if model_class is Portfolio:
+            columns = {
+                "balance": (10000.0 + rng.uniform(-2000, 2000, count)).tolist(),
+                "profit_loss": rng.uniform(-500, 1500, count).tolist(),
+            }
+        else:
+            columns = {
+                "current_level": rng.uniform(30, 80, count).tolist(),
+                "capacity": rng.choice([50.0, 100.0, 150.0], count).tolist(),
+                "max_charge_rate": [10.0] * count,
+                "max_discharge_rate": [10.0] * count,
+                "efficiency": [0.95] * count,
+            }
+        db.bulk_insert(model_class, [
+            {"User_ID": user_id, **dict(zip(columns, values)), "created_at": now, "updated_at": now}
+            for user_id, *values in zip(missing, *columns.values())
+        ])
+        logger.info(f"Created {count} {model_class.__tablename__}")
+
+
+def _db_timestamps(values: np.ndarray) -> list:
+    """datetime64 values as SQLAlchemy stores DateTime in SQLite; NaT becomes None."""
+    strings = np.char.replace(np.datetime_as_string(values.astype("datetime64[us]"), unit="us"), "T", " ")
+    return np.where(np.isnat(values), None, strings).tolist()
+
+
+def _trade_columns(rng: np.random.Generator, user_ids: np.ndarray, needed: np.ndarray, trade_days: int, now: np.datetime64):
+    """Trade columns (storage form) for user_ids[i] x needed[i], ordered by user and execution time."""
+    users = np.repeat(user_ids, needed)
+    count = len(users)
+    status = rng.choice(np.array(["executed", "cancelled", "pending"]), count, p=[0.9, 0.05, 0.05])
+    pending = status == "pending"
+    executed = status == "executed"
+    # Past trades over the last trade_days; pending ones are scheduled in the coming week
+    offsets = np.where(
+        pending,
+        rng.integers(60, 7 * 86400, count),
+        -rng.integers(0, trade_days * 86400, count),
+    ).astype("timedelta64[s]")
+    execution_time = (now + offsets).astype("datetime64[us]")
+    order = np.lexsort((execution_time, users))
+    users, status, executed, execution_time = users[order], status[order], executed[order], execution_time[order]
+    executed_at = np.where(executed, execution_time + rng.integers(60, 1800, count).astype("timedelta64[s]"),
+                           np.datetime64("NaT"))
+    created_at = execution_time - rng.integers(600, 3600, count).astype("timedelta64[s]")
+    price = rng.uniform(30, 70, count).round(2)
+    created = _db_timestamps(created_at)
+    return {
+        "User_ID": users.tolist(),
+        "type": rng.choice(np.array(["buy", "sell"]), count).tolist(),
+        "quantity": rng.uniform(1, 10, count).round(3).tolist(),
+        "price": np.where(executed, price, None).tolist(),
+        "status": status.tolist(),
+        "execution_time": _db_timestamps(execution_time),
+        "executed_at": _db_timestamps(executed_at),
+        "created_at": created,
+        "updated_at": created,
+        "resolution": rng.choice(np.array([15, 30, 60]), count).tolist(),
+        "market": ["Germany"] * count,
+    }
+
+
+def seed_trades(db, rng: np.random.Generator, trades_per_user: int, trade_days: int, block_users: int):
+    """Top every load-test user up to trades_per_user trades, one transaction per block of users."""
+    user_ids = np.array(_load_test_user_ids(db), dtype=np.int64)
+    with db.engine.connect() as connection:
+        counts = dict(connection.execute(
+            select(Trade.User_ID, func.count()).where(Trade.User_ID.in_(select(User.User_ID).where(
+                User.email.like(f"%@{EMAIL_DOMAIN}")))).group_by(Trade.User_ID)
+        ).all())
+    needed = np.maximum(trades_per_user - np.array([counts.get(user_id, 0) for user_id in user_ids.tolist()],
+                                                   dtype=np.int64), 0)
+    total = int(needed.sum())
+    now = np.datetime64(datetime.now(), "s")
+    written = 0
+    start = time.perf_counter()
+    for block in range(0, len(user_ids), block_users):
+        block_needed = needed[block:block + block_users]
+        if not block_needed.sum():
+            continue
+        written += db.bulk_insert_columns(Trade, _trade_columns(rng, user_ids[block:block + block_users],
+                                                                block_needed, trade_days, now))
+        elapsed = time.perf_counter() - start
+        logger.info(f"Trades: {written}/{total} ({written / max(elapsed, 1e-9):.0f} rows/s)")
+    logger.info(f"Created {written} trades")
+    return written
+
+
+def seed_market_data(db, rng: np.random.Generator, days: int, block_days: int = 31):
+    """days of 15-minute historical data and hourly market data up to today, upserted."""
+    end = np.datetime64(datetime.now().date(), "D")
+    all_days = np.arange(end - days + 1, end + 1, dtype="datetime64[D]")
+    now = datetime.now()
+    written = 0
+    for block in range(0, len(all_days), block_days):
+        days_block = all_days[block:block + block_days]
+        columns = germany_market_columns(days_block, 15, rng, 1)
+        written += db.bulk_upsert(HistoricalMarketData, columns_to_records(
+            columns, {"resolution": "15min", "market": "Germany", "created_at": now}, HISTORICAL_FIELDS
+        ))
+        hourly = germany_market_columns(days_block, 60, rng, 1)
+        names = ("delivery_day", "delivery_period", "high", "low", "close", "open", "transaction_volume")
+        values = [hourly[name].tolist() for name in (
+            "date", "delivery_period", "high_price", "low_price", "close_price", "open_price", "volume"
+        )]
+        written += db.bulk_upsert(MarketData, [
+            {**dict(zip(names, row)), "cleared": True, "market": "Germany", "created_at": now}
+            for row in zip(*values)
+        ])
+    logger.info(f"Upserted {written} market data rows for {days} days")
+
+
+def seed_forecasts(db, rng: np.random.Generator, hours: int):
+    """Hourly forecasts for the next `hours` hours, skipping hours that already have one."""
+    first = np.datetime64(datetime.now().replace(minute=0, second=0, microsecond=0), "h") + 1
+    timestamps = np.arange(first, first + hours, dtype="datetime64[h]")
+    with db.engine.connect() as connection:
+        existing = {row[0] for row in connection.execute(
+            select(Forecast.timestamp).where(Forecast.market == "Germany",
+                                             Forecast.timestamp >= timestamps[0].astype(datetime))
+        )}
+    timestamps = np.array([stamp for stamp in timestamps if stamp.astype(datetime) not in existing],
+                          dtype="datetime64[h]")
+    if not len(timestamps):
+        return
+    count = len(timestamps)
+    hour_of_day = (timestamps - timestamps.astype("datetime64[D]")).astype(np.int64)
+    predicted = 50 + 10 * np.sin(hour_of_day / 12 * np.pi) + rng.uniform(-3, 3, count)
+    confidence = rng.uniform(0.7, 0.95, count)
+    uncertainty = predicted * (1 - confidence)
+    now = datetime.now()
+    db.bulk_insert(Forecast, [
+        {"timestamp": stamp, "market": "Germany", "predicted_price": price, "lower_bound": price - spread,
+         "upper_bound": price + spread, "confidence": level, "created_at": now}
+        for stamp, price, spread, level in zip(timestamps.astype(datetime).tolist(), predicted.tolist(),
+                                               uncertainty.tolist(), confidence.tolist())
+    ])
+    logger.info(f"Created {count} forecasts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a production-scale database for load tests (idempotent).")
+    parser.add_argument("--users", type=int, default=1000, help="load-test users")
+    parser.add_argument("--trades-per-user", type=int, default=100)
+    parser.add_argument("--trade-days", type=int, default=365, help="days of history the trades are spread over")
+    parser.add_argument("--market-days", type=int, default=365, help="days of 15-minute market data up to today")
+    parser.add_argument("--forecast-hours", type=int, default=168, help="forecast horizon in hours")
+    parser.add_argument("--password", default="loadtest123", help="password of every load-test user")
+    parser.add_argument("--bcrypt-rounds", type=int, default=DEFAULT_BCRYPT_ROUNDS,
+                        help="bcrypt cost; lower seeds faster but makes logins cheaper than in production")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="password hashing processes")
+    parser.add_argument("--block-users", type=int, default=200, help="users per trade insert transaction")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the generated data")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    db = get_db()
+    rng = make_rng(args.seed)
+
+    phases = [
+        ("users", lambda: seed_users(db, args.users, args.password, args.bcrypt_rounds, args.workers)),
+        ("accounts", lambda: seed_accounts(db, rng)),
+        ("trades", lambda: seed_trades(db, rng, args.trades_per_user, args.trade_days, args.block_users)),
+        ("trade rollups", lambda: rebuild_trade_rollups()),
+        ("market data", lambda: seed_market_data(db, rng, args.market_days)),
+        ("forecasts", lambda: seed_forecasts(db, rng, args.forecast_hours)),
+    ]
+    for name, phase in phases:
+        phase_start = time.perf_counter()
+        phase()
+        logger.info(f"Seeded {name} in {time.perf_counter() - phase_start:.1f}s")
+
+    # Fresh planner statistics for the new table sizes
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("ANALYZE")
+    logger.info(f"Load-test seeding finished in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
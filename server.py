@@ -9,28 +9,33 @@ import uvicorn
 import os
 
 # Import database for initialization
-from Python_Assignment.database import get_db
+from Python_Assignment.database import get_db, get_async_db
 
 # Import all route modules with updated package structure
 from Python_Assignment.routes import auth, battery, forecast, market, performance, status, trade
+from Python_Assignment.utils.responses import FastJSONResponse
+from Python_Assignment.metrics import MetricsMiddleware
+from Python_Assignment.admission import AdmissionMiddleware
+from Python_Assignment.logging_setup import configure_logging, stop_logging
+from Python_Assignment.auth.passwords import get_password_hasher
+from Python_Assignment.price_stream import get_price_stream
+from Python_Assignment.settlement import get_settlement_scheduler
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (JSON lines to app.log and stderr, written off the event loop)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Create FastAPI application
 app = FastAPI(
     title="Energy Trading Platform API",
-    description="API for energy trading platform with SQLite backend, real-time price data, battery management, and algorithm execution"
+    description="API for energy trading platform with SQLite backend, real-time price data, battery management, and algorithm execution",
+    # orjson serialization for every response (datetimes and NumPy values included)
+    default_response_class=FastJSONResponse
 )
 
+# Per-user token buckets and load shedding; added first so CORS and metrics wrap its 429s
+app.add_middleware(AdmissionMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -38,8 +43,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Request latency histograms (served at /api/metrics); added last so it also times CORS
+app.add_middleware(MetricsMiddleware)
+
 # Include routers from all route modules
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(battery.router, prefix="/api/battery", tags=["Battery Management"])
@@ -61,8 +70,22 @@ async def startup_db_client():
         db = get_db()
         logger.info("Database initialized successfully on startup")
     except Exception as e:
+        # Don't serve requests against a database whose migration failed
         logger.error(f"Error initializing database on startup: {e}")
+        raise
+    # Execute scheduled trades once their execution time has passed
+    get_settlement_scheduler().start()
+
+# Shutdown event to release pooled async connections
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    await get_price_stream().stop()
+    await get_settlement_scheduler().stop()
+    await get_async_db().dispose()
+    get_password_hasher().shutdown()
+    stop_logging()
 
 # Main entry point
 if __name__ == "__main__":
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # log_config=None: uvicorn's loggers propagate to the queued root handler
+    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True, log_config=None) 
\ No newline at end of file
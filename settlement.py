@@ -0,0 +1,242 @@
+"""
+Background execution of scheduled trades.
+
+Trades are created "pending" with an execution_time; once that time has
+passed, the scheduler started in server.py settles them. Every
+SETTLEMENT_INTERVAL seconds it pulls up to SETTLEMENT_BATCH_SIZE x
+SETTLEMENT_CONCURRENCY due trades (earliest first) and prices them against
+the market data for their delivery period. It then splits them by user over
+SETTLEMENT_CONCURRENCY workers, each settling its share in transactions of
+up to SETTLEMENT_BATCH_SIZE trades (see database.settle_trades). A user's
+trades always go to the same worker, so they are applied to the battery in
+execution order. While a pull comes back full, the scheduler pulls again
+straight away instead of waiting for the next tick.
+
+Pricing uses the trade's own resolution (15/30/60 minutes) from the market
+store. If that is missing, it uses the hourly market data covering the
+period, and finally the synthetic close of that hour, as the buy/sell
+endpoints do.
+
+Settling claims each trade (pending -> executed/cancelled) in the same
+transaction, so several server processes can run the scheduler safely.
+
+Environment:
+    SETTLEMENT_ENABLED      run the scheduler (default true)
+    SETTLEMENT_INTERVAL     seconds between pulls when nothing is due (default 5)
+    SETTLEMENT_BATCH_SIZE   trades per settlement transaction (default 200)
+    SETTLEMENT_CONCURRENCY  settlement workers (default 2)
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import asyncio
+import logging
+import os
+import time
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from Python_Assignment.database import get_pending_trades_async, settle_trades_async
+from Python_Assignment.logging_setup import log_sampled
+from Python_Assignment.market_store import get_market_store, MARKET_DATA_RESOLUTION
+from Python_Assignment.metrics import get_metrics_registry
+from Python_Assignment.utils.synthetic import synthetic_current_price
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_ENABLED = os.getenv("SETTLEMENT_ENABLED", "true").lower() not in ("0", "false", "no")
+SETTLEMENT_INTERVAL = float(os.getenv("SETTLEMENT_INTERVAL", "5"))
+SETTLEMENT_BATCH_SIZE = int(os.getenv("SETTLEMENT_BATCH_SIZE", "200"))
+SETTLEMENT_CONCURRENCY = int(os.getenv("SETTLEMENT_CONCURRENCY", "2"))
+
+_registry = get_metrics_registry()
+SETTLED_TRADES = _registry.counter(
+    "settlement_trades_total", "Scheduled trades settled, by outcome (executed/cancelled).", ("outcome",)
+)
+SETTLEMENT_LAG = _registry.histogram(
+    "settlement_lag_seconds", "Time from a trade's execution_time to its settlement.",
+    # Trades wait up to one interval normally, much longer when a backlog builds up
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, 21600.0, 86400.0),
+)
+SETTLEMENT_BATCH_SECONDS = _registry.histogram(
+    "settlement_batch_seconds", "Duration of one settlement transaction."
+)
+SETTLEMENT_FAILURES = _registry.counter(
+    "settlement_batch_failures_total", "Settlement transactions rolled back; their trades are retried next pull."
+)
+SETTLEMENT_THROUGHPUT = _registry.gauge(
+    "settlement_trades_per_second", "Trades settled per second over the most recent pull."
+)
+
+
+def _period_starts(times: List[datetime], resolution: int) -> np.ndarray:
+    minutes = np.array(times, dtype="datetime64[m]")
+    return minutes - minutes.astype(np.int64) % resolution
+
+
+def _lookup_close(series, starts: np.ndarray) -> np.ndarray:
+    """Close of the period starting at each of starts; NaN where the series has no such period."""
+    prices = np.full(len(starts), np.nan)
+    if series is None or not len(series):
+        return prices
+    index = np.searchsorted(series.timestamps, starts)
+    found = index < len(series)
+    found[found] = series.timestamps[index[found]] == starts[found]
+    prices[found] = series.close[index[found]]
+    return prices
+
+
+def price_trades(trades: List[Dict[str, Any]]) -> List[float]:
+    """Settlement price of each trade: the close of its delivery period (see the module docstring)."""
+    store = get_market_store()
+    prices = np.full(len(trades), np.nan)
+    groups = defaultdict(list)
+    for position, trade in enumerate(trades):
+        resolution = trade.get("resolution")
+        if resolution not in (15, 30, 60):
+            resolution = MARKET_DATA_RESOLUTION
+        groups[(trade.get("market") or "Germany", resolution)].append(position)
+
+    # fetch_rows returns datetimes as ISO strings
+    execution_times = [datetime.fromisoformat(trade["execution_time"]) if isinstance(trade["execution_time"], str)
+                       else trade["execution_time"] for trade in trades]
+
+    # One store query per market and resolution covering the whole batch
+    for (market, resolution), positions in groups.items():
+        times = [execution_times[position] for position in positions]
+        for lookup_resolution in dict.fromkeys((resolution, MARKET_DATA_RESOLUTION)):
+            missing = np.isnan(prices[positions])
+            if not missing.any():
+                break
+            starts = _period_starts(times, lookup_resolution)
+            series = store.query(market, starts.min(), starts.max() + np.timedelta64(lookup_resolution, "m"),
+                                 lookup_resolution)
+            found = _lookup_close(series, starts)
+            prices[positions] = np.where(missing, found, prices[positions])
+
+    result = prices.tolist()
+    for position, price in enumerate(result):
+        if price != price:  # NaN: no market data for the period
+            result[position] = synthetic_current_price(trades[position].get("market") or "Germany",
+                                                       execution_times[position])
+    return result
+
+
+class TradeSettlementScheduler:
+    def __init__(self, interval: float = SETTLEMENT_INTERVAL, batch_size: int = SETTLEMENT_BATCH_SIZE,
+                 concurrency: int = SETTLEMENT_CONCURRENCY, enabled: bool = SETTLEMENT_ENABLED):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.enabled = enabled
+        self._task: Optional[asyncio.Task] = None
+        self.executed = 0
+        self.cancelled = 0
+        self.failed_batches = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _settle_batch(self, trades: List[Dict[str, Any]], prices: List[float]) -> int:
+        started = time.perf_counter()
+        result = await settle_trades_async([(trade["Trade_ID"], price) for trade, price in zip(trades, prices)])
+        SETTLEMENT_BATCH_SECONDS.observe(time.perf_counter() - started)
+        if "error" in result:
+            self.failed_batches += 1
+            SETTLEMENT_FAILURES.inc()
+            return 0
+
+        now = datetime.now()
+        for _, _, execution_time in result["executed"]:
+            SETTLEMENT_LAG.observe(max((now - execution_time).total_seconds(), 0.0))
+        SETTLED_TRADES.inc(("executed",), len(result["executed"]))
+        SETTLED_TRADES.inc(("cancelled",), len(result["cancelled"]))
+        self.executed += len(result["executed"])
+        self.cancelled += len(result["cancelled"])
+        if result["cancelled"]:
+            log_sampled(logger, "settlement.cancelled", "Cancelled %s scheduled trades the battery could not take",
+                        len(result["cancelled"]), level=logging.WARNING)
+        return len(result["executed"]) + len(result["cancelled"])
+
+    async def _work(self, trades: List[Dict[str, Any]], prices: List[float]) -> int:
+        settled = 0
+        for start in range(0, len(trades), self.batch_size):
+            settled += await self._settle_batch(trades[start:start + self.batch_size],
+                                                prices[start:start + self.batch_size])
+        return settled
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Pull, price and settle one round of due trades."""
+        started = time.perf_counter()
+        limit = self.batch_size * self.concurrency
+        trades = await get_pending_trades_async(limit=limit, now=now)
+        settled = 0
+        if trades:
+            # The market store may load from the database on first use
+            prices = await run_in_threadpool(price_trades, trades)
+            shares = defaultdict(lambda: ([], []))
+            for trade, price in zip(trades, prices):
+                share = shares[trade["User_ID"] % self.concurrency]
+                share[0].append(trade)
+                share[1].append(price)
+            settled = sum(await asyncio.gather(*(self._work(*share) for share in shares.values())))
+
+        elapsed = time.perf_counter() - started
+        self.last_run = {
+            "pulled": len(trades),
+            "settled": settled,
+            "seconds": round(elapsed, 4),
+            "trades_per_second": round(settled / elapsed, 1) if settled else 0.0,
+            "backlog": len(trades) == limit,
+        }
+        SETTLEMENT_THROUGHPUT.set(self.last_run["trades_per_second"])
+        return self.last_run
+
+    async def _run(self):
+        logger.info(f"Trade settlement started (every {self.interval}s, {self.concurrency} workers "
+                    f"x {self.batch_size} trades)")
+        try:
+            while True:
+                try:
+                    run = await self.run_once()
+                except Exception as e:
+                    logger.error(f"Trade settlement run failed: {e}")
+                    run = None
+                # A full pull means more trades are due: keep going without waiting
+                if not (run and run["backlog"] and run["settled"]):
+                    await asyncio.sleep(self.interval)
+        finally:
+            logger.info("Trade settlement stopped")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "executed": self.executed,
+            "cancelled": self.cancelled,
+            "failed_batches": self.failed_batches,
+            "last_run": self.last_run,
+        }
+
+
+_scheduler = TradeSettlementScheduler()
+
+
+def get_settlement_scheduler() -> TradeSettlementScheduler:
+    return _scheduler
@@ -32,4 +32,56 @@ function makeApiCall(url, method = 'GET', data = null) {
             }
             return response.json();
         });
-} 
\ No newline at end of file
+} 
+// Subscribe to a Server-Sent Events endpoint with the auth header (EventSource cannot send one).
+// Calls onEvent(eventName, data) per event; returns a function that closes the stream.
+function streamEvents(url, onEvent, onError = null) {
+    const token = localStorage.getItem('auth_token');
+    const headers = {};
+    if (token) {
+        headers['Authorization'] = `Bearer ${token}`;
+    }
+    const controller = new AbortController();
+
+    fetch(url, { headers: headers, signal: controller.signal })
+        .then(async response => {
+            if (!response.ok) {
+                throw new Error(`HTTP Error: ${response.status}`);
+            }
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                // Events are separated by a blank line
+                let end;
+                while ((end = buffer.indexOf('\n\n')) !== -1) {
+                    const block = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+                    let event = 'message';
+                    let data = '';
+                    for (const line of block.split('\n')) {
+                        if (line.startsWith('event: ')) {
+                            event = line.slice(7);
+                        } else if (line.startsWith('data: ')) {
+                            data += line.slice(6);
+                        }
+                    }
+                    if (data) {
+                        onEvent(event, JSON.parse(data));
+                    }
+                }
+            }
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError' && onError) {
+                onError(error);
+            }
+        });
+
+    return () => controller.abort();
+}
@@ -0,0 +1,62 @@
+import numpy as np
+from sqlalchemy import select
+
+from Python_Assignment.database import get_db, MarketData
+from Python_Assignment.market_export import (
+    MarketParquetCache, GERMANY_SCHEMA, series_table, synthetic_germany_table,
+)
+from Python_Assignment.market_store import MarketSeries
+
+MARKET = "ParquetTest"
+
+
+def market_rows(days, close: float = 50.0):
+    return [{
+        "market": MARKET, "delivery_day": day, "delivery_period": f"{hour:02d}:00-{hour + 1:02d}:00",
+        "close": close, "high": close + 5, "low": close - 5, "open": close, "transaction_volume": 10.0, "cleared": True,
+    } for day in days for hour in range(24)]
+
+
+def sql_rows(start_date, end_date):
+    statement = select(MarketData.id, MarketData.close, MarketData.high, MarketData.cleared).where(
+        MarketData.market == MARKET, MarketData.delivery_day.between(start_date, end_date)
+    ).order_by(MarketData.delivery_day, MarketData.delivery_period)
+    with get_db().engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(statement)]
+
+
+def cached_rows(cache, start_date, end_date):
+    table = cache.table(MARKET, start_date, end_date)
+    return list(zip(*(table.column(name).to_pylist() for name in ("id", "close", "high", "cleared"))))
+
+
+def test_partitions_follow_writes_the_cache_was_not_told_about(tmp_path):
+    cache = MarketParquetCache(root=str(tmp_path))
+    db = get_db()
+    db.bulk_insert(MarketData, market_rows(["2023-01-30", "2023-01-31", "2023-02-01"]))
+    assert cached_rows(cache, "2023-01-01", "2023-02-28") == sql_rows("2023-01-01", "2023-02-28")
+    assert cache.cached_months(MARKET) == ["2023-01", "2023-02"]
+
+    # Core writes bypass the session hooks, as writes from another process would
+    db.bulk_insert(MarketData, market_rows(["2023-01-29"]))
+    db.bulk_upsert(MarketData, market_rows(["2023-02-01"], close=75.0))
+    # An upsert touching only high and cleared is a change too
+    db.bulk_upsert(MarketData, [dict(row, high=99.0, cleared=False) for row in market_rows(["2023-01-31"])[:1]])
+
+    for start_date, end_date in [("2023-01-01", "2023-02-28"), ("2023-01-30", "2023-02-01"), ("2023-02-01", "2023-02-01")]:
+        assert cached_rows(cache, start_date, end_date) == sql_rows(start_date, end_date)
+    assert cache.stats()["stale_partitions"] == 2
+    assert cached_rows(cache, "2023-01-31", "2023-01-31")[0][2:] == (99.0, False)
+
+
+def test_stored_and_synthetic_germany_tables_share_a_schema():
+    timestamps = np.arange("2024-01-01T00:00", "2024-01-01T03:00", 60, dtype="datetime64[m]")
+    prices = np.array([50.0, np.nan, 52.0])
+    stored = series_table(MarketSeries(60, timestamps, open=prices, high=prices, low=prices,
+                                       close=prices, volume=prices, vwap=prices), "Germany")
+    synthetic = synthetic_germany_table("2024-01-01", "2024-01-01", 60, seed=1, limit=3)
+
+    assert stored.schema == synthetic.schema == GERMANY_SCHEMA
+    assert stored.column("delivery_period").to_pylist() == synthetic.column("delivery_period").to_pylist()
+    assert stored.column("close_price").null_count == 1
+    assert synthetic_germany_table("2024-01-02", "2024-01-01").schema == GERMANY_SCHEMA
@@ -0,0 +1,37 @@
+from Python_Assignment.database import get_db, MarketData
+from Python_Assignment.market_store import MarketSeriesStore
+
+MARKET = "StoreTest"
+
+
+def market_rows(day, close: float = 50.0):
+    return [{
+        "market": MARKET, "delivery_day": day, "delivery_period": f"{hour:02d}:00-{hour + 1:02d}:00",
+        "close": close, "high": close + 5, "low": close - 5, "open": close, "transaction_volume": 10.0, "cleared": True,
+    } for hour in range(24)]
+
+
+def test_store_reloads_months_changed_behind_its_back():
+    store = MarketSeriesStore(check_interval=0)
+    db = get_db()
+    db.bulk_insert(MarketData, market_rows("2023-03-01"))
+    assert len(store.query(MARKET, "2023-03-01", "2023-05-01")) == 24
+
+    # Core writes bypass the session hooks, as writes from another process would
+    db.bulk_insert(MarketData, market_rows("2023-04-01"))
+    db.bulk_upsert(MarketData, market_rows("2023-03-01", close=75.0)[:1])
+
+    series = store.query(MARKET, "2023-03-01", "2023-05-01")
+    assert len(series) == 48
+    assert series.close[0] == 75.0
+    assert store.loads == 1
+    assert store.stats()["reloaded_months"] == 2
+
+
+def test_records_end_the_day_at_midnight():
+    store = MarketSeriesStore(check_interval=0)
+    get_db().bulk_insert(MarketData, market_rows("2023-06-01"))
+
+    records = store.query(MARKET, "2023-06-01", "2023-06-02").to_records(MARKET)
+    assert [record["delivery_period"] for record in records[-2:]] == ["22:00-23:00", "23:00-00:00"]
+    assert records[0]["date"] == "2023-06-01" and records[0]["resolution"] == "60min"
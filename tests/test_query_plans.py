@@ -0,0 +1,42 @@
+import pytest
+
+from Python_Assignment.database import get_db, query_plan_statements, find_full_scans
+
+# Index each hot query must search, by query_plan_statements() name
+EXPECTED_INDEXES = {
+    "get_user_by_email": ("users", "INDEX sqlite_autoindex_users_1"),
+    "get_user_by_id": ("users", "INTEGER PRIMARY KEY"),
+    "get_portfolio_by_user_id": ("portfolios", "INDEX ix_portfolios_user_id"),
+    "get_battery_status": ("batteries", "INDEX ix_batteries_user_id"),
+    "get_user_trades": ("trades", "INDEX ix_trades_user_execution_time_totals"),
+    "get_user_trades (range)": ("trades", "INDEX ix_trades_user_execution_time_totals"),
+    "get_user_trades (cursor page)": ("trades", "INDEX ix_trades_user_execution_time_totals"),
+    "get_trade_aggregates": ("trades", "COVERING INDEX ix_trades_user_execution_time_totals"),
+    "get_trade_rollup_aggregates": ("trade_rollups", "INDEX sqlite_autoindex_trade_rollups_1"),
+    "get_trade_by_id": ("trades", "INTEGER PRIMARY KEY"),
+    "get_pending_trades": ("trades", "INDEX ix_trades_status_execution_time"),
+    "get_pending_trades (batch)": ("trades", "INDEX ix_trades_status_execution_time"),
+    "get_market_data": ("market_data", "INDEX ux_market_data_market_day_period"),
+    "get_market_data_today": ("market_data", "INDEX ux_market_data_market_day_period"),
+    "get_market_data_today (period)": ("market_data", "INDEX ux_market_data_market_day_period"),
+    "get_market_versions": ("market_data_versions", "INDEX sqlite_autoindex_market_data_versions_1"),
+    "get_forecasts": ("forecasts", "INDEX ix_forecasts_market_timestamp"),
+}
+
+
+def test_every_hot_query_has_an_expected_index():
+    assert set(query_plan_statements()) == set(EXPECTED_INDEXES)
+
+
+@pytest.mark.parametrize("name", sorted(EXPECTED_INDEXES))
+def test_hot_query_searches_its_index(name):
+    table, index = EXPECTED_INDEXES[name]
+    plan = get_db().explain_query_plan(query_plan_statements()[name])
+
+    assert [detail for detail in plan if detail.startswith(f"SEARCH {table} USING {index} (")], plan
+    # Rows come out of the index in the requested order; only GROUP BY may sort
+    assert not [detail for detail in plan if "TEMP B-TREE FOR ORDER BY" in detail], plan
+
+
+def test_no_hot_query_scans_a_table():
+    assert find_full_scans() == {}
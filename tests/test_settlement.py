@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from Python_Assignment.database import (
+    get_db, Trade, MarketData, get_trade_by_id, get_battery_status, settle_trades,
+    check_trade_rollups, rebuild_trade_rollups,
+)
+from Python_Assignment.market_ingest import ingest_market_rows
+from Python_Assignment.settlement import TradeSettlementScheduler, price_trades
+from Python_Assignment.utils.synthetic import synthetic_current_price
+
+# Before anything the other tests insert, so only these trades are due
+DUE = datetime(2019, 6, 1)
+
+
+def insert_pending(user_id: int, orders):
+    """Pending (type, quantity, execution_time) trades; returns their ids in order."""
+    get_db().bulk_insert(Trade, [{
+        "User_ID": user_id, "type": trade_type, "quantity": quantity, "status": "pending",
+        "execution_time": execution_time, "resolution": 60, "market": "Germany",
+    } for trade_type, quantity, execution_time in orders])
+    rebuild_trade_rollups(user_id)  # bulk_insert skips the rollup maintenance of create_trade
+    with get_db().Session() as session:
+        return [trade_id for (trade_id,) in session.query(Trade.Trade_ID).filter(Trade.User_ID == user_id).order_by(Trade.Trade_ID)]
+
+
+def test_settlement_applies_trades_to_the_battery_in_order(user_id):
+    start = datetime(2019, 1, 1)
+    # The battery starts at 50 of 100 kWh; the 40 kWh sell comes when only 30 are left
+    ids = insert_pending(user_id, [
+        ("buy", 10.0, start), ("sell", 30.0, start + timedelta(hours=1)),
+        ("sell", 40.0, start + timedelta(hours=2)), ("buy", 5.0, start + timedelta(hours=3)),
+    ])
+
+    result = settle_trades([(trade_id, 60.0 + i) for i, trade_id in enumerate(ids)], now=DUE)
+
+    assert [trade_id for _, trade_id, _ in result["executed"]] == [ids[0], ids[1], ids[3]]
+    assert result["cancelled"] == [(user_id, ids[2])]
+    assert [get_trade_by_id(trade_id)["status"] for trade_id in ids] == ["executed", "executed", "cancelled", "executed"]
+    assert get_trade_by_id(ids[3])["price"] == 63.0
+    assert get_battery_status(user_id)["current_level"] == 35.0
+    assert check_trade_rollups(user_id) == []
+    # Settled trades are never settled twice
+    assert settle_trades([(trade_id, 1.0) for trade_id in ids], now=DUE)["skipped"] == ids
+
+
+def test_trades_are_priced_from_market_data_or_synthetic_close():
+    ingest_market_rows(MarketData, [{
+        "market": "Germany", "delivery_day": "2019-02-01", "delivery_period": "10:00-11:00",
+        "close": 42.0, "high": 45.0, "low": 40.0, "open": 41.0, "transaction_volume": 100.0, "cleared": True,
+    }])
+    covered = {"execution_time": "2019-02-01T10:20:00", "resolution": 60, "market": "Germany"}
+    uncovered = {"execution_time": "2019-02-01T11:20:00", "resolution": 15, "market": "Germany"}
+
+    assert price_trades([covered, uncovered]) == [
+        42.0, synthetic_current_price("Germany", datetime(2019, 2, 1, 11, 20))
+    ]
+
+
+def test_scheduler_settles_due_trades_only(user_id):
+    start = datetime(2019, 3, 1)
+    ids = insert_pending(user_id, [("buy", 1.0, start + timedelta(hours=hour)) for hour in range(10)])
+    ids += insert_pending(user_id, [("buy", 1.0, DUE + timedelta(days=1))])[-1:]
+
+    scheduler = TradeSettlementScheduler(batch_size=3, concurrency=2, enabled=False)
+    while asyncio.run(scheduler.run_once(now=DUE))["settled"]:
+        pass
+
+    assert [get_trade_by_id(trade_id)["status"] for trade_id in ids] == ["executed"] * 10 + ["pending"]
+    assert scheduler.stats()["executed"] == 10
+    assert check_trade_rollups(user_id) == []
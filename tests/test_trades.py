@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from Python_Assignment.database import (
+    get_db, Trade, get_user_trades, _user_trades_cache, create_trade, update_trade_status,
+    encode_trade_cursor, decode_trade_cursor, check_trade_rollups,
+    get_trade_aggregates, get_trade_rollup_aggregates,
+)
+
+START = datetime(2024, 1, 1)
+
+
+def insert_trades(user_id: int, count: int = 61):
+    """Trades two minutes apart with some execution times shared and every 20th undated."""
+    get_db().bulk_insert(Trade, [{
+        "User_ID": user_id,
+        "type": "buy" if i % 3 else "sell",
+        "quantity": 1.0 + i % 4,
+        "price": 40.0 + i % 7,
+        "status": "executed" if i % 5 else "pending",
+        "execution_time": None if i % 20 == 0 else START + timedelta(minutes=2 * (i // 2)),
+        "market": "Germany",
+    } for i in range(count)])
+
+
+def trade_ids(trades):
+    return [trade["Trade_ID"] for trade in trades]
+
+
+def test_cursor_pages_return_every_trade_once(user_id):
+    insert_trades(user_id)
+    everything = get_user_trades(user_id, cache_bypass=True, alias_keys=False)
+
+    seen, cursor = [], None
+    while True:
+        page = get_user_trades(user_id, cache_bypass=True, alias_keys=False, limit=7, cursor=cursor)
+        if not page:
+            break
+        seen += trade_ids(page)
+        cursor = decode_trade_cursor(encode_trade_cursor(page[-1]))
+
+    assert seen == trade_ids(everything)
+    assert len(set(seen)) == 61
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    (None, None),
+    (None, START + timedelta(minutes=30)),
+    (START + timedelta(minutes=30), None),
+    (START + timedelta(minutes=10), START + timedelta(minutes=50)),
+    (START + timedelta(days=1), None),
+])
+def test_cached_ranges_match_sql(user_id, start_date, end_date):
+    insert_trades(user_id)
+    get_user_trades(user_id, alias_keys=False)  # fills the cache with the full history
+
+    cached = _user_trades_cache.get(user_id, start_date, end_date, False)
+    assert cached is not None
+    assert cached == get_user_trades(user_id, start_date, end_date, cache_bypass=True, alias_keys=False)
+
+
+def test_rollups_follow_created_and_updated_trades(user_id):
+    for i in range(24):
+        assert create_trade({
+            "User_ID": user_id,
+            "type": "sell" if i % 3 == 0 else "buy",
+            "quantity": 0.5 + i,
+            "price": 50.0 + i,
+            "status": "pending",
+            "execution_time": START + timedelta(hours=5 * i),
+            "market": "Germany",
+        })
+    for trade in get_user_trades(user_id, cache_bypass=True)[::4]:
+        # Moves the trade to another status and day
+        assert update_trade_status(trade["Trade_ID"], {
+            "status": "executed",
+            "execution_time": datetime.fromisoformat(trade["execution_time"]) + timedelta(days=2),
+        })
+
+    assert check_trade_rollups(user_id) == []
+    # Quantities and prices are exact in binary, so both sums agree to the last bit
+    for start_date, end_date in [(None, None), (START + timedelta(hours=7), START + timedelta(days=3, hours=2))]:
+        for bucket in (None, "day"):
+            raw = get_trade_aggregates(user_id, start_date, end_date, bucket)
+            assert get_trade_rollup_aggregates(user_id, start_date, end_date, bucket) == raw
@@ -0,0 +1,113 @@
+"""
+Streaming NDJSON / CSV exports, and Arrow / Parquet responses.
+
+Routes hand over an iterable of row batches (lists of dicts): an async iterator
+such as AsyncSQLAlchemyDatabase.stream_rows, or a plain iterator, which is
+advanced in the threadpool so generating a batch never blocks the event loop.
+Each batch is encoded and sent as soon as it is ready, so memory use and time to
+first byte do not grow with the size of the range.
+"""
+from typing import Dict, Any, List, AsyncIterator, Iterable, Optional, Sequence, Union
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from starlette.concurrency import iterate_in_threadpool
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from Python_Assignment.utils.responses import dumps
+
+# Values accepted by the routes' format query parameter
+FORMAT_PATTERN = "^(json|ndjson|csv)$"
+# Market data can also be served columnar
+COLUMNAR_FORMAT_PATTERN = "^(json|ndjson|csv|arrow|parquet)$"
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+RowBatches = Union[AsyncIterator[List[Dict[str, Any]]], Iterable[List[Dict[str, Any]]]]
+
+
+async def _iter_batches(batches: RowBatches) -> AsyncIterator[List[Dict[str, Any]]]:
+    if hasattr(batches, "__aiter__"):
+        async for batch in batches:
+            yield batch
+    else:
+        async for batch in iterate_in_threadpool(iter(batches)):
+            yield batch
+
+
+async def ndjson_chunks(batches: RowBatches) -> AsyncIterator[bytes]:
+    """One JSON object per line, serialized like the JSON responses."""
+    async for batch in _iter_batches(batches):
+        if batch:
+            yield b"".join(dumps(row) + b"\n" for row in batch)
+
+
+async def csv_chunks(batches: RowBatches, fieldnames: Optional[Sequence[str]] = None) -> AsyncIterator[bytes]:
+    """
+    CSV with a header row taken from the keys of the first row. With fieldnames,
+    an empty result is still a header row, matching the JSON path's [].
+    """
+    writer = None
+    buffer = io.StringIO()
+    async for batch in _iter_batches(batches):
+        if not batch:
+            continue
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(batch[0]), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if writer is None and fieldnames:
+        csv.DictWriter(buffer, fieldnames=list(fieldnames)).writeheader()
+        yield buffer.getvalue().encode()
+
+
+def export_response(batches: RowBatches, format: str, filename: str,
+                    fieldnames: Optional[Sequence[str]] = None) -> StreamingResponse:
+    """
+    Stream row batches as an NDJSON or CSV download named filename.<format>.
+    fieldnames is the CSV header to send when there are no rows.
+    """
+    chunks = csv_chunks(batches, fieldnames) if format == "csv" else ndjson_chunks(batches)
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
+def negotiate_format(request: Request, format: str) -> str:
+    """The format query parameter, unless it was left at json and the Accept header asks for Arrow or Parquet."""
+    if format != "json":
+        return format
+    accept = request.headers.get("accept", "")
+    for name in ("arrow", "parquet"):
+        if MEDIA_TYPES[name] in accept:
+            return name
+    return format
+
+
+def columnar_response(table: pa.Table, format: str, filename: str) -> Response:
+    """An Arrow table as an Arrow IPC stream or a Parquet file download."""
+    sink = pa.BufferOutputStream()
+    if format == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, sink)
+    return Response(
+        content=sink.getvalue().to_pybytes(),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
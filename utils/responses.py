@@ -0,0 +1,43 @@
+"""
+orjson-backed JSON responses.
+
+FastJSONResponse is the application's default response class (see server.py).
+It serializes datetimes, dates, UUIDs and NumPy arrays/scalars natively and
+falls back to _default for anything orjson doesn't know (Decimal, sets,
+pydantic models). List endpoints that return plain rows build the response
+themselves (return FastJSONResponse(rows)), which skips FastAPI's
+response_model validation and jsonable_encoder walk over every key.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if hasattr(value, "tolist"):
+        # NumPy values orjson can't take directly (non-contiguous or object arrays)
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content the way FastJSONResponse does."""
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
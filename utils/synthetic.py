@@ -0,0 +1,426 @@
+"""
+Vectorized synthetic market data.
+
+Each series is built as NumPy arrays for a block of days at a time (one draw per
+column per block instead of a dozen random.uniform calls per point), from a
+seedable numpy.random.Generator so a given seed always reproduces the same data.
+The iter_* functions are lazy: callers can stop early, or serialize block by
+block, without materializing the whole range.
+
+The per-day demo series used when the database has no prices (hourly market
+data, real-time history, forecasts) are deterministic per day and memoized;
+see the section at the bottom.
+"""
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from itertools import repeat
+from typing import Dict, Any, List, Optional, Iterator, Sequence, Tuple, Union
+import os
+import threading
+import zlib
+
+import numpy as np
+import orjson
+
+MINUTES_PER_DAY = 24 * 60
+# Days generated per block by the lazy iterators
+DEFAULT_BLOCK_DAYS = 31
+# Key order of the Germany historical market data rows
+GERMANY_FIELDS = (
+    "id", "date", "resolution", "delivery_period", "market", "high_price", "low_price", "average_price",
+    "open_price", "close_price", "buy_volume", "sell_volume", "volume", "vwap1h", "vwap3h",
+    "contract_open_time", "contract_close_time", "created_at",
+)
+
+
+def make_rng(seed: Union[int, np.random.Generator, None] = None) -> np.random.Generator:
+    """A Generator from a seed (None = fresh OS entropy); Generators pass through."""
+    if isinstance(seed, np.random.Generator):
+        return seed
+    return np.random.default_rng(seed)
+
+
+def _parse_day_range(start_date: str, end_date: str):
+    try:
+        start = np.datetime64(datetime.strptime(start_date, '%Y-%m-%d').date(), "D")
+        end = np.datetime64(datetime.strptime(end_date, '%Y-%m-%d').date(), "D")
+    except (TypeError, ValueError):
+        # Default to recent dates if invalid
+        end = np.datetime64(datetime.now().date(), "D")
+        start = end - np.timedelta64(7, "D")
+    return start, end
+
+
+def germany_market_columns(
+    days: np.ndarray,
+    resolution: int,
+    rng: np.random.Generator,
+    first_id: int = 1
+) -> Dict[str, np.ndarray]:
+    """
+    Historical Germany market data for the given days (datetime64[D]) as
+    columns: one row per `resolution`-minute period, days in order.
+    """
+    offsets = np.arange(MINUTES_PER_DAY // resolution, dtype=np.int64) * resolution
+    count = len(days) * len(offsets)
+
+    # Higher prices during the morning (8am) and evening (6pm) peaks, 20% lower at weekends
+    hours = offsets // 60
+    time_factor = 1.0 + 0.3 * (np.exp(-((hours - 8) ** 2) / 10) + np.exp(-((hours - 18) ** 2) / 10))
+    weekday = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday; 0 = Monday
+    weekend_factor = np.where(weekday >= 5, 0.8, 1.0)
+    base_price = (45 * weekend_factor[:, None] * time_factor[None, :]).ravel()
+    avg_price = base_price * rng.uniform(0.9, 1.1, count)
+
+    timestamps = (days.astype("datetime64[m]")[:, None] + offsets[None, :]).ravel()
+    period_starts = np.datetime_as_string(timestamps[:len(offsets)], unit="m")
+    period_ends = np.datetime_as_string(timestamps[:len(offsets)] + np.timedelta64(resolution, "m"), unit="m")
+    periods = np.char.add(np.char.add(np.char.partition(period_starts, "T")[:, 2], "-"),
+                          np.char.partition(period_ends, "T")[:, 2])
+
+    return {
+        "id": np.arange(first_id, first_id + count),
+        "date": np.repeat(np.datetime_as_string(days), len(offsets)),
+        "delivery_period": np.tile(periods, len(days)),
+        "high_price": avg_price * rng.uniform(1.01, 1.05, count),
+        "low_price": avg_price * rng.uniform(0.95, 0.99, count),
+        "average_price": avg_price,
+        "open_price": avg_price * rng.uniform(0.98, 1.02, count),
+        "close_price": avg_price * rng.uniform(0.98, 1.02, count),
+        "buy_volume": rng.uniform(100, 300, count),
+        "sell_volume": rng.uniform(100, 300, count),
+        "volume": rng.uniform(200, 600, count),
+        "vwap1h": avg_price * rng.uniform(0.99, 1.01, count),
+        "vwap3h": avg_price * rng.uniform(0.98, 1.02, count),
+        "contract_open_time": np.datetime_as_string(timestamps - np.timedelta64(2, "h"), unit="s"),
+        "contract_close_time": np.datetime_as_string(timestamps - np.timedelta64(15, "m"), unit="s"),
+    }
+
+
+def iter_germany_market_columns(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    block_days: int = DEFAULT_BLOCK_DAYS
+) -> Iterator[Dict[str, np.ndarray]]:
+    """Lazily yield germany_market_columns blocks covering start_date..end_date inclusive."""
+    resolution = resolution or 60
+    rng = make_rng(seed)
+    start, end = _parse_day_range(start_date, end_date)
+    first_id = 1
+    for block_start in np.arange(start, end + 1, block_days, dtype="datetime64[D]"):
+        days = np.arange(block_start, min(block_start + block_days, end + 1), dtype="datetime64[D]")
+        columns = germany_market_columns(days, resolution, rng, first_id)
+        first_id += len(columns["id"])
+        yield columns
+
+
+def columns_to_records(
+    columns: Dict[str, np.ndarray],
+    constants: Dict[str, Any],
+    fields: Sequence[str]
+) -> List[Dict[str, Any]]:
+    """Turn a block of columns into row dicts with keys in `fields` order; constants fill the other keys."""
+    values = [columns[name].tolist() if name in columns else repeat(constants[name]) for name in fields]
+    return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+def _germany_constants(resolution: Optional[int]) -> Dict[str, Any]:
+    """Values shared by every synthetic Germany row of one request."""
+    return {
+        "resolution": f"{resolution or 60}min",
+        "market": "Germany",
+        "created_at": datetime.now().isoformat(),
+    }
+
+
+def iter_sample_germany_market_batches(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    limit: Optional[int] = None
+) -> Iterator[List[Dict[str, Any]]]:
+    """Synthetic Germany market data rows in blocks of days, stopping after `limit` rows."""
+    constants = _germany_constants(resolution)
+    remaining = limit
+    for columns in iter_germany_market_columns(start_date, end_date, resolution, seed):
+        if remaining is not None:
+            columns = {name: values[:remaining] for name, values in columns.items()}
+            remaining -= len(columns["id"])
+        yield columns_to_records(columns, constants, GERMANY_FIELDS)
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def iter_sample_germany_market_data(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    limit: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Lazily yield synthetic Germany market data rows, stopping after `limit` rows."""
+    for records in iter_sample_germany_market_batches(start_date, end_date, resolution, seed, limit):
+        yield from records
+
+
+def generate_sample_germany_market_data(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Generate synthetic historical market data for Germany."""
+    return list(iter_sample_germany_market_data(start_date, end_date, resolution, seed, limit))
+
+
+def stream_sample_germany_market_data(
+    start_date: str,
+    end_date: str,
+    resolution: Optional[int] = None,
+    seed: Union[int, np.random.Generator, None] = None,
+    limit: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    The same rows serialized as one JSON array, yielded block by block so a
+    StreamingResponse never holds more than one block in memory.
+    """
+    separator = b"["
+    for records in iter_sample_germany_market_batches(start_date, end_date, resolution, seed, limit):
+        if records:
+            # Splice the block's own array (brackets stripped) into the outer one
+            yield separator + orjson.dumps(records)[1:-1]
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+# Deterministic synthetic series
+# Each (kind, market, date, resolution) key always produces the same day of data:
+# the Generator is seeded from SYNTHETIC_SEED and a stable hash of the key. Days
+# are memoized in a bounded LRU, so dashboard polling reuses precomputed arrays and
+# every endpoint (and the default trade price) sees the same prices for a period.
+
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "0"))
+
+
+def _hour_factor(hours: np.ndarray) -> np.ndarray:
+    # Higher prices during the morning (8am) and evening (6pm) peaks
+    return 1.0 + 0.3 * (np.exp(-((hours - 8) ** 2) / 10) + np.exp(-((hours - 18) ** 2) / 10))
+
+
+def _day_market_prices(rng: np.random.Generator, resolution: int) -> Dict[str, np.ndarray]:
+    """Hourly cleared prices: a sine over the day plus noise, rounded to cents."""
+    hours = np.arange(24)
+    close = 50 + 10 * np.sin(hours / 12 * np.pi) + rng.uniform(-5, 5, 24)
+    return {
+        "close": np.round(close, 2),
+        "high": np.round(close + rng.uniform(0, 3, 24), 2),
+        "low": np.round(close - rng.uniform(0, 3, 24), 2),
+        "open": np.round(close - rng.uniform(-2, 2, 24), 2),
+        "transaction_volume": np.round(rng.uniform(100, 500, 24), 2),
+    }
+
+
+def _day_realtime_prices(rng: np.random.Generator, resolution: int) -> Dict[str, np.ndarray]:
+    """Intraday price path every `resolution` minutes, plus an hourly spot price."""
+    minutes = np.arange(0, MINUTES_PER_DAY, resolution)
+    noise = np.sin(minutes % 60 / 60 * np.pi) * 1.5  # sine wave within the hour
+    return {
+        "price": 45 * _hour_factor(minutes // 60) * rng.uniform(0.97, 1.03, len(minutes)) + noise,
+        "spot": 45 * _hour_factor(np.arange(24)) * rng.uniform(0.95, 1.05, 24),
+    }
+
+
+def _day_forecasts(rng: np.random.Generator, resolution: int) -> Dict[str, np.ndarray]:
+    """Hourly forecast prices (before the multi-day trend) and confidences."""
+    return {
+        "price": 50 * _hour_factor(np.arange(24)) * rng.uniform(0.9, 1.1, 24),
+        "confidence": np.round(rng.uniform(0.7, 0.95, 24), 2),
+    }
+
+
+_SERIES_BUILDERS = {
+    "market": _day_market_prices,
+    "realtime": _day_realtime_prices,
+    "forecast": _day_forecasts,
+}
+
+
+class SyntheticSeriesCache:
+    """
+    Bounded LRU of generated synthetic days keyed by (kind, market, date, resolution).
+    Cached arrays are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = 512, seed: int = 0):
+        self.max_entries = max_entries
+        self.seed = seed
+        self._entries = OrderedDict()  # key -> (arrays, generated_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, market: str, date: str, resolution: int = 60) -> Tuple[Dict[str, np.ndarray], str]:
+        """The day's arrays and the ISO time they were first generated."""
+        key = (kind, market, date, resolution)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Generating is deterministic, so a concurrent miss builds an identical entry
+        rng = np.random.default_rng([self.seed, zlib.crc32("|".join(map(str, key)).encode())])
+        entry = (_SERIES_BUILDERS[kind](rng, resolution), datetime.now().isoformat())
+        with self._lock:
+            entry = self._entries.setdefault(key, entry)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "seed": self.seed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+_synthetic_cache = SyntheticSeriesCache(
+    max_entries=int(os.getenv("SYNTHETIC_CACHE_MAX_ENTRIES", "512")),
+    seed=SYNTHETIC_SEED,
+)
+
+
+def get_synthetic_cache_stats() -> Dict[str, Any]:
+    return _synthetic_cache.stats()
+
+
+def _normalize_date(date: str) -> Tuple[datetime, str]:
+    try:
+        date_obj = datetime.strptime(date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        # Default to today if invalid date
+        date_obj = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return date_obj, date_obj.strftime('%Y-%m-%d')
+
+
+def generate_sample_market_data(date: str, market: str) -> List[Dict[str, Any]]:
+    """Synthetic hourly market data for one day, identical on every call."""
+    date_obj, date = _normalize_date(date)
+    prices, generated_at = _synthetic_cache.get("market", market, date)
+    now = datetime.now()
+    cleared_hours = now.hour if date == now.strftime('%Y-%m-%d') else 24
+    return [
+        {
+            "id": int(f"{date_obj.year}{date_obj.month:02d}{date_obj.day:02d}{hour:02d}"),
+            "delivery_day": date,
+            "delivery_period": f"{hour:02d}:00-{(hour+1):02d}:00",
+            "cleared": hour < cleared_hours,
+            "market": market,
+            "high": high,
+            "low": low,
+            "close": close,
+            "open": open_,
+            "transaction_volume": volume,
+            "created_at": generated_at,
+        }
+        for hour, (high, low, close, open_, volume) in enumerate(zip(
+            prices["high"].tolist(), prices["low"].tolist(), prices["close"].tolist(),
+            prices["open"].tolist(), prices["transaction_volume"].tolist()
+        ))
+    ]
+
+
+def synthetic_current_price(market: str = "Germany", now: Optional[datetime] = None) -> float:
+    """The synthetic cleared price of the current hour, as listed by generate_sample_market_data."""
+    now = now or datetime.now()
+    prices, _ = _synthetic_cache.get("market", market, now.strftime('%Y-%m-%d'))
+    return float(prices["close"][now.hour])
+
+
+def generate_sample_price_data(date_str: str, market: str = "Germany") -> Dict[str, Any]:
+    """Synthetic real-time price data: 15-minute history up to now (or the day's end) and a spot price."""
+    date_obj, date_str = _normalize_date(date_str)
+    now = datetime.now()
+    # For historical dates, use a fixed "current time" at end of day
+    reference_time = now if date_str == now.strftime('%Y-%m-%d') else date_obj.replace(hour=23, minute=0, second=0)
+
+    resolution = 15
+    series, _ = _synthetic_cache.get("realtime", market, date_str, resolution)
+    points = (reference_time.hour * 60 + reference_time.minute) // resolution + 1
+    prices = series["price"][:points]
+    stamps = np.datetime_as_string(
+        np.datetime64(date_obj.date(), "m") + np.arange(points) * np.timedelta64(resolution, "m"), unit="s"
+    )
+    return {
+        "date": date_str,
+        "currentTime": reference_time.isoformat(),
+        "currentPrice": float(series["spot"][reference_time.hour]),
+        "currency": "EUR",
+        "unit": "MWh",
+        "market": market,
+        "dayHigh": float(prices.max()),
+        "dayLow": float(prices.min()),
+        "dayAverage": float(prices.mean()),
+        "priceHistory": [{"timestamp": stamp, "price": price} for stamp, price in zip(stamps.tolist(), prices.tolist())],
+    }
+
+
+def sample_price_tick(now: datetime, market: str = "Germany", since_index: int = -1) -> Dict[str, Any]:
+    """
+    Incremental counterpart of generate_sample_price_data for today: the spot price,
+    running day statistics and only the 15-minute history points after since_index.
+    """
+    date_obj, date_str = _normalize_date(now.strftime('%Y-%m-%d'))
+    resolution = 15
+    series, _ = _synthetic_cache.get("realtime", market, date_str, resolution)
+    index = (now.hour * 60 + now.minute) // resolution
+    prices = series["price"][:index + 1]
+    first = max(since_index + 1, 0)
+    stamps = np.datetime_as_string(
+        np.datetime64(date_obj.date(), "m") + np.arange(first, index + 1) * np.timedelta64(resolution, "m"), unit="s"
+    )
+    return {
+        "date": date_str,
+        "currentTime": now.isoformat(),
+        "currentPrice": float(series["spot"][now.hour]),
+        "market": market,
+        "dayHigh": float(prices.max()),
+        "dayLow": float(prices.min()),
+        "dayAverage": float(prices.mean()),
+        "index": index,
+        "newPoints": [{"timestamp": stamp, "price": price} for stamp, price in zip(stamps.tolist(), prices[first:].tolist())],
+    }
+
+
+def generate_synthetic_forecasts(start_time: datetime, end_time: datetime, market: str) -> List[Dict[str, Any]]:
+    """Hourly synthetic forecasts from start_time (exclusive of end_time) with a small upward trend over days."""
+    forecasts = []
+    current_time = start_time
+    while current_time < end_time:
+        day, generated_at = _synthetic_cache.get("forecast", market, current_time.strftime('%Y-%m-%d'))
+        trend_factor = 1 + ((current_time - start_time).days * 0.02)
+        forecasts.append({
+            "forecast_id": len(forecasts) + 1,
+            "timestamp": current_time.isoformat(),
+            "market": market,
+            "price": round(float(day["price"][current_time.hour]) * trend_factor, 2),
+            "confidence": float(day["confidence"][current_time.hour]),
+            "created_at": generated_at,
+        })
+        current_time += timedelta(hours=1)
+    return forecasts